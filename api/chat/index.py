@@ -1,26 +1,59 @@
 import json
 import os
 import sys
+import time
+
+_IMPORT_T0 = time.perf_counter()
 
 # Add parent directory to path to import your modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from chatbot_backend.db import build_or_load_db
 from chatbot_backend.llm import answer_question
 
 # Initialize the vector database
 PERSIST_DIR = os.path.join(os.path.dirname(__file__), "../../../chromaDb_expanded")
 COLLECTION_NAME = "iitrpr_faq"
+# The backend writes one collection per corpus version (ingest.versioned_collection); the fallback
+# opens the one for this CSV, or the newest complete one when the CSV isn't deployed
+CSV_PATH = os.getenv("CSV_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "DATA_FAQ_EXPANDED.csv"))
+
+# Compact artifact built by scripts/build_artifact.py. Loading it needs only numpy, onnxruntime
+# and tokenizers; the Chroma/torch path below is kept as a fallback when it is missing.
+ARTIFACT_DIR = os.getenv("INDEX_ARTIFACT_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "chromaDb_expanded_artifact"))
+# The cross-encoder pulls in torch, so serverless skips it unless asked to
+RERANK = os.getenv("API_RERANK", "0") == "1"
 
 # This will be initialized on first request
 vectordb = None
+bm25_retriever = None
+TIMINGS = {"import_ms": round((time.perf_counter() - _IMPORT_T0) * 1000, 1), "init_ms": None}
 
 def init_db():
-    global vectordb
+    global vectordb, bm25_retriever
     if vectordb is None:
         print("Initializing vector database...")
-        vectordb = build_or_load_db(None, PERSIST_DIR, COLLECTION_NAME)
-        print("Vector database initialized")
+        t0 = time.perf_counter()
+        if os.path.exists(os.path.join(ARTIFACT_DIR, "manifest.json")):
+            from chatbot_backend.index_artifact import load_retrievers
+            vectordb, bm25_retriever = load_retrievers(ARTIFACT_DIR)
+        else:
+            from chatbot_backend.db import build_or_load_db
+            from chatbot_backend.ingest import current_collection
+            vectordb = build_or_load_db(None, PERSIST_DIR, current_collection(PERSIST_DIR, COLLECTION_NAME, CSV_PATH))
+        TIMINGS["init_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        print(f"Vector database initialized [COLD] import={TIMINGS['import_ms']}ms init={TIMINGS['init_ms']}ms")
+
+
+def _answer(question):
+    """Run the pipeline and report whether this invocation paid the cold start."""
+    t0 = time.perf_counter()
+    cold = vectordb is None
+    init_db()
+    answer = answer_question(vectordb, question, bm25_retriever=bm25_retriever, rerank=RERANK)
+    timings = dict(TIMINGS, cold_start=cold, request_ms=round((time.perf_counter() - t0) * 1000, 1))
+    print(f"[LATENCY] cold={cold} request={timings['request_ms']}ms")
+    return answer, timings
+
 
 def make_response(status_code, body, headers=None):
     # Define CORS headers
@@ -61,9 +94,6 @@ def handler(event, context):
         }
 
     try:
-        # Initialize DB
-        init_db()
-
         # Get request method and headers
         method = event.get('httpMethod', '').upper()
 
@@ -80,10 +110,11 @@ def handler(event, context):
                         return make_response(400, {'error': 'Question is required'})
 
                     # Get answer from RAG pipeline
-                    answer = answer_question(vectordb, question)
+                    answer, timings = _answer(question)
                     return make_response(200, {
                         'question': question,
-                        'answer': answer
+                        'answer': answer,
+                        'timings': timings
                     })
 
                 except json.JSONDecodeError as e:
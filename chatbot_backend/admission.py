@@ -0,0 +1,161 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from .metrics import metrics
+
+# Admission control in front of the answer pipeline (one Ollama instance behind it).
+#   - per-key token buckets (API key, else client address): RATE_LIMIT_RPS sustained, RATE_LIMIT_BURST burst
+#   - at most MAX_CONCURRENT_PIPELINES pipelines at once; the rest queue by priority class
+#   - "interactive" (chat UI) is served before "batch" (/chat/batch, red-team page); batch may never
+#     take the last ADMISSION_RESERVED_INTERACTIVE slots; a batch holds one slot per concurrent generation
+#   - a request whose expected queue wait exceeds its class SLO is rejected at once (429 + Retry-After)
+#     rather than after waiting, so interactive latency stays flat under overload
+
+RATE_LIMIT_RPS = float(os.getenv("RATE_LIMIT_RPS", "1.0"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "10"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "10000"))
+MAX_CONCURRENT_PIPELINES = int(os.getenv("MAX_CONCURRENT_PIPELINES", "4"))
+ADMISSION_RESERVED_INTERACTIVE = int(os.getenv("ADMISSION_RESERVED_INTERACTIVE", "1"))
+# Max expected queue wait (seconds) per class before shedding
+ADMISSION_SLO_S = {
+    "interactive": float(os.getenv("ADMISSION_SLO_INTERACTIVE_S", "10")),
+    "batch": float(os.getenv("ADMISSION_SLO_BATCH_S", "2")),
+}
+PRIORITIES = ("interactive", "batch")
+
+
+class Overloaded(Exception):
+    """Request rejected by admission control; ``retry_after`` is in whole seconds."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+
+
+def priority_class(value: str | None) -> str:
+    """Clients may lower their priority (X-Priority: batch) but anything unknown is interactive."""
+    value = (value or "").strip().lower()
+    return "batch" if value in ("batch", "test", "low") else "interactive"
+
+
+class RateLimiter:
+    """Token bucket per key; least recently seen keys are forgotten beyond ``max_keys``."""
+
+    def __init__(self, rate: float = RATE_LIMIT_RPS, burst: float = RATE_LIMIT_BURST, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.rate, self.burst, self.max_keys = rate, max(1.0, burst), max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, last refill)
+        self._lock = threading.Lock()
+
+    def check(self, key: str, cost: float = 1.0):
+        """Take ``cost`` tokens or raise Overloaded with the time until they are available."""
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            ok = tokens >= cost
+            if ok:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        if not ok:
+            raise Overloaded("rate_limited", (cost - tokens) / self.rate)
+
+
+class AdmissionController:
+    """Global pipeline slots with a priority queue and early shedding on expected wait."""
+
+    def __init__(self, capacity: int = MAX_CONCURRENT_PIPELINES, reserved: int = ADMISSION_RESERVED_INTERACTIVE,
+                 slo_s: dict = ADMISSION_SLO_S):
+        self.capacity = max(1, capacity)
+        self.reserved = min(max(0, reserved), self.capacity - 1)
+        self.slo_s = slo_s
+        self.active = {p: 0 for p in PRIORITIES}
+        self.waiting = {p: 0 for p in PRIORITIES}
+        # Exponentially weighted mean pipeline time per class, seeds for the wait estimate
+        self.service_s = {"interactive": 5.0, "batch": 30.0}
+        self._cond = threading.Condition()
+
+    def _can_run(self, priority: str) -> bool:
+        busy = sum(self.active.values())
+        if priority == "interactive":
+            return busy < self.capacity
+        return busy < self.capacity - self.reserved and self.waiting["interactive"] == 0
+
+    def _expected_wait(self, priority: str) -> float:
+        if self._can_run(priority) and (priority == "batch" or self.waiting["interactive"] == 0):
+            return 0.0
+        # Requests ahead of this one, each holding a slot for about its class's mean service time
+        ahead = self.waiting["interactive"] + (self.waiting["batch"] if priority == "batch" else 0)
+        mean = (sum(self.active[p] * self.service_s[p] for p in PRIORITIES) / max(1, sum(self.active.values())))
+        lanes = self.capacity - (self.reserved if priority == "batch" else 0)
+        return (ahead + 1) * mean / max(1, lanes)
+
+    def acquire(self, priority: str = "interactive") -> float:
+        """Take a slot, queueing up to the class SLO. Returns the seconds waited; raises Overloaded."""
+        slo = self.slo_s.get(priority, self.slo_s["interactive"])
+        t0 = time.monotonic()
+        with self._cond:
+            expected = self._expected_wait(priority)
+            if expected > slo:
+                metrics.inc("admission", outcome="shed", priority=priority)
+                raise Overloaded("overloaded", expected)
+            self.waiting[priority] += 1
+            try:
+                if not self._cond.wait_for(lambda: self._can_run(priority), timeout=slo):
+                    metrics.inc("admission", outcome="timeout", priority=priority)
+                    raise Overloaded("overloaded", self._expected_wait(priority) or slo)
+            finally:
+                self.waiting[priority] -= 1
+            self.active[priority] += 1
+        waited = time.monotonic() - t0
+        metrics.inc("admission", outcome="admitted", priority=priority)
+        metrics.observe("admission_wait", waited, priority=priority)
+        return waited
+
+    def acquire_more(self, priority: str, n: int) -> int:
+        """Up to ``n`` further slots that are free right now, without queueing. Returns how many
+        were taken; each must be given back with ``release``."""
+        taken = 0
+        with self._cond:
+            while taken < n and self._can_run(priority):
+                self.active[priority] += 1
+                taken += 1
+        if taken:
+            metrics.inc("admission", outcome="admitted_extra", priority=priority)
+        return taken
+
+    def release(self, priority: str, service_s: float | None = None, slots: int = 1):
+        with self._cond:
+            self.active[priority] -= slots
+            if service_s is not None:
+                self.service_s[priority] = 0.8 * self.service_s[priority] + 0.2 * service_s
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, priority: str = "interactive"):
+        """Hold a slot for the block; yields the seconds spent queueing."""
+        waited = self.acquire(priority)
+        t0 = time.monotonic()
+        try:
+            yield waited
+        finally:
+            self.release(priority, time.monotonic() - t0)
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            return {"capacity": self.capacity, "reserved_interactive": self.reserved,
+                    "active": dict(self.active), "waiting": dict(self.waiting),
+                    "service_s": {p: round(v, 3) for p, v in self.service_s.items()}}
+
+
+# Process-wide instances
+rate_limiter = RateLimiter()
+admission = AdmissionController()
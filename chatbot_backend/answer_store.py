@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from .llm import normalize_query
+from .metrics import metrics
+
+# Precomputed answers for known questions (scripts/precompute_answers.py fills it offline).
+# One SQLite row per question: answer, the context documents it was generated from, and the
+# corpus version it is valid for. /chat serves a row only when its version matches the live
+# corpus, so a corpus update never serves stale answers; the next precompute run re-tags rows
+# whose contexts and source rows are unchanged and regenerates only the rest.
+#   exact:      sha1(normalize_query(question))
+#   near-exact: sha1(loose_form(question)) - punctuation, filler words and plural "s" dropped
+# Disabled unless ANSWER_STORE_PATH is set; the file may be shared by all workers (WAL mode).
+
+ANSWER_STORE_PATH = os.getenv("ANSWER_STORE_PATH", "")
+ANSWER_STORE_NEAR = os.getenv("ANSWER_STORE_NEAR", "1") != "0"
+
+_FILLER = {"a", "an", "the", "is", "are", "was", "were", "be", "do", "does", "did", "of", "at", "in", "on",
+           "to", "for", "please", "can", "could", "you", "tell", "me", "i", "know", "want", "would", "like",
+           "iit", "ropar", "iitrpr"}
+_CONTRACTIONS = {"what's": "what is", "who's": "who is", "where's": "where is", "when's": "when is",
+                 "how's": "how is", "whats": "what is", "whos": "who is", "wheres": "where is"}
+
+
+def loose_form(query: str) -> str:
+    """Near-exact form: contractions expanded, filler words and punctuation dropped, plurals folded."""
+    tokens = []
+    for t in re.findall(r"[a-z0-9']+", normalize_query(query)):
+        for w in _CONTRACTIONS.get(t, t).replace("'", "").split():
+            if w in _FILLER:
+                continue
+            tokens.append(w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w)
+    return " ".join(tokens)
+
+
+def question_key(query: str) -> str:
+    return hashlib.sha1(normalize_query(query).encode("utf-8")).hexdigest()
+
+
+def loose_key(query: str) -> str:
+    return hashlib.sha1(loose_form(query).encode("utf-8")).hexdigest()
+
+
+class AnswerStore:
+    """question key -> answer row. One connection per (process, thread); read errors are non-fatal."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            " key TEXT PRIMARY KEY, loose_key TEXT NOT NULL, question TEXT NOT NULL, answer TEXT NOT NULL,"
+            " contexts TEXT NOT NULL, context_ids TEXT NOT NULL, source_hash TEXT NOT NULL,"
+            " corpus_version TEXT NOT NULL, computed_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS answers_loose ON answers (loose_key, corpus_version)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        # Connections must not cross a fork; open a fresh one in each worker
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def lookup(self, question: str, corpus_version: str, near: bool = ANSWER_STORE_NEAR) -> dict | None:
+        """``{"answer", "question", "contexts", "match": "exact"|"near"}`` valid for ``corpus_version``, or None."""
+        if not corpus_version:
+            return None
+        try:
+            conn = self._connect()
+            row = conn.execute("SELECT question, answer, contexts FROM answers WHERE key = ? AND corpus_version = ?",
+                               (question_key(question), corpus_version)).fetchone()
+            match = "exact"
+            if row is None and near and loose_form(question):
+                row = conn.execute("SELECT question, answer, contexts FROM answers"
+                                   " WHERE loose_key = ? AND corpus_version = ? LIMIT 1",
+                                   (loose_key(question), corpus_version)).fetchone()
+                match = "near"
+        except sqlite3.Error as e:
+            print(f"[ANSWER-STORE] read failed: {e}")
+            return None
+        metrics.inc("answer_store", outcome=match if row else "miss")
+        if row is None:
+            return None
+        return {"question": row[0], "answer": row[1], "contexts": json.loads(row[2]), "match": match}
+
+    def put_many(self, rows: list[dict], corpus_version: str):
+        """Insert or replace rows of ``{"question", "answer", "contexts": [{"page_content", "metadata"}],
+        "context_ids", "source_hash"}``."""
+        now = time.time()
+        self._connect().executemany(
+            "INSERT OR REPLACE INTO answers (key, loose_key, question, answer, contexts, context_ids, source_hash,"
+            " corpus_version, computed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(question_key(r["question"]), loose_key(r["question"]), r["question"], r["answer"],
+              json.dumps(r["contexts"], ensure_ascii=False), json.dumps(r["context_ids"]), r["source_hash"],
+              corpus_version, now) for r in rows],
+        )
+
+    def revalidate(self, corpus_version: str, doc_ids: set, source_hashes: dict) -> dict:
+        """Carry rows over to ``corpus_version`` when every context document still exists unchanged
+        (``doc_ids``) and the question's source rows hash the same (``source_hashes``: key -> hash).
+        Returns counts of rows already current, re-tagged and stale."""
+        conn = self._connect()
+        rows = conn.execute("SELECT key, context_ids, source_hash, corpus_version FROM answers").fetchall()
+        counts = {"current": 0, "retagged": 0, "stale": 0}
+        retag = []
+        for key, context_ids, source_hash, version in rows:
+            if version == corpus_version:
+                counts["current"] += 1
+            elif (source_hashes.get(key) == source_hash
+                  and all(i in doc_ids for i in json.loads(context_ids))):
+                retag.append(key)
+            else:
+                counts["stale"] += 1
+        conn.executemany("UPDATE answers SET corpus_version = ? WHERE key = ?", [(corpus_version, k) for k in retag])
+        counts["retagged"] = len(retag)
+        return counts
+
+    def current_keys(self, corpus_version: str) -> set:
+        rows = self._connect().execute("SELECT key FROM answers WHERE corpus_version = ?", (corpus_version,))
+        return {k for (k,) in rows}
+
+    def prune(self, corpus_version: str) -> int:
+        """Delete rows not valid for ``corpus_version``."""
+        return self._connect().execute("DELETE FROM answers WHERE corpus_version != ?", (corpus_version,)).rowcount
+
+    def stats(self) -> dict:
+        try:
+            rows = self._connect().execute("SELECT corpus_version, COUNT(*) FROM answers GROUP BY corpus_version")
+            return {"path": self.path, "rows": {v[:12]: n for v, n in rows}}
+        except sqlite3.Error as e:
+            return {"path": self.path, "error": str(e)}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_answer_store() -> AnswerStore | None:
+    """The process-wide store at ANSWER_STORE_PATH, or None when it is not configured."""
+    global _store
+    if not ANSWER_STORE_PATH:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = AnswerStore(ANSWER_STORE_PATH)
+        return _store
@@ -1,78 +1,406 @@
-from flask import Flask, request, jsonify, make_response
+from flask import Blueprint, Flask, Response, request, jsonify, make_response, stream_with_context
 from flask_cors import CORS, cross_origin
-from .processing1 import load_csv, split_documents
-from .db import build_or_load_db
-from .llm import answer_question
-from langchain_community.retrievers import BM25Retriever
+from werkzeug.exceptions import RequestEntityTooLarge
+from .processing1 import corpus_version
+from .health import StartupStatus
+from .sessions import SessionStore
+from .metrics import metrics
+from .router import build_router, route_message
+from .singleflight import SingleFlight
+from .admission import Overloaded, admission, priority_class, rate_limiter
+from .answer_store import get_answer_store
+from .profiling import profiler, slow_log
+from .llm import BATCH_LLM_CONCURRENCY, answer_question, answer_batch, is_follow_up, normalize_query
+import hmac
+import json
 import os
+import threading
+import time
 import traceback
-import speech_recognition as sr
-
-app = Flask(__name__)
-CORS(app, resources={
-    r"/*": {
-        "origins": ["http://localhost:5173", "http://127.0.0.1:5173",
-                    "http://localhost:5174", "http://127.0.0.1:5174"
-        ],
-        "methods": ["GET", "POST", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"]
-    }
-})
+from contextlib import contextmanager, nullcontext
+
+# Heavy dependencies (langchain, sentence_transformers/torch, chromadb, speech_recognition) are
+# imported inside the loaders below, so the server binds its port immediately and warms up in
+# the background. /healthz is liveness, /readyz reports readiness of each component.
 
-# API Key for authentication
+# API Key for authentication: when set, /chat and /chat/batch require it as X-API-Key or
+# "Authorization: Bearer <key>". Left at the placeholder, requests are not authenticated.
 API_KEY = os.getenv('API_KEY', 'your_api_key_here')
+REQUIRE_API_KEY = API_KEY not in ("", "your_api_key_here")
 
-# --- Load CSV and build vector DB once on startup ---
-CSV_PATH = r"C:\Users\aniru\Chatbot_test1-1\data\DATA_FAQ_EXPANDED.csv"
-PERSIST_DIR = r"C:\Users\aniru\Chatbot_test1-1\chromaDb_expanded"
+# --- Data locations (overridable for containers / multi-worker deployments) ---
+CSV_PATH = os.getenv("CSV_PATH", r"C:\Users\aniru\Chatbot_test1-1\data\DATA_FAQ_EXPANDED.csv")
+PERSIST_DIR = os.getenv("VECTOR_DB_PATH", r"C:\Users\aniru\Chatbot_test1-1\chromaDb_expanded")
+COLLECTION_NAME = "iitrpr_faq"
 
-if not os.path.exists(PERSIST_DIR):
-    os.makedirs(PERSIST_DIR)
+# "chroma": Chroma client + in-memory BM25 in every process (single-process dev server).
+# "mmap":   read-only index artifact (embeddings + BM25 postings) memory-mapped and shared by all workers.
+INDEX_BACKEND = os.getenv("INDEX_BACKEND", "chroma").lower()
+ARTIFACT_DIR = os.getenv("INDEX_ARTIFACT_DIR", PERSIST_DIR.rstrip("/\\") + "_artifact")
+# Storage for artifacts exported by this process (float32 | float16 | int8); compressed artifacts are
+# searched first in that dtype and the top candidates re-scored in float32 unless INDEX_RESCORE=0.
+INDEX_DTYPE = os.getenv("INDEX_DTYPE", "float32").lower()
+INDEX_RESCORE = os.getenv("INDEX_RESCORE", "1") != "0"
 
-# Load and process documents
-print("Loading documents...")
-documents = load_csv(CSV_PATH)
-print(f"Loaded {len(documents)} documents from CSV")
+# Upper bound on questions per /chat/batch request
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "500"))
 
-# Split documents into chunks with better settings
-print("Splitting documents into chunks...")
-chunked_docs = split_documents(documents, chunk_size=1000, chunk_overlap=200)
-print(f"Split into {len(chunked_docs)} chunks")
+# Hot reload: every CORPUS_WATCH_S seconds (0 disables) CSV_PATH is checked for changes; POST /admin/reload
+# triggers the same rebuild. New indexes are built on a background thread while the old ones keep
+# serving, then swapped in with one reference assignment. RELOAD_WORKERS embedding threads keep the
+# rebuild from starving live requests; replaced Chroma collections are dropped RELOAD_GRACE_S later.
+CORPUS_WATCH_S = float(os.getenv("CORPUS_WATCH_S", "10"))
+RELOAD_WORKERS = int(os.getenv("RELOAD_WORKERS", "1"))
+RELOAD_GRACE_S = float(os.getenv("RELOAD_GRACE_S", "60"))
+# Required as X-Admin-Token on /admin/* endpoints; when unset they only answer loopback clients
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
 
-# Debug: Print sample chunks
-print("\nSample chunks:")
-for i, doc in enumerate(chunked_docs[:3]):
-    print(f"\nChunk {i+1} (length: {len(doc.page_content)}):")
-    print(f"Content: {doc.page_content[:200]}...")
-    print(f"Metadata: {doc.metadata}")
+# Active indexes. Replaced as a whole (never mutated in place); handlers take one snapshot per request.
+# "router" holds the small-talk / off-domain router built from the same corpus (see router.py).
+_indexes = {"vectordb": None, "bm25_retriever": None, "corpus_version": "", "router": None}
 
-# Build or load the vector database
-COLLECTION_NAME = "iitrpr_faq"
-print("\nBuilding/loading vector database...")
-vectordb = build_or_load_db(chunked_docs, persist_dir=PERSIST_DIR, collection_name=COLLECTION_NAME)
+# Identical questions arriving while one is being answered wait for that answer (see singleflight.py).
+# Followers give up after SINGLEFLIGHT_WAIT_S and answer on their own.
+SINGLEFLIGHT_WAIT_S = float(os.getenv("SINGLEFLIGHT_WAIT_S", "120"))
+chat_flights = SingleFlight("chat_singleflight")
 
-# Create sparse BM25 retriever for hybrid retrieval
-print("Creating BM25 retriever for hybrid retrieval...")
-bm25_retriever = BM25Retriever.from_documents(chunked_docs)
+# Conversation state for follow-up turns, keyed by the client's session_id (bounded LRU + TTL)
+sessions = SessionStore()
 
-print("Backend ready. Vector DB loaded.")
+# Startup state per component; "llm" (Ollama warm-up) and "stt" are reported but not required for readiness.
+status = StartupStatus({"embeddings": True, "indexes": True, "reranker": True, "llm": False, "stt": False})
 
-def speech_to_text(audio_file):
-    """Convert audio file to text using Google Speech Recognition."""
-    recognizer = sr.Recognizer()
+
+# Reload bookkeeping, reported by /readyz
+_reload_lock = threading.Lock()
+_reload_state = {"running": False, "last": None}
+_watcher_pid = None
+
+
+def _load_chroma_indexes(phase=None, workers=None) -> dict:
+    from .chunking import new_stats, report
+    from .processing1 import chunking_id, iter_chunks, iter_csv_documents
+    from .db import build_or_load_db, get_embeddings
+    from .dedup import report_path_for
+    from .ingest import ingest_key, versioned_collection
+    from langchain_community.retrievers import BM25Retriever
+
+    phase = phase or status.phase
+    if not os.path.exists(PERSIST_DIR):
+        os.makedirs(PERSIST_DIR)
+    version = corpus_version(CSV_PATH)
+    collection = versioned_collection(COLLECTION_NAME, version)
+
+    # CSV rows stream through near-duplicate collapse and chunking (CHUNKER) into the batched ingest.
+    # The in-memory BM25 retriever keeps every chunk anyway; they are collected on the way past.
+    chunk_stats = new_stats()
+    chunks = iter_chunks(iter_csv_documents(CSV_PATH), chunk_stats,
+                         dedup_report=report_path_for(os.path.join(PERSIST_DIR, collection)))
+    chunked_docs = []
+
+    def collect(docs):
+        for doc in docs:
+            chunked_docs.append(doc)
+            yield doc
+
+    print("\nBuilding/loading vector database...")
+    with phase("vectordb"):
+        key = ingest_key(version, collection, get_embeddings().model_id, chunking_id())
+        stream = collect(chunks)
+        vectordb = build_or_load_db(stream, persist_dir=PERSIST_DIR, collection_name=collection, key=key,
+                                    workers=workers)
+        for _ in stream:
+            pass  # an up-to-date index doesn't read its input; BM25 still needs the chunks
+    print(f"[CHUNK] {report(chunk_stats)}")
+
+    # Create sparse BM25 retriever for hybrid retrieval
+    print("Creating BM25 retriever for hybrid retrieval...")
+    with phase("bm25"):
+        bm25_retriever = BM25Retriever.from_documents(chunked_docs)
+    return {"vectordb": vectordb, "bm25_retriever": bm25_retriever, "corpus_version": version,
+            "collection": collection}
+
+
+def _load_mmap_indexes(phase=None, workers=None) -> dict:
+    from .chunking import new_stats, report
+    from .processing1 import chunking_id, iter_chunks, iter_csv_documents
+    from .db import get_embeddings, EMBED_MODEL
+    from .dedup import report_path_for
+    from .index_artifact import export_artifact, load_artifact, read_manifest, ArtifactVectorStore, ArtifactBM25Retriever
+
+    phase = phase or status.phase
+    version = corpus_version(CSV_PATH) if os.path.exists(CSV_PATH) else ""
+    # Artifacts from before token-aware chunking carry no "chunking" entry
+    chunking = chunking_id()
+    stale = lambda m: (m is None or (version and m.get("corpus_version") != version)
+                       or m.get("dtype", "float32") != INDEX_DTYPE
+                       or (version and m.get("chunking", "chars:1000:200") != chunking))
+    if stale(read_manifest(ARTIFACT_DIR)):
+        # Every worker watches the CSV; the first to get the lock exports, the rest load its result
+        with _artifact_lock():
+            if stale(read_manifest(ARTIFACT_DIR)):
+                print(f"[INFO] Index artifact at {ARTIFACT_DIR} missing or stale; exporting from {CSV_PATH}")
+                # Read, chunk, embed and write in one streaming pass
+                with phase("export_artifact"):
+                    chunk_stats = new_stats()
+                    chunks = iter_chunks(iter_csv_documents(CSV_PATH), chunk_stats,
+                                         dedup_report=report_path_for(ARTIFACT_DIR))
+                    export_artifact(chunks, get_embeddings(), ARTIFACT_DIR, model_name=EMBED_MODEL,
+                                    corpus_version=version, dtype=INDEX_DTYPE, chunking=chunking)
+                print(f"[CHUNK] {report(chunk_stats)}")
+    with phase("load_artifact"):
+        artifact = load_artifact(ARTIFACT_DIR, mmap=True, rescore=INDEX_RESCORE)
+    return {
+        "vectordb": ArtifactVectorStore(artifact, get_embeddings()),
+        "bm25_retriever": ArtifactBM25Retriever(artifact),
+        "corpus_version": artifact.corpus_version,
+    }
+
+
+@contextmanager
+def _artifact_lock():
+    """Exclusive lock across processes on the host around artifact exports (no-op without fcntl)."""
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(ARTIFACT_DIR)), exist_ok=True)
+    with open(ARTIFACT_DIR.rstrip("/\\") + ".lock", "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _load_indexes(phase=None, workers=None) -> dict:
+    indexes = (_load_mmap_indexes if INDEX_BACKEND == "mmap" else _load_chroma_indexes)(phase, workers)
+    with (phase or status.phase)("router"):
+        indexes["router"] = _build_router(indexes["vectordb"])
+    return indexes
+
+
+def _build_router(vectordb):
+    """Router for ``vectordb``; None (rules only) if the corpus vectors can't be read."""
     try:
-        with sr.AudioFile(audio_file) as source:
-            audio = recognizer.record(source)
-        text = recognizer.recognize_google(audio)
-        return text
-    except sr.UnknownValueError:
-        return "Could not understand audio"
-    except sr.RequestError as e:
-        return f"STT service error: {e}"
+        return build_router(vectordb)
+    except Exception as e:
+        print(f"[WARN] Router unavailable, falling back to rules only: {e}")
+        return None
+
+
+def init_state():
+    """Load models and indexes, tracking each component in ``status``.
+
+    Runs synchronously in the parent of a pre-fork server (so workers share the result) or on
+    a background thread for the single-process dev server.
+    """
+    global _indexes
+    t0 = time.perf_counter()
+    from .db import get_embeddings
+    from .llm import get_cross_encoder
+
+    with status.component("embeddings"):
+        get_embeddings().embed_query("warm up")
+    print(f"[INFO] Loading indexes (backend={INDEX_BACKEND})")
+    with status.component("indexes"):
+        _indexes = _load_indexes()
+    with status.component("reranker"):
+        # one tiny prediction pulls the weights in and initializes the kernels
+        get_cross_encoder().predict([("warm up", "warm up")])
+    print(f"Backend ready. Vector DB loaded. ({time.perf_counter() - t0:.1f}s)")
+
+
+@contextmanager
+def _reload_phase(name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        print(f"[RELOAD] phase {name}: {time.perf_counter() - t0:.2f}s")
+
+
+def _warm_indexes(indexes: dict):
+    """One dense and one BM25 query so the first user request after the swap isn't the one paying
+    for page faults / lazy index loads."""
+    try:
+        indexes["vectordb"].similarity_search("IIT Ropar", k=5)
+        indexes["bm25_retriever"].invoke("IIT Ropar")
+    except Exception as e:
+        print(f"[RELOAD] warm-up query failed: {e}")
+
+
+def _retire(old: dict, new: dict):
+    """Drop a replaced Chroma collection once requests that took the old snapshot have finished."""
+    name = old.get("collection")
+    if not name or name == new.get("collection") or old.get("vectordb") is None:
+        return
+
+    def _drop():
+        from .ingest import checkpoint_path
+        try:
+            old["vectordb"].delete_collection()
+            path = checkpoint_path(PERSIST_DIR, name)
+            if os.path.exists(path):
+                os.remove(path)
+            print(f"[RELOAD] dropped collection {name}")
+        except Exception as e:
+            print(f"[RELOAD] could not drop collection {name}: {e}")
+
+    timer = threading.Timer(RELOAD_GRACE_S, _drop)
+    timer.daemon = True
+    timer.start()
+
+
+def reload_indexes(reason: str) -> bool:
+    """Rebuild the indexes from CSV_PATH and swap them in. Returns False if a reload is already
+    running or the rebuild failed; on failure the current indexes keep serving."""
+    global _indexes
+    if not _reload_lock.acquire(blocking=False):
+        return False
+    from .llm import invalidate_corpus_caches
+    t0 = time.perf_counter()
+    _reload_state["running"] = True
+    try:
+        current = _indexes
+        version = corpus_version(CSV_PATH)
+        if version == current.get("corpus_version"):
+            print(f"[RELOAD] ({reason}) corpus unchanged ({version[:12]})")
+            _reload_state["last"] = {"reason": reason, "at": time.time(), "changed": False, "corpus_version": version}
+            return True
+        print(f"[RELOAD] ({reason}) corpus {current.get('corpus_version', '')[:12]} -> {version[:12]}; building")
+        new = _load_indexes(phase=_reload_phase, workers=RELOAD_WORKERS)
+        _warm_indexes(new)
+        _indexes = new  # handlers snapshot _indexes once per request, so the swap is atomic for them
+        invalidate_corpus_caches()
+        sessions.clear()  # candidate pools point into the old corpus
+        _retire(current, new)
+        seconds = time.perf_counter() - t0
+        metrics.inc("corpus_reloads", outcome="ok")
+        _reload_state["last"] = {"reason": reason, "at": time.time(), "changed": True,
+                                 "corpus_version": new["corpus_version"], "seconds": round(seconds, 2)}
+        print(f"[RELOAD] swapped in corpus {new['corpus_version'][:12]} in {seconds:.1f}s")
+        return True
+    except Exception as e:
+        metrics.inc("corpus_reloads", outcome="error")
+        _reload_state["last"] = {"reason": reason, "at": time.time(), "error": str(e)}
+        print(f"[RELOAD] failed, keeping the current indexes: {e}")
+        traceback.print_exc()
+        return False
+    finally:
+        _reload_state["running"] = False
+        _reload_lock.release()
+
+
+def start_corpus_watcher(interval: float = CORPUS_WATCH_S):
+    """Poll CSV_PATH and reload when it changes. One watcher per process (call again after fork)."""
+    global _watcher_pid
+    if interval <= 0 or _watcher_pid == os.getpid():
+        return
+    _watcher_pid = os.getpid()
+
+    def _signature():
+        st = os.stat(CSV_PATH)
+        return st.st_mtime_ns, st.st_size
+
+    def _run():
+        seen, pending = None, None
+        while True:
+            time.sleep(interval)
+            try:
+                sig = _signature()
+            except OSError:
+                continue
+            if sig == seen:
+                continue
+            # Act once the file has stopped changing for one interval (the writer may be mid-copy)
+            if sig != pending:
+                pending = sig
+                continue
+            seen, pending = sig, None
+            if status.is_ready():
+                reload_indexes("watch")
+            else:
+                seen = None  # still starting up; look again later
+
+    threading.Thread(target=_run, name="corpus-watcher", daemon=True).start()
+    print(f"[RELOAD] watching {CSV_PATH} every {interval:g}s")
+
+
+def warm_llm():
+    """Ask Ollama for a one-token reply so the model is resident before the first user request.
+    Not required for readiness: a slow or absent Ollama only degrades /chat, it doesn't block it."""
+    from .llm import get_llm
+    try:
+        with status.component("llm"):
+            get_llm().invoke("Reply with OK.")
+    except Exception:
+        pass
+
+
+def warm_stt():
+    """Load the STT backend (the Vosk model for STT_BACKEND=vosk). Not required for readiness."""
+    from .stt import get_speech_service
+    try:
+        with status.component("stt"):
+            get_speech_service()
+    except Exception:
+        pass
+
+
+def start_background_warmup():
+    def _run():
+        try:
+            init_state()
+        except Exception as e:
+            print(f"[ERROR] Warm-up failed: {e}")
+            traceback.print_exc()
+
+    threading.Thread(target=_run, name="warmup", daemon=True).start()
+    threading.Thread(target=warm_llm, name="warmup-llm", daemon=True).start()
+    threading.Thread(target=warm_stt, name="warmup-stt", daemon=True).start()
+    start_corpus_watcher()
+
+
+def speech_to_text(audio_file):
+    """Transcribe an uploaded clip with the configured STT backend (stt.STT_BACKEND) on its worker pool.
+    The parsed upload is size-checked and decoded in place, in chunks; it is never read whole."""
+    from .stt import get_speech_service, spool_upload
+    return get_speech_service().transcribe(spool_upload(audio_file.stream))
 
 # --- API Endpoints ---
+bp = Blueprint("chatbot", __name__)
+
+
+@bp.route("/healthz", methods=["GET"])
+def healthz():
+    """Liveness: the process is up and serving HTTP."""
+    return jsonify({"status": "alive", "uptime_s": round(time.time() - status.started, 3)})
+
+
+@bp.route("/readyz", methods=["GET"])
+def readyz():
+    """Readiness: every required component is warm."""
+    snap = status.snapshot()
+    snap["corpus_version"] = _indexes.get("corpus_version", "")
+    snap["reload"] = dict(_reload_state)
+    from . import db
+    if db._embeddings is not None:
+        snap["embedding_cache"] = db._embeddings.stats()
+    store = get_answer_store()
+    if store is not None:
+        snap["answer_store"] = store.stats()
+    return jsonify(snap), (200 if snap["ready"] else 503)
 
-@app.route("/stt", methods=["POST", "OPTIONS"])
+
+@bp.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    """Per-process counters and latency percentiles (STT per backend, ...) and admission state."""
+    return jsonify({**metrics.snapshot(), "admission": admission.snapshot()})
+
+
+@bp.route("/stt", methods=["POST", "OPTIONS"])
 @cross_origin()
 def stt():
     if request.method == "OPTIONS":
@@ -80,29 +408,192 @@ def stt():
         return response
         
     try:
-        audio_file = request.files.get("audio")
+        from .stt import STT_MAX_BYTES, AudioLimitError, STTError, STTTimeout
+        # Refuse oversized bodies before the multipart parser reads them (413 from werkzeug)
+        request.max_content_length = STT_MAX_BYTES + 64 * 1024
+        try:
+            audio_file = request.files.get("audio")
+        except RequestEntityTooLarge:
+            return jsonify({"error": f"Audio upload exceeds {STT_MAX_BYTES / 1e6:.1f} MB"}), 413
         if not audio_file:
             return jsonify({"error": "No audio file provided"}), 400
         
-        text = speech_to_text(audio_file)
+        try:
+            text = speech_to_text(audio_file)
+        except AudioLimitError as e:
+            return jsonify({"error": str(e)}), 413
+        except Overloaded as e:
+            return _too_busy(e, {})
+        except STTTimeout as e:
+            return jsonify({"error": str(e)}), 504
+        except STTError as e:
+            print(f"[ERROR] STT failed: {e}")
+            return jsonify({"error": str(e)}), 502
         return jsonify({"text": text})
     
     except Exception as e:
         print(f"[ERROR] STT failed: {e}")
         return jsonify({"error": "STT processing failed"}), 500
 
-@app.route("/chat", methods=["POST", "OPTIONS"])
+def _admin_allowed() -> bool:
+    if ADMIN_TOKEN:
+        return hmac.compare_digest(request.headers.get("X-Admin-Token", "").encode(), ADMIN_TOKEN.encode())
+    return request.remote_addr in ("127.0.0.1", "::1")
+
+
+@bp.route("/admin/reload", methods=["POST"])
+def admin_reload():
+    """Rebuild the indexes from CSV_PATH in the background and swap them in (202).
+    ``?wait=1`` blocks until done and returns the result. Reloads only this worker process;
+    the others pick the change up through their corpus watchers."""
+    if not _admin_allowed():
+        return jsonify({"error": "forbidden"}), 403
+    if not status.is_ready():
+        return jsonify({"error": "still starting up"}), 503
+    if _reload_lock.locked():
+        return jsonify({"started": False, "reload": dict(_reload_state)}), 409
+    if request.args.get("wait") in ("1", "true"):
+        t0 = time.time()
+        if reload_indexes("admin"):
+            return jsonify({"started": True, "reload": dict(_reload_state)})
+        last = _reload_state["last"] or {}
+        failed = "error" in last and last["at"] >= t0  # else another reload got the lock first
+        return jsonify({"started": failed, "reload": dict(_reload_state)}), (500 if failed else 409)
+    threading.Thread(target=reload_indexes, args=("admin",), name="corpus-reload", daemon=True).start()
+    return jsonify({"started": True, "reload": dict(_reload_state)}), 202
+
+
+def _presented_key() -> str:
+    key = request.headers.get("X-API-Key", "")
+    auth = request.headers.get("Authorization", "")
+    if not key and auth[:7].lower() == "bearer ":
+        key = auth[7:].strip()
+    return key
+
+
+def _too_busy(e: Overloaded, body: dict):
+    print(f"[ADMISSION] 429 {e.reason} for {request.remote_addr} (retry after {e.retry_after}s)")
+    response = jsonify({**body, "error": e.reason, "retry_after": e.retry_after})
+    response.headers["Retry-After"] = str(e.retry_after)
+    return response, 429
+
+
+def _check_client(body: dict):
+    """API key and per-client rate limit. None when the request may proceed, else the 401/429 response.
+    Clients are told apart by key and address, so one flooding client doesn't throttle the rest."""
+    key = _presented_key()
+    if REQUIRE_API_KEY and not hmac.compare_digest(key.encode(), API_KEY.encode()):
+        metrics.inc("admission", outcome="unauthorized", priority="-")
+        return jsonify({**body, "error": "invalid or missing API key"}), 401
+    try:
+        rate_limiter.check(f"{key[:16]}@{request.remote_addr}")
+    except Overloaded as e:
+        metrics.inc("admission", outcome="rate_limited", priority=priority_class(request.headers.get("X-Priority")))
+        return _too_busy(e, body)
+    return None
+
+
+def stored_answer(indexes: dict, message: str, stats: dict, session: dict | None) -> str | None:
+    """Precomputed answer for ``message`` under the live corpus version (see answer_store.py), or None.
+    A hit seeds the session with its context documents, so follow-ups re-score those."""
+    store = get_answer_store()
+    if store is None or (session is not None and session.get("last") and is_follow_up(message)):
+        return None
+    hit = store.lookup(message, indexes["corpus_version"])
+    if hit is None:
+        return None
+    stats["answer_store"] = hit["match"]
+    if session is not None and hit["contexts"]:
+        from langchain_core.documents import Document
+        session["last"] = {"query": hit["question"],
+                           "candidates": [Document(page_content=c["page_content"], metadata=c.get("metadata") or {})
+                                          for c in hit["contexts"]]}
+    return hit["answer"]
+
+
+@bp.route("/admin/profile", methods=["GET", "POST"])
+def admin_profile():
+    """POST profiles the next ``?requests=N`` /chat requests of this worker process (CPU samples, and
+    tracemalloc unless ``?memory=0``); GET shows what is armed and the latest profiles."""
+    if not _admin_allowed():
+        return jsonify({"error": "forbidden"}), 403
+    if request.method == "POST":
+        try:
+            n = int(request.args.get("requests", "1"))
+        except ValueError:
+            return jsonify({"error": "'requests' must be an integer"}), 400
+        return jsonify(profiler.arm(n, memory=request.args.get("memory", "1") not in ("0", "false")))
+    return jsonify(profiler.state())
+
+
+@bp.route("/admin/slow", methods=["GET"])
+def admin_slow():
+    """Slowest /chat requests of this worker in the last SLOW_LOG_WINDOW_S, with stage timings."""
+    if not _admin_allowed():
+        return jsonify({"error": "forbidden"}), 403
+    return jsonify({"window_s": slow_log.window_s, "requests": slow_log.snapshot()})
+
+
+def answer_shared(indexes: dict, message: str, stats: dict, session: dict | None,
+                  priority: str = "interactive") -> str:
+    """answer_question behind the single-flight layer, keyed by corpus version + normalized text.
+
+    Follow-ups depend on the caller's session and always run on their own. Otherwise the
+    computation runs against a scratch session, and every caller copies the resulting candidate
+    pool into its own session, so a coalesced request still supports follow-ups. Only the
+    computation takes an admission slot, so coalesced followers never queue for one.
+    Raises Overloaded when no slot is free within the priority's SLO."""
+    def compute(_flight):
+        own_stats, scratch = dict(stats), {}
+        with admission.slot(priority) as waited:
+            own_stats["queue_s"] = round(waited, 3)
+            reply = answer_question(indexes["vectordb"], message, bm25_retriever=indexes["bm25_retriever"],
+                                    corpus_version=indexes["corpus_version"], stats=own_stats, session=scratch)
+        return reply, own_stats, scratch.get("last")
+
+    if session is not None and session.get("last") and is_follow_up(message):
+        with admission.slot(priority) as waited:
+            stats["queue_s"] = round(waited, 3)
+            return answer_question(indexes["vectordb"], message, bm25_retriever=indexes["bm25_retriever"],
+                                   corpus_version=indexes["corpus_version"], stats=stats, session=session)
+    key = (indexes["corpus_version"], normalize_query(message))
+    try:
+        (reply, shared_stats, last), shared = chat_flights.do(key, compute, timeout=SINGLEFLIGHT_WAIT_S)
+    except TimeoutError:
+        (reply, shared_stats, last), shared = compute(None), False
+    stats.update(shared_stats, coalesced=shared)
+    if session is not None and last:
+        session["last"] = last
+    return reply
+
+
+def route(message: str, indexes: dict, session: dict | None = None) -> dict:
+    """Router decision for ``message``; rules only until the models and indexes are ready.
+    A follow-up to an earlier turn ("and his email?") is never refused as off-domain: it has no
+    domain words of its own, and answer_question resolves it against the session."""
+    decision = route_message(message, indexes.get("router") if status.is_ready() else None)
+    if decision["route"] == "off_domain" and session and session.get("last") and is_follow_up(message):
+        decision = dict(decision, route="domain", reply=None, by="follow_up")
+    return decision
+
+
+@bp.route("/chat", methods=["POST", "OPTIONS"])
 @cross_origin()
 def chat():
     if request.method == "OPTIONS":
         response = make_response()
         return response
-        
+
+    t_request = time.perf_counter()
     try:
         print("\n=== Request Headers ===")
         for header, value in request.headers.items():
-            print(f"{header}: {value}")
-            
+            print(f"{header}: {value}" if header not in ("X-Api-Key", "Authorization") else f"{header}: <redacted>")
+
+        rejected = _check_client({"answer": "Too many requests. Please wait a moment and try again."})
+        if rejected:
+            return rejected
+
         if not request.is_json:
             print("Request is not JSON")
             return jsonify({"error": "Request must be JSON"}), 400
@@ -114,20 +605,39 @@ def chat():
         if not user_message:
             return jsonify({"answer": "No message received"}), 400
         
-        # Greeting detection
-        greeting_words = ["hello", "hi", "hey", "good morning", "good afternoon", "good evening", "how are you", "what's up", "greetings", "good day"]
-        if any(word in user_message.lower() for word in greeting_words):
-            return jsonify({"answer": "Hello! I'm the IIT Ropar chatbot. How can I help you today?"})
+        session_id = data.get("session_id") or request.headers.get("X-Session-Id")
+        session = sessions.get(str(session_id)) if session_id else None
+        # Small talk and off-domain questions are answered without retrieval or the LLM
+        indexes = _indexes
+        decision = route(user_message, indexes, session)
+        if decision["reply"] is not None:
+            print(f"[ROUTER] {decision['route']} ({decision['by']}) {decision['scores']}")
+            return jsonify({"answer": decision["reply"], "stats": {"route": decision["route"]}})
+
+        if not status.is_ready():
+            response = jsonify({"answer": "The chatbot is still starting up. Please try again in a few seconds."})
+            response.headers["Retry-After"] = "5"
+            return response, 503
         
         print(f"\n[DEBUG] Processing message: {user_message}")
+        stats = {"route": decision["route"]}
+        # X-Profile: 1 (admin only) or POST /admin/profile turns on profiling for this request
+        profiled = profiler.take(forced=request.headers.get("X-Profile") == "1" and _admin_allowed())
         try:
-            reply = answer_question(vectordb, user_message, bm25_retriever=bm25_retriever)
+            with profiler.profile(user_message, stats) if profiled else nullcontext():
+                reply = stored_answer(indexes, user_message, stats, session)
+                if reply is None:
+                    reply = answer_shared(indexes, user_message, stats, session,
+                                          priority=priority_class(request.headers.get("X-Priority")))
             print(f"[DEBUG] Generated reply: {reply[:200]}")
+        except Overloaded as e:
+            return _too_busy(e, {"answer": "The chatbot is busy right now. Please try again in a few seconds."})
         except Exception as e:
             print(f"[ERROR] Failed to generate answer: {e}")
             reply = "I'm sorry, I encountered an error while processing your request. Please try again."
-        
-        response = jsonify({"answer": reply})
+
+        slow_log.record(time.perf_counter() - t_request, question=user_message[:200], stats=stats)
+        response = jsonify({"answer": reply, "stats": stats})
         return response
     
     except Exception as e:
@@ -135,8 +645,124 @@ def chat():
         print(f"[ERROR] Exception in /chat endpoint: {e}")
         traceback.print_exc()
         return jsonify({"answer": "I encountered an error while processing your request."}), 500
+
+
+@bp.route("/chat/batch", methods=["POST", "OPTIONS"])
+@cross_origin()
+def chat_batch():
+    """Answer a list of questions; one NDJSON line per answer, in completion order.
+
+    Request:  {"questions": ["...", ...], "max_concurrency": 4 (optional, clamped to 1..BATCH_LLM_CONCURRENCY)}
+    Response: {"index": i, "question": ..., "answer": ..., "stats": {...}} per question, then
+              {"done": true, "count": n, "seconds": ...}
+
+    Batches always run at "batch" priority and hold one admission slot per concurrent generation
+    while streaming: one is queued for (429 with Retry-After when none is free within the batch SLO),
+    then up to ``max_concurrency - 1`` more are taken if free at once, and the generation pool is
+    sized to the slots held.
+    """
+    if request.method == "OPTIONS":
+        return make_response()
+    rejected = _check_client({})
+    if rejected:
+        return rejected
+    data = request.get_json(silent=True) or {}
+    questions = data.get("questions")
+    if not isinstance(questions, list) or not questions:
+        return jsonify({"error": "'questions' must be a non-empty list"}), 400
+    if len(questions) > BATCH_MAX_QUESTIONS:
+        return jsonify({"error": f"At most {BATCH_MAX_QUESTIONS} questions per batch"}), 413
+    questions = [str(q or "").strip() for q in questions]
+    if not status.is_ready():
+        response = jsonify({"error": "The chatbot is still starting up. Please try again in a few seconds."})
+        response.headers["Retry-After"] = "5"
+        return response, 503
+    max_concurrency = data.get("max_concurrency", BATCH_LLM_CONCURRENCY)
+    if isinstance(max_concurrency, bool) or not isinstance(max_concurrency, (int, str)):
+        return jsonify({"error": "'max_concurrency' must be an integer"}), 400
+    try:
+        max_concurrency = min(max(1, int(max_concurrency)), BATCH_LLM_CONCURRENCY)
+    except ValueError:
+        return jsonify({"error": "'max_concurrency' must be an integer"}), 400
+    indexes = _indexes
+    try:
+        admission.acquire("batch")
+    except Overloaded as e:
+        return _too_busy(e, {})
+    slots = 1 + admission.acquire_more("batch", max_concurrency - 1)
+    t_admit = time.monotonic()
+
+    def generate():
+        t0 = time.perf_counter()
+        # Empty lines, small talk, off-domain and precomputed questions are answered directly;
+        # the rest go through the batch pipeline
+        store = get_answer_store()
+        todo = []
+        for i, q in enumerate(questions):
+            if not q:
+                yield json.dumps({"index": i, "question": q, "answer": "No message received", "stats": {}}) + "\n"
+                continue
+            decision = route(q, indexes)
+            hit = store.lookup(q, indexes["corpus_version"]) if store is not None and decision["reply"] is None else None
+            if decision["reply"] is not None:
+                yield json.dumps({"index": i, "question": q, "answer": decision["reply"],
+                                  "stats": {"route": decision["route"]}}) + "\n"
+            elif hit is not None:
+                yield json.dumps({"index": i, "question": q, "answer": hit["answer"],
+                                  "stats": {"route": "domain", "answer_store": hit["match"]}}) + "\n"
+            else:
+                todo.append(i)
+        if todo:
+            results = answer_batch(indexes["vectordb"], [questions[i] for i in todo],
+                                   bm25_retriever=indexes["bm25_retriever"], corpus_version=indexes["corpus_version"],
+                                   max_concurrency=slots)
+            for item in results:
+                item["index"] = todo[item["index"]]
+                item["stats"]["route"] = "domain"
+                yield json.dumps(item) + "\n"
+        seconds = time.perf_counter() - t0
+        print(f"[BATCH] answered {len(questions)} questions in {seconds:.1f}s")
+        yield json.dumps({"done": True, "count": len(questions), "seconds": round(seconds, 3)}) + "\n"
+
+    response = Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+    # Released when the stream ends or the client disconnects
+    response.call_on_close(lambda: admission.release("batch", time.monotonic() - t_admit, slots=slots))
+    return response
+
+
+def create_app(warm: str = os.getenv("WARMUP", "background")) -> Flask:
+    """App factory.
+
+    ``warm`` controls model/index loading:
+      "background" - return immediately and warm up on a thread (dev server, single process)
+      "sync"       - load before returning; used by the pre-fork server so workers share it
+      "none"       - don't load (tests, tooling)
+    """
+    t0 = time.perf_counter()
+    app = Flask(__name__)
+    CORS(app, resources={
+        r"/*": {
+            "origins": ["http://localhost:5173", "http://127.0.0.1:5173",
+                        "http://localhost:5174", "http://127.0.0.1:5174"
+            ],
+            "methods": ["GET", "POST", "OPTIONS"],
+            "allow_headers": ["Content-Type", "Authorization", "X-API-Key", "X-Priority", "X-Session-Id",
+                              "X-Admin-Token", "X-Profile"],
+            "expose_headers": ["Retry-After"]
+        }
+    })
+    app.register_blueprint(bp)
+    if warm == "sync":
+        init_state()
+        warm_llm()
+        warm_stt()
+    elif warm == "background":
+        start_background_warmup()
+    print(f"[STARTUP] app created in {(time.perf_counter() - t0) * 1000:.0f}ms (warm={warm})")
+    return app
+
+
 if __name__ == "__main__":
     # Run with single process (no reloader) so logs are consistent
+    app = create_app()
     app.run(port=5000, debug=True, use_reloader=False)
-
-
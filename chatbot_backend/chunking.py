@@ -0,0 +1,193 @@
+import os
+import re
+import threading
+
+from .ingest import batched
+
+# Token-aware chunking for the embedding index.
+# Lengths are measured with the embedder's own tokenizer (tokenizers, no torch), so every chunk fits
+# the model window instead of being silently truncated. A document that fits is kept whole. A longer
+# one is split at sentence / line boundaries of its answer, and each piece is prefixed with the
+# document's "Q: ..." line so it stays retrievable by the question. Pieces overlap by at most
+# CHUNK_OVERLAP_TOKENS of whole trailing sentences; a single sentence longer than the window is cut
+# at token boundaries. Documents are tokenized in batches with encode_batch, which runs in parallel
+# across documents on the tokenizers thread pool.
+# The tokenizer is only read from local files (ONNX export or Hugging Face cache), never downloaded;
+# without one, lengths fall back to a word/punctuation count and the report says "approximate".
+
+# Target chunk length in tokens, special tokens included; the encoder was trained on ~250 word pieces
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "256"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+# Hard input limit of the embedder: anything longer is truncated when embedded
+EMBED_MAX_TOKENS = int(os.getenv("EMBED_MAX_TOKENS", "512"))
+CHUNK_BATCH_DOCS = int(os.getenv("CHUNK_BATCH_DOCS", "512"))
+SPECIAL_TOKENS = 2  # [CLS] ... [SEP]
+
+_SENTENCE_END = re.compile(r"(?<=[.!?;])\s+(?=[\"'(\[A-Z0-9•\-*])|\s*\n+\s*")
+_APPROX_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+class TokenCounter:
+    """Token counts and token-boundary cuts from a tokenizers.Tokenizer, or approximate without one."""
+
+    def __init__(self, tokenizer=None):
+        self.tokenizer = tokenizer
+        self.exact = tokenizer is not None
+
+    def counts(self, texts: list[str]) -> list[int]:
+        if not texts:
+            return []
+        if self.tokenizer is None:
+            return [len(_APPROX_TOKEN.findall(t)) for t in texts]
+        return [len(e.ids) for e in self.tokenizer.encode_batch(list(texts), add_special_tokens=False)]
+
+    def cut(self, text: str, max_tokens: int) -> list[str]:
+        """``text`` in consecutive pieces of at most ``max_tokens`` tokens."""
+        if self.tokenizer is None:
+            spans = [m.span() for m in _APPROX_TOKEN.finditer(text)]
+        else:
+            spans = self.tokenizer.encode(text, add_special_tokens=False).offsets
+        pieces = []
+        for i in range(0, len(spans), max(1, max_tokens)):
+            window = spans[i:i + max_tokens]
+            end = spans[i + max_tokens][0] if i + max_tokens < len(spans) else len(text)
+            pieces.append(text[window[0][0]:end].strip())
+        return [p for p in pieces if p]
+
+
+_counter = None
+_counter_lock = threading.Lock()
+
+
+def _load_tokenizer():
+    """From local files only (ONNX export, else the Hugging Face cache): an index build never waits
+    on network retries for it."""
+    from tokenizers import Tokenizer
+    from .db import EMBED_MODEL
+    from .onnx_models import ONNX_MODEL_DIR, TOKENIZER_FILE
+
+    path = os.path.join(ONNX_MODEL_DIR, "embedder", TOKENIZER_FILE)
+    if not os.path.exists(path):
+        from huggingface_hub import try_to_load_from_cache
+        path = try_to_load_from_cache(EMBED_MODEL, TOKENIZER_FILE)
+        if not isinstance(path, str):
+            raise FileNotFoundError(f"no {TOKENIZER_FILE} for {EMBED_MODEL} in {ONNX_MODEL_DIR}/embedder "
+                                    f"or the Hugging Face cache")
+    tok = Tokenizer.from_file(path)
+    tok.no_truncation()
+    tok.no_padding()
+    return tok
+
+
+def get_token_counter() -> TokenCounter:
+    """Process-wide counter for the embedder's tokenizer (approximate when it can't be loaded)."""
+    global _counter
+    with _counter_lock:
+        if _counter is None:
+            try:
+                _counter = TokenCounter(_load_tokenizer())
+            except Exception as e:
+                print(f"[CHUNK] Embedder tokenizer unavailable ({e}); token counts are approximate")
+                _counter = TokenCounter(None)
+        return _counter
+
+
+def split_sentences(text: str) -> list[str]:
+    return [s.strip() for s in _SENTENCE_END.split(text) if s and s.strip()]
+
+
+def _split_document(doc, counter: TokenCounter, max_tokens: int, overlap_tokens: int) -> list:
+    from langchain_core.documents import Document
+
+    content = doc.page_content
+    header, body = "", content
+    # Keep the Q/A boundary: every piece carries the question line
+    cut = content.find("\nA:")
+    if content.startswith("Q:") and cut > 0:
+        header, body = content[:cut + 3] + " ", content[cut + 3:].strip()
+    budget = max_tokens - SPECIAL_TOKENS
+    header_tokens = counter.counts([header])[0] if header else 0
+    if header_tokens > budget // 2:
+        header, header_tokens, body = "", 0, content
+    room = budget - header_tokens
+
+    sentences, parts = [], split_sentences(body)
+    for sentence, n in zip(parts, counter.counts(parts)):
+        if n <= room:
+            sentences.append((sentence, n))
+        else:
+            pieces = counter.cut(sentence, room)
+            sentences.extend(zip(pieces, counter.counts(pieces)))
+
+    chunks, current, used = [], [], 0
+    for sentence, n in sentences:
+        if current and used + n > room:
+            chunks.append(current)
+            # Carry whole trailing sentences into the next piece, up to overlap_tokens
+            carry, carried = [], 0
+            for prev, m in reversed(current):
+                if carried + m > overlap_tokens or carried + m + n > room:
+                    break
+                carry.insert(0, (prev, m))
+                carried += m
+            current, used = carry, carried
+        current.append((sentence, n))
+        used += n
+    if current:
+        chunks.append(current)
+    return [Document(page_content=header + " ".join(s for s, _ in piece),
+                     metadata=dict(doc.metadata or {}, chunk=i, chunks=len(chunks)))
+            for i, piece in enumerate(chunks)]
+
+
+def new_stats() -> dict:
+    return {"documents": 0, "chunks": 0, "split_documents": 0, "tokens": 0, "max_tokens": 0,
+            "input_over_limit": 0, "truncated": 0}
+
+
+def _account(stats: dict, counts: list[int]):
+    stats["chunks"] += len(counts)
+    stats["tokens"] += sum(counts)
+    stats["max_tokens"] = max([stats["max_tokens"]] + counts)
+    stats["truncated"] += sum(1 for n in counts if n + SPECIAL_TOKENS > EMBED_MAX_TOKENS)
+
+
+def iter_token_chunks(documents, max_tokens: int = CHUNK_MAX_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+                      stats: dict | None = None, batch_docs: int = CHUNK_BATCH_DOCS):
+    """Lazily chunk an iterable of documents to at most ``max_tokens`` embedder tokens each.
+    ``stats`` (see new_stats) receives document/chunk counts and the truncation tally."""
+    counter = get_token_counter()
+    stats = new_stats() if stats is None else stats
+    stats["tokenizer"] = "exact" if counter.exact else "approximate"
+    stats["window"] = max_tokens
+    for batch in batched(documents, batch_docs):
+        counts = counter.counts([d.page_content for d in batch])
+        stats["documents"] += len(batch)
+        for doc, n in zip(batch, counts):
+            stats["input_over_limit"] += int(n + SPECIAL_TOKENS > EMBED_MAX_TOKENS)
+            if n + SPECIAL_TOKENS <= max_tokens:
+                _account(stats, [n])
+                yield doc
+                continue
+            pieces = _split_document(doc, counter, max_tokens, overlap_tokens)
+            stats["split_documents"] += 1
+            _account(stats, counter.counts([p.page_content for p in pieces]))
+            yield from pieces
+
+
+def iter_measured(chunks, stats: dict | None = None, batch_docs: int = CHUNK_BATCH_DOCS):
+    """Pass chunks made by another splitter through, tallying their token lengths into ``stats``."""
+    counter = get_token_counter()
+    stats = new_stats() if stats is None else stats
+    stats["tokenizer"] = "exact" if counter.exact else "approximate"
+    for batch in batched(chunks, batch_docs):
+        _account(stats, counter.counts([d.page_content for d in batch]))
+        yield from batch
+
+
+def report(stats: dict) -> str:
+    chunks = stats["chunks"] or 1
+    return (f"{stats['documents']} docs -> {stats['chunks']} chunks ({stats['split_documents']} docs split), "
+            f"mean {stats['tokens'] / chunks:.0f} / max {stats['max_tokens']} tokens, "
+            f"truncated at the {EMBED_MAX_TOKENS}-token embedder limit: {stats['truncated']} "
+            f"({stats['truncated'] / chunks:.1%}), tokenizer {stats.get('tokenizer', '?')}")
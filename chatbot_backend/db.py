@@ -1,17 +1,47 @@
 import os
-from langchain_community.vectorstores import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
+import threading
 
-def build_or_load_db(documents=None, persist_dir="chromaDb_csv1", collection_name=None):
+EMBED_MODEL = "sentence-transformers/multi-qa-MiniLM-L6-cos-v1"
+# "torch": HuggingFaceEmbeddings; "onnx": the exported model in <ONNX_MODEL_DIR>/embedder on ONNX Runtime
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch").lower()
+
+_embeddings = None
+_embeddings_lock = threading.Lock()
+
+
+def get_embeddings():
+    """Process-wide embedding model behind the query-embedding cache (see embedding_cache).
+    Loading it before fork lets workers share the weights."""
+    global _embeddings
+    with _embeddings_lock:
+        if _embeddings is None:
+            from .embedding_cache import CachedEmbeddings
+            if EMBED_BACKEND == "onnx":
+                from .onnx_models import OnnxEmbeddings, ONNX_MODEL_DIR, ONNX_QUANTIZED
+                base = OnnxEmbeddings(os.path.join(ONNX_MODEL_DIR, "embedder"))
+                model_id = f"{EMBED_MODEL}:onnx{':int8' if ONNX_QUANTIZED else ''}"
+            else:
+                from langchain_huggingface import HuggingFaceEmbeddings
+                base = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
+                model_id = EMBED_MODEL
+            _embeddings = CachedEmbeddings(base, model_id)
+    return _embeddings
+
+def build_or_load_db(documents=None, persist_dir="chromaDb_csv1", collection_name=None, key: str = "",
+                     workers: int | None = None):
     """
     Build or load a Chroma vector DB using HuggingFace embeddings.
     Matches backend usage: build_or_load_db(chunked_docs, persist_dir=..., collection_name=...)
+
+    Documents are written by the batched ingestion pipeline (see ingest.py). With ``key``
+    (ingest.ingest_key) an interrupted build resumes and an unchanged corpus is not re-embedded.
     """
     if collection_name is None:
         raise ValueError("You must provide a collection_name")
+    from langchain_community.vectorstores import Chroma
 
-    print(f"[DEBUG] build_or_load_db: docs={'None' if documents is None else len(documents)}, persist_dir={persist_dir}, collection_name={collection_name}")
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/multi-qa-MiniLM-L6-cos-v1")
+    print(f"[DEBUG] build_or_load_db: docs={'None' if documents is None else len(documents) if hasattr(documents, '__len__') else 'stream'}, persist_dir={persist_dir}, collection_name={collection_name}")
+    embeddings = get_embeddings()
 
     # Load if persisted DB exists and no documents provided to rebuild
     if os.path.exists(persist_dir) and len(os.listdir(persist_dir)) > 0 and documents is None:
@@ -24,13 +54,16 @@ def build_or_load_db(documents=None, persist_dir="chromaDb_csv1", collection_nam
     else:
         if documents is None:
             raise ValueError("No documents provided to build the DB and no existing DB found")
-        print(f"[INFO] Creating new vector DB '{collection_name}' at {persist_dir}")
-        vectordb = Chroma.from_documents(
-            documents=documents,
-            embedding=embeddings,
+        from .ingest import INGEST_WORKERS, checkpoint_path, ingest
+
+        print(f"[INFO] Writing vector DB '{collection_name}' at {persist_dir}")
+        vectordb = Chroma(
             persist_directory=persist_dir,
+            embedding_function=embeddings,
             collection_name=collection_name,
         )
+        ingest(documents, vectordb._collection, embeddings, key=key, workers=workers or INGEST_WORKERS,
+               checkpoint_path=checkpoint_path(persist_dir, collection_name) if key else None)
         vectordb.persist()
         print("[INFO] Database persisted successfully")
 
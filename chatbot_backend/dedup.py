@@ -0,0 +1,181 @@
+import json
+import os
+import re
+import tempfile
+import time
+import zlib
+from array import array
+
+import numpy as np
+
+# Near-duplicate collapse of Q&A rows before chunking (MinHash + LSH, numpy only).
+# Each row is fingerprinted from its normalized question and answer (character 5-gram shingles,
+# DEDUP_NUM_PERM hash permutations). LSH bands pick candidate pairs; a row whose estimated Jaccard
+# similarity to an earlier representative reaches DEDUP_THRESHOLD joins that representative's
+# cluster instead of being indexed. Rows are compared with representatives only, so clusters don't
+# chain. The representative keeps the distinct questions of its cluster in its text
+# ("Also asked: ...") and in metadata (aliases, alias_rows), so those phrasings still retrieve it.
+# Hashing is deterministic (crc32, seeded permutations): the same CSV always yields the same index.
+# The input is spooled to a temp file while clustering and read back to emit the representatives, so
+# memory holds signatures, LSH buckets and duplicate questions, not the documents.
+
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "1") != "0"
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.85"))
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "128"))
+DEDUP_MAX_ALIASES = int(os.getenv("DEDUP_MAX_ALIASES", "8"))  # alias questions written into the text
+SHINGLE = 5
+_PRIME = (1 << 31) - 1
+
+
+def normalize_text(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", (text or "").lower()).strip()
+
+
+def _shingles(text: str) -> np.ndarray:
+    if len(text) <= SHINGLE:
+        grams = {text}
+    else:
+        grams = {text[i:i + SHINGLE] for i in range(len(text) - SHINGLE + 1)}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) % _PRIME for g in grams), dtype=np.int64, count=len(grams))
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = DEDUP_NUM_PERM, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, _PRIME, size=num_perm, dtype=np.int64)
+        self.b = rng.integers(0, _PRIME, size=num_perm, dtype=np.int64)
+
+    def signature(self, text: str) -> np.ndarray:
+        h = _shingles(text)
+        return ((self.a[:, None] * h[None, :] + self.b[:, None]) % _PRIME).min(axis=1)
+
+
+def lsh_bands(num_perm: int, threshold: float) -> tuple[int, int]:
+    """(bands, rows per band) whose S-curve midpoint (1/b)^(1/r) sits just below ``threshold``,
+    so near-duplicates almost always share a bucket; candidates are verified afterwards."""
+    target = max(0.05, threshold - 0.1)
+    options = [(b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0]
+    return min(options, key=lambda br: abs((1 / br[0]) ** (1 / br[1]) - target))
+
+
+def _fingerprint_text(doc) -> str:
+    meta = doc.metadata or {}
+    if meta.get("question") or meta.get("answer"):
+        return f"{normalize_text(meta.get('question', ''))} | {normalize_text(meta.get('answer', ''))}"
+    return normalize_text(doc.page_content)
+
+
+def _with_aliases(content: str, meta: dict, members: list):
+    """Representative text and metadata with the distinct questions of its ``members``
+    ((row, question, similarity) tuples)."""
+    rep_q = normalize_text(meta.get("question", ""))
+    seen, aliases = {rep_q}, []
+    for _, q, _ in members:
+        if q and normalize_text(q) not in seen:
+            seen.add(normalize_text(q))
+            aliases.append(q)
+    meta = dict(meta, duplicates=len(members), alias_rows=",".join(str(row) for row, _, _ in members))
+    if aliases:
+        meta["aliases"] = " | ".join(aliases)
+        cut = content.find("\nA:")
+        if content.startswith("Q:") and cut > 0:
+            content = f"{content[:cut]}\nAlso asked: {'; '.join(aliases[:DEDUP_MAX_ALIASES])}{content[cut:]}"
+    return content, meta
+
+
+class _Signatures:
+    """Signatures of the representatives in one growing uint32 matrix (hash values are < 2^31)."""
+
+    def __init__(self, num_perm: int):
+        self.rows = np.empty((1024, num_perm), dtype=np.uint32)
+        self.count = 0
+
+    def append(self, sig: np.ndarray) -> int:
+        if self.count == len(self.rows):
+            self.rows = np.concatenate([self.rows, np.empty_like(self.rows)])
+        self.rows[self.count] = sig
+        self.count += 1
+        return self.count - 1
+
+
+def iter_dedup(documents, threshold: float = DEDUP_THRESHOLD, num_perm: int = DEDUP_NUM_PERM,
+               report_path: str | None = None):
+    """Collapse near-duplicate documents; yields the representatives in input order.
+
+    Two passes over an on-disk spool of the input: the first clusters, holding only signatures, LSH
+    buckets and the (row, question) of each duplicate; the second yields each representative with
+    its "Also asked" questions. With ``report_path`` a JSON report of every cluster is written
+    there once the output has been read to the end."""
+    from langchain_core.documents import Document
+
+    t0 = time.perf_counter()
+    hasher = MinHasher(num_perm)
+    bands, rows = lsh_bands(num_perm, threshold)
+    buckets = [{} for _ in range(bands)]  # band values -> representative ids
+    sigs = _Signatures(num_perm)
+    rep_of = array("i")  # per input document: representative id, or -1 for a duplicate
+    members = {}  # representative id -> [(row, question, similarity)]
+    with tempfile.TemporaryFile(mode="w+", encoding="utf-8") as spool:
+        for doc in documents:
+            meta = doc.metadata or {}
+            spool.write(json.dumps([doc.page_content, meta], ensure_ascii=False) + "\n")
+            sig = hasher.signature(_fingerprint_text(doc)).astype(np.uint32)
+            keys = [sig[i * rows:(i + 1) * rows].tobytes() for i in range(bands)]
+            candidates = {r for band, key in zip(buckets, keys) for r in band.get(key, ())}
+            best, best_sim = None, 0.0
+            for r in sorted(candidates):
+                sim = float(np.mean(sigs.rows[r] == sig))
+                if sim >= threshold and sim > best_sim:
+                    best, best_sim = r, sim
+            if best is not None:
+                members.setdefault(best, []).append((meta.get("row"), meta.get("question", ""), round(best_sim, 3)))
+                rep_of.append(-1)
+                continue
+            rep = sigs.append(sig)
+            for band, key in zip(buckets, keys):
+                band.setdefault(key, []).append(rep)
+            rep_of.append(rep)
+
+        total, kept = len(rep_of), sigs.count
+        seconds = time.perf_counter() - t0
+        print(f"[DEDUP] {total} rows -> {kept} ({total - kept} near-duplicates in {len(members)} clusters, "
+              f"threshold {threshold}, {bands}x{rows} LSH) in {seconds:.2f}s")
+        del sigs, buckets
+
+        clusters = []
+        spool.seek(0)
+        for line, rep in zip(spool, rep_of):
+            if rep < 0:
+                continue
+            content, meta = json.loads(line)
+            if rep in members:
+                clusters.append({"representative": _describe(meta, content),
+                                 "duplicates": [{"row": row, "question": q, "similarity": sim}
+                                                for row, q, sim in members[rep]]})
+                content, meta = _with_aliases(content, meta, members[rep])
+            yield Document(page_content=content, metadata=meta)
+
+    if report_path:
+        clusters.sort(key=lambda c: -len(c["duplicates"]))
+        report = {"rows": total, "kept": kept, "removed": total - kept, "clusters": len(clusters),
+                  "threshold": threshold, "num_perm": num_perm, "bands": bands, "rows_per_band": rows,
+                  "seconds": round(seconds, 3), "created": time.time(), "cluster_list": clusters}
+        os.makedirs(os.path.dirname(os.path.abspath(report_path)), exist_ok=True)
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"[DEDUP] Report written to {report_path}")
+
+
+def dedup_documents(documents, threshold: float = DEDUP_THRESHOLD, num_perm: int = DEDUP_NUM_PERM,
+                    report_path: str | None = None) -> list:
+    """All representatives as a list (see iter_dedup for streaming)."""
+    return list(iter_dedup(documents, threshold, num_perm, report_path))
+
+
+def report_path_for(index_path: str) -> str:
+    """Where the dedup report of an index (artifact directory, Chroma collection path) goes."""
+    return index_path.rstrip("/\\") + ".dedup.json"
+
+
+def _describe(meta: dict, content: str) -> dict:
+    return {"row": meta.get("row"), "question": meta.get("question") or content[:200]}
@@ -0,0 +1,119 @@
+import hashlib
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+from .cache import LRUCache
+
+# Query-embedding cache in front of the encoder.
+#   tier 1: per-process LRU (EMBED_CACHE_SIZE entries)
+#   tier 2: optional SQLite file (EMBED_CACHE_PATH) shared by all workers on the host; WAL mode lets
+#           readers and the occasional writer proceed concurrently.
+# Keys are sha1(model id + text), so switching model or backend never returns stale vectors.
+# Document embedding (index builds) passes straight through: those texts are embedded once.
+
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "4096"))
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", "")
+
+
+def cache_key(model_id: str, text: str) -> str:
+    return hashlib.sha1(f"{model_id}\n{text}".encode("utf-8")).hexdigest()
+
+
+class SQLiteVectorStore:
+    """Tiny key -> float32 vector table. One connection per (process, thread); errors are non-fatal."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vec BLOB NOT NULL)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        # Connections must not cross a fork; open a fresh one in each worker
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get_many(self, keys: list[str]) -> dict:
+        if not keys:
+            return {}
+        try:
+            marks = ",".join("?" * len(keys))
+            rows = self._connect().execute(f"SELECT key, vec FROM embeddings WHERE key IN ({marks})", keys).fetchall()
+        except sqlite3.Error as e:
+            print(f"[EMBED-CACHE] read failed: {e}")
+            return {}
+        return {k: np.frombuffer(v, dtype=np.float32).tolist() for k, v in rows}
+
+    def put_many(self, items: dict):
+        if not items:
+            return
+        try:
+            self._connect().executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vec) VALUES (?, ?)",
+                [(k, np.asarray(v, dtype=np.float32).tobytes()) for k, v in items.items()],
+            )
+        except sqlite3.Error as e:
+            print(f"[EMBED-CACHE] write failed: {e}")
+
+
+class CachedEmbeddings:
+    """Wraps an embeddings object (embed_query/embed_documents) with the query cache above."""
+
+    def __init__(self, base, model_id: str, maxsize: int = EMBED_CACHE_SIZE, path: str = EMBED_CACHE_PATH):
+        self.base = base
+        self.model_id = model_id
+        self.memory = LRUCache(maxsize=maxsize)
+        self.disk = SQLiteVectorStore(path) if path else None
+        self.disk_hits = 0
+        self.encoded = 0
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """Embed several queries with one encoder call for the misses of both tiers."""
+        keys = [cache_key(self.model_id, t) for t in texts]
+        found = {}
+        for k in keys:
+            v = self.memory.get(k)
+            if v is not None:
+                found[k] = v
+        missing = [k for k in dict.fromkeys(keys) if k not in found]
+        if missing and self.disk is not None:
+            from_disk = self.disk.get_many(missing)
+            self.disk_hits += len(from_disk)
+            for k, v in from_disk.items():
+                self.memory.put(k, v)
+            found.update(from_disk)
+            missing = [k for k in missing if k not in found]
+        if missing:
+            text_of = dict(zip(keys, texts))
+            if len(missing) == 1:
+                vecs = [self.base.embed_query(text_of[missing[0]])]
+            else:
+                vecs = self.base.embed_documents([text_of[k] for k in missing])
+            self.encoded += len(missing)
+            new = {k: list(map(float, v)) for k, v in zip(missing, vecs)}
+            for k, v in new.items():
+                self.memory.put(k, v)
+            if self.disk is not None:
+                self.disk.put_many(new)
+            found.update(new)
+        return [found[k] for k in keys]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_queries([text])[0]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.base.embed_documents(texts)
+
+    def stats(self) -> dict:
+        return dict(self.memory.stats(), disk_hits=self.disk_hits, encoded=self.encoded,
+                    disk_path=self.disk.path if self.disk is not None else None)
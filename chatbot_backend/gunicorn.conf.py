@@ -0,0 +1,50 @@
+"""
+Pre-fork multi-worker serving.
+
+  gunicorn -c chatbot_backend/gunicorn.conf.py
+
+The app factory runs once in the master (preload_app), loading the embedding model, the
+cross-encoder and the memory-mapped index artifact. Workers are forked afterwards, so model
+weights are shared copy-on-write and the index arrays are shared through the page cache.
+"""
+
+import gc
+import os
+
+# Workers read the memory-mapped artifact instead of opening their own Chroma client
+os.environ.setdefault("INDEX_BACKEND", "mmap")
+
+wsgi_app = "chatbot_backend.backend:create_app(warm='sync')"
+bind = os.getenv("BIND", "0.0.0.0:5000")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "180"))
+preload_app = True
+
+
+def when_ready(server):
+    # Move everything allocated during preload into the permanent generation so the cyclic GC
+    # in each worker never writes to (and thereby un-shares) those pages.
+    gc.collect()
+    gc.freeze()
+    server.log.info("Preload complete; %d objects frozen before fork", gc.get_freeze_count())
+
+
+# ONNX Runtime sessions are created in the master (preload) and can't be resized after fork,
+# so the per-worker share is fixed up front unless set explicitly.
+os.environ.setdefault("ORT_INTRA_OP_THREADS", str(max(1, (os.cpu_count() or 1) // max(1, workers))))
+
+
+def post_fork(server, worker):
+    # Split the CPU between workers instead of every worker spawning one torch thread per core
+    try:
+        import torch
+        per_worker = max(1, (os.cpu_count() or 1) // max(1, workers))
+        torch.set_num_threads(per_worker)
+        server.log.info("Worker %s: torch threads=%d", worker.pid, per_worker)
+    except ImportError:
+        pass
+    # Threads don't survive fork: each worker watches CSV_PATH itself (the artifact export is
+    # serialized by a lock file, so only one of them re-embeds)
+    from chatbot_backend.backend import start_corpus_watcher
+    start_corpus_watcher()
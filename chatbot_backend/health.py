@@ -0,0 +1,65 @@
+import threading
+import time
+from contextlib import contextmanager
+
+PENDING, LOADING, READY, ERROR = "pending", "loading", "ready", "error"
+
+
+class StartupStatus:
+    """Per-component startup state backing /healthz and /readyz, plus startup phase timings."""
+
+    def __init__(self, components: dict):
+        # components: name -> required for readiness
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._components = {
+            name: {"state": PENDING, "required": required, "seconds": None, "error": None}
+            for name, required in components.items()
+        }
+        self._phases = []
+
+    @contextmanager
+    def component(self, name: str):
+        """Track a component load; exceptions mark it as errored and propagate."""
+        self._set(name, state=LOADING, error=None)
+        t0 = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self._set(name, state=ERROR, seconds=round(time.perf_counter() - t0, 3), error=str(e))
+            print(f"[STARTUP] {name} failed after {time.perf_counter() - t0:.2f}s: {e}")
+            raise
+        self._set(name, state=READY, seconds=round(time.perf_counter() - t0, 3))
+        print(f"[STARTUP] {name} ready in {time.perf_counter() - t0:.2f}s")
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a startup step (logged only, not part of readiness)."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            dt = time.perf_counter() - t0
+            with self._lock:
+                self._phases.append({"phase": name, "seconds": round(dt, 3)})
+            print(f"[STARTUP] phase {name}: {dt:.2f}s")
+
+    def _set(self, name: str, **fields):
+        with self._lock:
+            self._components[name].update(fields)
+
+    def reset(self, name: str):
+        self._set(name, state=PENDING, seconds=None, error=None)
+
+    def is_ready(self) -> bool:
+        with self._lock:
+            return all(c["state"] == READY for c in self._components.values() if c["required"])
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "ready": all(c["state"] == READY for c in self._components.values() if c["required"]),
+                "uptime_s": round(time.time() - self.started, 3),
+                "components": {k: dict(v) for k, v in self._components.items()},
+                "phases": list(self._phases),
+            }
@@ -0,0 +1,379 @@
+import json
+import os
+import shutil
+import time
+from array import array
+from collections import Counter
+
+import numpy as np
+
+from .ingest import batched
+from .quantization import DTYPES, CompressedMatrix, compress
+
+# On-disk layout (all read-only once written):
+#   manifest.json     model, dim, count, corpus_version, BM25 params
+#   embeddings.npy    (n, dim) float32, L2-normalized (reference copy used for exact re-scoring)
+#   embeddings_<dtype>.npy (+ embeddings_scale.npy for int8)  compressed copy searched first
+#   columns.json      page_content + metadata stored column-wise
+#   bm25_*.npy        CSR postings (indptr/docs/tf) plus idf and doc lengths; vocab in bm25_vocab.json
+# Arrays are opened with np.load(mmap_mode="r"), so every worker forked from (or started next
+# to) the same artifact shares one copy of the pages through the OS page cache.
+# Export streams: documents are embedded and written batch by batch, so building an artifact holds
+# one batch of documents plus the BM25 postings, never the whole corpus.
+
+ARTIFACT_VERSION = 1
+
+
+class ArtifactDocument:
+    """Minimal stand-in for langchain's Document (page_content + metadata).
+
+    Retrieval code only reads these two attributes; avoiding the langchain_core/pydantic import
+    keeps artifact loading in the millisecond range for the serverless handler.
+    """
+
+    __slots__ = ("page_content", "metadata")
+
+    def __init__(self, page_content: str, metadata: dict | None = None):
+        self.page_content = page_content
+        self.metadata = metadata or {}
+
+    def __repr__(self):
+        return f"ArtifactDocument(page_content={self.page_content[:60]!r}, metadata={self.metadata!r})"
+
+
+def _bm25_tokenize(text: str) -> list[str]:
+    # Same default preprocessing as langchain's BM25Retriever (plain whitespace split)
+    return text.split()
+
+
+class _BM25Builder:
+    """BM25Okapi statistics (rank_bm25 semantics), collected one document at a time, in CSR layout."""
+
+    def __init__(self):
+        self.vocab = {}
+        self.docs, self.tfs = [], []  # per term: doc ids / term frequencies
+        self.doc_len = array("f")
+
+    def add(self, text: str):
+        d = len(self.doc_len)
+        toks = _bm25_tokenize(text)
+        self.doc_len.append(len(toks))
+        for term, tf in Counter(toks).items():
+            tid = self.vocab.setdefault(term, len(self.vocab))
+            if tid == len(self.docs):
+                self.docs.append(array("i"))
+                self.tfs.append(array("f"))
+            self.docs[tid].append(d)
+            self.tfs[tid].append(tf)
+
+    def write(self, out_dir: str, k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25) -> dict:
+        doc_len = np.frombuffer(self.doc_len, dtype=np.float32) if self.doc_len else np.zeros(0, np.float32)
+        n = max(1, len(doc_len))
+        indptr = np.zeros(len(self.docs) + 1, dtype=np.int64)
+        np.cumsum([len(p) for p in self.docs], out=indptr[1:])
+        docs = np.fromiter((d for plist in self.docs for d in plist), dtype=np.int32, count=int(indptr[-1]))
+        tfs = np.fromiter((tf for plist in self.tfs for tf in plist), dtype=np.float32, count=int(indptr[-1]))
+
+        df = np.diff(indptr).astype(np.float64)
+        idf = np.log(n - df + 0.5) - np.log(df + 0.5)
+        # rank_bm25 replaces negative idf with epsilon * average idf
+        eps = epsilon * (idf.sum() / len(idf)) if len(idf) else 0.0
+        idf = np.where(idf < 0, eps, idf).astype(np.float32)
+
+        np.save(os.path.join(out_dir, "bm25_indptr.npy"), indptr)
+        np.save(os.path.join(out_dir, "bm25_docs.npy"), docs)
+        np.save(os.path.join(out_dir, "bm25_tf.npy"), tfs)
+        np.save(os.path.join(out_dir, "bm25_idf.npy"), idf)
+        np.save(os.path.join(out_dir, "bm25_doclen.npy"), doc_len)
+        terms = [None] * len(self.vocab)
+        for term, tid in self.vocab.items():
+            terms[tid] = term
+        with open(os.path.join(out_dir, "bm25_vocab.json"), "w", encoding="utf-8") as f:
+            json.dump(terms, f, ensure_ascii=False)
+        return {"k1": k1, "b": b, "epsilon": epsilon, "avgdl": float(doc_len.mean()) if len(doc_len) else 0.0}
+
+
+def _write_columns(rows_path: str, keys: list, out_dir: str):
+    """columns.json from the per-document ``[page_content, metadata]`` lines in ``rows_path``,
+    written one column at a time."""
+
+    def column(out, pick):
+        out.write("[")
+        with open(rows_path, "r", encoding="utf-8") as rows:
+            for j, line in enumerate(rows):
+                out.write(("," if j else "") + json.dumps(pick(json.loads(line)), ensure_ascii=False))
+        out.write("]")
+
+    with open(os.path.join(out_dir, "columns.json"), "w", encoding="utf-8") as out:
+        out.write('{"page_content": ')
+        column(out, lambda row: row[0])
+        out.write(', "metadata": {')
+        for i, key in enumerate(keys):
+            out.write((", " if i else "") + json.dumps(key, ensure_ascii=False) + ": ")
+            column(out, lambda row, key=key: row[1].get(key))
+        out.write("}}")
+
+
+def _write_npy(path: str, raw_path: str, shape: tuple, dtype: str):
+    """Wrap the raw row-major file at ``raw_path`` into an .npy file without loading it."""
+    with open(path, "wb") as f, open(raw_path, "rb") as raw:
+        np.lib.format.write_array_header_1_0(f, {"descr": np.dtype(dtype).str, "fortran_order": False,
+                                                 "shape": shape})
+        shutil.copyfileobj(raw, f, 1 << 20)
+    os.remove(raw_path)
+
+
+def export_artifact(documents, embeddings, out_dir: str, model_name: str = "", corpus_version: str = "",
+                    batch_size: int = 64, dtype: str = "float32", chunking: str = "") -> str:
+    """Embed ``documents`` and write a self-contained index artifact to ``out_dir`` (atomic replace).
+
+    ``dtype`` ("float32", "float16" or "int8") selects the compressed copy used for the first search pass.
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f"Unsupported embedding dtype '{dtype}', expected one of {DTYPES}")
+    t0 = time.perf_counter()
+    tmp_dir = out_dir.rstrip("/\\") + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    compressed = dtype != "float32"
+
+    count, dim, keys = 0, 0, []
+    bm25_builder = _BM25Builder()
+    rows_path = os.path.join(tmp_dir, "rows.jsonl")
+    raw = {name: os.path.join(tmp_dir, f"{name}.raw") for name in ("f32", "data", "scales")}
+    with open(rows_path, "w", encoding="utf-8") as rows, open(raw["f32"], "wb") as f32, \
+            open(raw["data"], "wb") as data_f, open(raw["scales"], "wb") as scales_f:
+        for batch in batched(documents, batch_size):
+            texts = [d.page_content for d in batch]
+            mat = np.asarray(embeddings.embed_documents(texts), dtype=np.float32).reshape(len(texts), -1)
+            norms = np.linalg.norm(mat, axis=1, keepdims=True)
+            mat /= np.where(norms == 0, 1.0, norms)
+            dim = mat.shape[1]
+            f32.write(mat.tobytes())
+            if compressed:
+                data, scales = compress(mat, dtype)  # per-row, so batch by batch is exact
+                data_f.write(data.tobytes())
+                if scales is not None:
+                    scales_f.write(scales.tobytes())
+            for d, text in zip(batch, texts):
+                meta = d.metadata or {}
+                keys.extend(k for k in meta if k not in keys)
+                rows.write(json.dumps([text, meta], ensure_ascii=False) + "\n")
+                bm25_builder.add(text)
+            count += len(batch)
+
+    _write_npy(os.path.join(tmp_dir, "embeddings.npy"), raw["f32"], (count, dim), "float32")
+    if compressed:
+        _write_npy(os.path.join(tmp_dir, f"embeddings_{dtype}.npy"), raw["data"], (count, dim), dtype)
+        if os.path.getsize(raw["scales"]):
+            _write_npy(os.path.join(tmp_dir, "embeddings_scale.npy"), raw["scales"], (count,), "float32")
+    for path in raw.values():
+        if os.path.exists(path):
+            os.remove(path)
+    _write_columns(rows_path, keys, tmp_dir)
+    os.remove(rows_path)
+    bm25 = bm25_builder.write(tmp_dir)
+    manifest = {
+        "version": ARTIFACT_VERSION,
+        "model": model_name,
+        "dim": int(dim),
+        "count": count,
+        "dtype": dtype,
+        "corpus_version": corpus_version,
+        "chunking": chunking,
+        "bm25": bm25,
+        "created": time.time(),
+    }
+    with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    if os.path.exists(out_dir):
+        old_dir = out_dir.rstrip("/\\") + ".old"
+        shutil.rmtree(old_dir, ignore_errors=True)
+        os.replace(out_dir, old_dir)
+        os.replace(tmp_dir, out_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+    else:
+        os.replace(tmp_dir, out_dir)
+    print(f"[ARTIFACT] Exported {count} docs (dim={manifest['dim']}, dtype={dtype}) to {out_dir} in {time.perf_counter() - t0:.1f}s")
+    return out_dir
+
+
+def read_manifest(path: str) -> dict | None:
+    try:
+        with open(os.path.join(path, "manifest.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class IndexArtifact:
+    """Read-only view over an exported artifact; arrays are memory-mapped by default.
+
+    For int8/float16 artifacts the compressed copy is scanned first and, with ``rescore``, the
+    top ``oversample * k`` candidates are re-scored against the float32 rows. The float32 file is
+    always memory-mapped, so only the candidate rows are ever paged in.
+    """
+
+    def __init__(self, path: str, mmap: bool = True, rescore: bool = True, oversample: int = 4):
+        self.path = path
+        self.manifest = read_manifest(path)
+        if self.manifest is None:
+            raise FileNotFoundError(f"No index artifact at {path}")
+        mode = "r" if mmap else None
+        load = lambda name: np.load(os.path.join(path, name), mmap_mode=mode)
+        self.dtype = self.manifest.get("dtype", "float32")
+        if self.dtype == "float32":
+            self.embeddings = load("embeddings.npy")
+            self.matrix = CompressedMatrix(self.embeddings)
+        else:
+            self.embeddings = np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r")
+            scale_path = os.path.join(path, "embeddings_scale.npy")
+            scales = load("embeddings_scale.npy") if os.path.exists(scale_path) else None
+            self.matrix = CompressedMatrix(load(f"embeddings_{self.dtype}.npy"), scales)
+        self.rescore = rescore and self.dtype != "float32"
+        self.oversample = max(1, oversample)
+        with open(os.path.join(path, "columns.json"), "r", encoding="utf-8") as f:
+            cols = json.load(f)
+        self.page_content = cols["page_content"]
+        self.metadata_columns = cols["metadata"]
+
+        self.bm25_indptr = load("bm25_indptr.npy")
+        self.bm25_docs = load("bm25_docs.npy")
+        self.bm25_tf = load("bm25_tf.npy")
+        self.bm25_idf = load("bm25_idf.npy")
+        self.bm25_doclen = load("bm25_doclen.npy")
+        with open(os.path.join(path, "bm25_vocab.json"), "r", encoding="utf-8") as f:
+            self.vocab = {t: i for i, t in enumerate(json.load(f))}
+        self.bm25_params = self.manifest["bm25"]
+
+    def __len__(self):
+        return len(self.page_content)
+
+    @property
+    def corpus_version(self) -> str:
+        return self.manifest.get("corpus_version", "")
+
+    def document(self, i: int) -> ArtifactDocument:
+        meta = {k: col[i] for k, col in self.metadata_columns.items() if col[i] is not None}
+        return ArtifactDocument(self.page_content[i], meta)
+
+    def documents(self, idxs) -> list[ArtifactDocument]:
+        return [self.document(int(i)) for i in idxs]
+
+    def dense_search(self, qvec, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Top-``k`` (indices, cosine scores): compressed pass, then optional exact re-score."""
+        q = np.asarray(qvec, dtype=np.float32)
+        n = float(np.linalg.norm(q))
+        q = q / n if n else q
+        approx = self.matrix.scores(q)
+        if not self.rescore:
+            idx = _top_k(approx, k)
+            return idx, approx[idx]
+        cand = _top_k(approx, k * self.oversample)
+        exact = np.asarray(self.embeddings[cand], dtype=np.float32) @ q
+        order = np.argsort(-exact, kind="stable")[:k]
+        return cand[order], exact[order]
+
+    def vectors(self, idx) -> np.ndarray:
+        """float32 rows for ``idx`` (exact when the reference copy is available)."""
+        return np.asarray(self.embeddings[idx], dtype=np.float32)
+
+    def bm25_scores(self, query: str) -> np.ndarray:
+        k1, b, avgdl = self.bm25_params["k1"], self.bm25_params["b"], self.bm25_params["avgdl"] or 1.0
+        scores = np.zeros(len(self), dtype=np.float32)
+        # rank_bm25 adds one term contribution per query token occurrence
+        for term in _bm25_tokenize(query):
+            tid = self.vocab.get(term)
+            if tid is None:
+                continue
+            lo, hi = int(self.bm25_indptr[tid]), int(self.bm25_indptr[tid + 1])
+            docs = self.bm25_docs[lo:hi]
+            tf = self.bm25_tf[lo:hi]
+            dl = self.bm25_doclen[docs]
+            scores[docs] += self.bm25_idf[tid] * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl))
+        return scores
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+class ArtifactVectorStore:
+    """Drop-in for the subset of the Chroma vectorstore API used by llm.answer_question."""
+
+    def __init__(self, artifact: IndexArtifact, embedding_function):
+        self.artifact = artifact
+        self.embedding_function = embedding_function
+
+    @property
+    def embeddings(self):
+        return self.embedding_function
+
+    def similarity_search_by_vector(self, embedding, k: int = 4, **kwargs):
+        idx, _ = self.artifact.dense_search(embedding, k)
+        return self.artifact.documents(idx)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs):
+        return self.similarity_search_by_vector(self.embedding_function.embed_query(query), k=k)
+
+    def max_marginal_relevance_search_by_vector(self, embedding, k: int = 4, fetch_k: int = 20,
+                                                lambda_mult: float = 0.5, **kwargs):
+        cand, rel = self.artifact.dense_search(embedding, fetch_k)
+        if len(cand) == 0:
+            return []
+        cand_vecs = self.artifact.vectors(cand)
+        selected = [0]
+        sim_to_selected = cand_vecs @ cand_vecs[0]
+        while len(selected) < min(k, len(cand)):
+            mmr = lambda_mult * rel - (1 - lambda_mult) * sim_to_selected
+            mmr[selected] = -np.inf
+            nxt = int(np.argmax(mmr))
+            selected.append(nxt)
+            sim_to_selected = np.maximum(sim_to_selected, cand_vecs @ cand_vecs[nxt])
+        return self.artifact.documents(cand[selected])
+
+    def max_marginal_relevance_search(self, query: str, k: int = 4, fetch_k: int = 20,
+                                      lambda_mult: float = 0.5, **kwargs):
+        return self.max_marginal_relevance_search_by_vector(
+            self.embedding_function.embed_query(query), k=k, fetch_k=fetch_k, lambda_mult=lambda_mult)
+
+
+class ArtifactBM25Retriever:
+    """BM25 over the artifact's CSR postings; mirrors BM25Retriever.get_relevant_documents."""
+
+    def __init__(self, artifact: IndexArtifact, k: int = 4):
+        self.artifact = artifact
+        self.k = k
+
+    def get_relevant_documents(self, query: str, **kwargs):
+        scores = self.artifact.bm25_scores(query)
+        return self.artifact.documents(_top_k(scores, self.k))
+
+    def invoke(self, query: str, **kwargs):
+        return self.get_relevant_documents(query)
+
+
+def load_artifact(path: str, mmap: bool = True, rescore: bool = True) -> IndexArtifact:
+    t0 = time.perf_counter()
+    art = IndexArtifact(path, mmap=mmap, rescore=rescore)
+    print(f"[ARTIFACT] Loaded {len(art)} docs from {path} (mmap={mmap}, dtype={art.dtype}, rescore={art.rescore}) in {(time.perf_counter() - t0) * 1000:.1f}ms")
+    return art
+
+
+def load_retrievers(path: str, mmap: bool = True, rescore: bool = True):
+    """Artifact plus its bundled ONNX query encoder (``<path>/encoder``): dense store and BM25
+    retriever without torch or Chroma. Used by the serverless handler."""
+    from .embedding_cache import CachedEmbeddings
+    from .onnx_models import OnnxEmbeddings
+
+    art = load_artifact(path, mmap=mmap, rescore=rescore)
+    t0 = time.perf_counter()
+    model_id = f"{art.manifest.get('model', '')}:onnx:{art.corpus_version}"
+    encoder = CachedEmbeddings(OnnxEmbeddings(os.path.join(path, "encoder")), model_id)
+    print(f"[ARTIFACT] Query encoder ready in {(time.perf_counter() - t0) * 1000:.1f}ms")
+    return ArtifactVectorStore(art, encoder), ArtifactBM25Retriever(art)
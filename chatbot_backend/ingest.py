@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+# Ingestion pipeline for the Chroma index: read -> split -> embed -> write.
+#   read/split: streamed (processing1.iter_csv_documents / iter_chunks)
+#   embed:      fixed-size batches on INGEST_WORKERS threads (torch and ONNX Runtime release the GIL)
+#   write:      one bulk upsert per batch, in input order, on the calling thread
+# After every write the number of finished batches goes to a checkpoint file next to the index.
+# The input order is deterministic, so a rerun with the same key skips the finished batches.
+# Ids are content hashes, so re-writing a batch after a crash never duplicates rows.
+
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "256"))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+CHECKPOINT_FILE = "ingest_checkpoint.json"
+
+
+def versioned_collection(base: str, corpus_version: str) -> str:
+    """Collection name per corpus version, so a new corpus is built beside the one being served."""
+    return f"{base}_{corpus_version[:12]}" if corpus_version else base
+
+
+def checkpoint_path(persist_dir: str, collection_name: str) -> str:
+    return os.path.join(persist_dir, f"{collection_name}.{CHECKPOINT_FILE}")
+
+
+def current_collection(persist_dir: str, base: str, csv_path: str = "") -> str:
+    """Name of the collection the server builds for ``csv_path``. Without the CSV, the most recently
+    completed versioned collection of ``base`` in ``persist_dir`` (from its ingest checkpoint), else ``base``."""
+    if csv_path and os.path.exists(csv_path):
+        from .processing1 import corpus_version
+        return versioned_collection(base, corpus_version(csv_path))
+    suffix = f".{CHECKPOINT_FILE}"
+    newest, newest_mtime = base, -1.0
+    try:
+        names = os.listdir(persist_dir)
+    except OSError:
+        return base
+    for name in names:
+        if not (name.startswith(f"{base}_") and name.endswith(suffix)):
+            continue
+        path = os.path.join(persist_dir, name)
+        if _read_checkpoint(path).get("complete") and os.path.getmtime(path) > newest_mtime:
+            newest, newest_mtime = name[:-len(suffix)], os.path.getmtime(path)
+    return newest
+
+
+def doc_id(doc) -> str:
+    meta = doc.metadata or {}
+    raw = f"{meta.get('source', '')}\n{meta.get('row', '')}\n{doc.page_content}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def batched(iterable, size: int):
+    it = iter(iterable)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def ingest_key(corpus_version: str, collection_name: str, model_id: str, chunking: str) -> str:
+    """Identifies what a checkpoint was written for; any change starts the index over.
+    ``chunking`` is processing1.chunking_id()."""
+    return f"{corpus_version}:{collection_name}:{model_id}:{chunking}"
+
+
+def _read_checkpoint(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_checkpoint(path: str, state: dict):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def _clear_collection(collection, page: int = 5000):
+    """Delete every row (a collection left over from another corpus or an older build)."""
+    while True:
+        ids = collection.get(include=[], limit=page)["ids"]
+        if not ids:
+            return
+        collection.delete(ids=ids)
+
+
+def _clean_metadata(meta: dict) -> dict:
+    # Chroma accepts only str/int/float/bool values
+    return {k: v if isinstance(v, (str, int, float, bool)) else str(v) for k, v in (meta or {}).items() if v is not None}
+
+
+def ingest(documents, collection, embeddings, batch_size: int = INGEST_BATCH_SIZE, workers: int = INGEST_WORKERS,
+           checkpoint_path: str | None = None, key: str = "", progress_every: float = 5.0) -> dict:
+    """Embed ``documents`` (any iterable) in batches and upsert them into a Chroma ``collection``.
+
+    With ``checkpoint_path`` and a non-empty ``key`` (identifying corpus, chunking and model), a
+    previous run with the same key resumes after its last written batch. A different key clears
+    the collection first. Returns counts and throughput.
+    """
+    t0 = time.perf_counter()
+    state = _read_checkpoint(checkpoint_path) if checkpoint_path and key else {}
+    if state.get("key") != key:
+        state = {}
+    if state.get("complete"):
+        print(f"[INGEST] Index already complete for this corpus ({state.get('docs_done', 0)} docs); nothing to do")
+        return {"docs": 0, "skipped": state.get("docs_done", 0), "batches": 0, "seconds": 0.0, "docs_per_s": 0.0}
+    if checkpoint_path and key and not state:
+        _clear_collection(collection)
+    skip_batches = state.get("batches_done", 0)
+    done_batches, done_docs = skip_batches, state.get("docs_done", 0)
+    if skip_batches:
+        print(f"[INGEST] Resuming after batch {skip_batches} ({done_docs} docs already written)")
+
+    def embed(batch):
+        return embeddings.embed_documents([d.page_content for d in batch])
+
+    written, last_report = 0, t0
+    pending = []  # (batch, embedding future), oldest first
+
+    def flush_oldest():
+        nonlocal written, done_batches, last_report
+        written += _write(collection, *pending.pop(0))
+        done_batches += 1
+        if checkpoint_path and key:
+            _write_checkpoint(checkpoint_path, {"key": key, "batches_done": done_batches,
+                                                "docs_done": done_docs + written})
+        now = time.perf_counter()
+        if now - last_report >= progress_every:
+            print(f"[INGEST] {done_docs + written} docs written ({written / (now - t0):.1f} docs/s)")
+            last_report = now
+
+    batches = batched(documents, batch_size)
+    for _ in islice(batches, skip_batches):
+        pass  # already written by the previous run
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="ingest") as pool:
+        for batch in batches:
+            pending.append((batch, pool.submit(embed, batch)))
+            # At most 2 batches per worker in flight, so memory stays bounded
+            while pending and (len(pending) >= 2 * max(1, workers) or pending[0][1].done()):
+                flush_oldest()
+        while pending:
+            flush_oldest()
+    seconds = time.perf_counter() - t0
+    if checkpoint_path and key:
+        _write_checkpoint(checkpoint_path, {"key": key, "batches_done": done_batches,
+                                            "docs_done": done_docs + written, "complete": True})
+    stats = {"docs": written, "skipped": done_docs, "batches": done_batches - skip_batches,
+             "seconds": round(seconds, 2), "docs_per_s": round(written / seconds, 1) if seconds > 0 else 0.0}
+    print(f"[INGEST] Wrote {written} docs in {stats['batches']} batches, {seconds:.1f}s ({stats['docs_per_s']} docs/s)")
+    return stats
+
+
+def _write(collection, batch, future) -> int:
+    vectors = [list(map(float, v)) for v in future.result()]
+    collection.upsert(
+        ids=[doc_id(d) for d in batch],
+        embeddings=vectors,
+        documents=[d.page_content for d in batch],
+        metadatas=[_clean_metadata(d.metadata) for d in batch],
+    )
+    return len(batch)
+
+
+def run_pipeline(csv_path: str, persist_dir: str, collection_name: str, chunker: str | None = None,
+                 batch_size: int = INGEST_BATCH_SIZE, workers: int = INGEST_WORKERS, resume: bool = True):
+    """Stream ``csv_path`` into the persisted Chroma collection for its corpus version (the
+    collection the server loads). Returns (vectordb, stats)."""
+    from langchain_community.vectorstores import Chroma
+    from .chunking import new_stats, report
+    from .db import get_embeddings
+    from .dedup import report_path_for
+    from .processing1 import CHUNKER, chunking_id, corpus_version, iter_chunks, iter_csv_documents
+
+    embeddings = get_embeddings()
+    version = corpus_version(csv_path)
+    collection_name = versioned_collection(collection_name, version)
+    os.makedirs(persist_dir, exist_ok=True)
+    vectordb = Chroma(persist_directory=persist_dir, embedding_function=embeddings, collection_name=collection_name)
+    chunker = chunker or CHUNKER
+    key = ingest_key(version, collection_name, embeddings.model_id, chunking_id(chunker))
+    checkpoint = checkpoint_path(persist_dir, collection_name)
+    if not resume and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    chunk_stats = new_stats()
+    docs = iter_chunks(iter_csv_documents(csv_path), chunk_stats, chunker,
+                       dedup_report=report_path_for(os.path.join(persist_dir, collection_name)))
+    stats = ingest(docs, vectordb._collection, embeddings, batch_size=batch_size, workers=workers,
+                   checkpoint_path=checkpoint, key=key)
+    if chunk_stats["chunks"]:
+        print(f"[CHUNK] {chunker}: {report(chunk_stats)}")
+    stats["chunking"] = chunk_stats
+    return vectordb, stats
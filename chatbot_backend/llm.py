@@ -1,9 +1,15 @@
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_ollama.llms import OllamaLLM
+import hashlib
 import json
+import os
 import re
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from typing import Optional, List
-from sentence_transformers import CrossEncoder
+from .cache import LRUCache
+from .metrics import metrics
+from .query_expansion import expand_query
 
 # Prompt template for CSV Q&A
 template = """
@@ -20,15 +26,100 @@ Question:
 Answer:
 """
 
-prompt_template = ChatPromptTemplate.from_template(template)
-# Using mistral for better understanding and response generation
-llm = OllamaLLM(model="mistral:7b-instruct-q4_K_M", temperature=0.3, max_tokens=2000)
+# langchain, langchain_ollama and sentence_transformers are imported on first use so that
+# importing this module (and therefore backend.py) stays fast; see backend.warm_up.
+_prompt_template = None
+_llm = None
+_llm_lock = threading.Lock()
+
+
+def get_prompt_template():
+    global _prompt_template
+    if _prompt_template is None:
+        from langchain_core.prompts import ChatPromptTemplate
+        _prompt_template = ChatPromptTemplate.from_template(template)
+    return _prompt_template
+
+
+def get_llm():
+    """Generation client. Using mistral for better understanding and response generation."""
+    global _llm
+    with _llm_lock:
+        if _llm is None:
+            from langchain_ollama.llms import OllamaLLM
+            _llm = OllamaLLM(model="mistral:7b-instruct-q4_K_M", temperature=0.3, max_tokens=2000)
+    return _llm
+
+# --- QOQA rewriter: one shared client, cached rewrites, speculative execution ---
+# Max seconds answer_question waits for a rewrite after raw-query retrieval is done.
+QOQA_BUDGET_S = float(os.getenv("QOQA_BUDGET_S", "1.5"))
+
+_rewriter = None
+_rewriter_lock = threading.Lock()
+_rewrite_cache = LRUCache(maxsize=int(os.getenv("QOQA_CACHE_SIZE", "2048")))
+_rewrite_inflight = {}
+_rewrite_inflight_lock = threading.Lock()
+_rewrite_pool = ThreadPoolExecutor(max_workers=int(os.getenv("QOQA_WORKERS", "2")), thread_name_prefix="qoqa")
+
+
+def get_rewriter():
+    """Build the deterministic rewrite client once per process."""
+    global _rewriter
+    with _rewriter_lock:
+        if _rewriter is None:
+            from langchain_ollama.llms import OllamaLLM
+            _rewriter = OllamaLLM(model="mistral:7b-instruct-q4_K_M", temperature=0.0, max_tokens=400)
+    return _rewriter
+
+
+def normalize_query(query: str) -> str:
+    """Cache key form of a query: lowercase, collapsed whitespace, no trailing punctuation."""
+    return re.sub(r"\s+", " ", (query or "").lower()).strip().rstrip("?.! ")
+
+
+def qoqa_rewrite_cached(query: str, n: int = 3) -> dict:
+    key = (normalize_query(query), n)
+    hit = _rewrite_cache.get(key)
+    if hit is not None:
+        return hit
+    res = qoqa_rewrite(query, n=n)
+    _rewrite_cache.put(key, res)
+    return res
+
+
+def submit_rewrite(query: str, n: int = 3):
+    """Start (or join) a background QOQA rewrite. Returns a Future resolving to the rewrite dict.
+
+    The rewrite keeps running after the caller stops waiting, so a slow rewrite still
+    lands in the cache for the next identical query.
+    """
+    key = (normalize_query(query), n)
+    with _rewrite_inflight_lock:
+        fut = _rewrite_inflight.get(key)
+        if fut is not None:
+            return fut
+        fut = _rewrite_pool.submit(qoqa_rewrite_cached, query, n)
+        _rewrite_inflight[key] = fut
+    # Registered outside the lock: a future that is already done runs the callback right here
+    fut.add_done_callback(lambda f: _forget_rewrite(key, f))
+    return fut
+
+
+def _forget_rewrite(key, fut):
+    with _rewrite_inflight_lock:
+        if _rewrite_inflight.get(key) is fut:
+            del _rewrite_inflight[key]
+
+
+def cached_rewrite(query: str, n: int = 3) -> Optional[dict]:
+    return _rewrite_cache.get((normalize_query(query), n))
+
 
 def qoqa_rewrite(query: str, n: int = 3) -> dict:
     """QOQA-style query optimization: produce one canonical rewrite and n alignment-oriented queries.
     Returns {"canonical": str, "queries": [str,...]} with robust fallbacks.
     """
-    rewriter = OllamaLLM(model="mistral:7b-instruct-q4_K_M", temperature=0.0, max_tokens=400)
+    rewriter = get_rewriter()
     base = query.strip()
     canonical, queries = None, []
 
@@ -170,7 +261,7 @@ def generate_paraphrases_with_llm(query: str, n: int = 3) -> list:
         f"Question: {query}"
     )
     try:
-        raw = llm.invoke(prompt)
+        raw = get_llm().invoke(prompt)
         # Try parse as JSON array
         paras = json.loads(raw)
         if isinstance(paras, list):
@@ -213,7 +304,7 @@ def hyde_generate(query: str) -> str:
             f"Question: {query}\n\n"
             "Passage:"
         )
-        text = llm.invoke(prompt)
+        text = get_llm().invoke(prompt)
         # sanitize newlines and trim
         return re.sub(r"\s+", " ", text).strip()
     except Exception:
@@ -304,118 +395,530 @@ def _passes_generic_filter(d, signals: dict) -> bool:
         return False
     return True
 
-def answer_question(vectordb, query, top_k=20, use_mmr=True, bm25_retriever: Optional[object] = None, use_hyde: bool = True):
+RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+# "torch": sentence_transformers.CrossEncoder; "onnx": <ONNX_MODEL_DIR>/reranker on ONNX Runtime
+RERANK_BACKEND = os.getenv("RERANK_BACKEND", "torch").lower()
+
+_cross_encoder = None
+_cross_encoder_lock = threading.Lock()
+
+
+def get_cross_encoder():
+    """Process-wide reranker, loaded once instead of on every request."""
+    global _cross_encoder
+    with _cross_encoder_lock:
+        if _cross_encoder is None:
+            if RERANK_BACKEND == "onnx":
+                from .onnx_models import OnnxCrossEncoder, ONNX_MODEL_DIR
+                _cross_encoder = OnnxCrossEncoder(os.path.join(ONNX_MODEL_DIR, "reranker"))
+            else:
+                from sentence_transformers import CrossEncoder
+                _cross_encoder = CrossEncoder(RERANK_MODEL)
+    return _cross_encoder
+
+
+# --- Cross-encoder score cache: (corpus version, normalized query, doc id) -> score ---
+_score_cache = LRUCache(maxsize=int(os.getenv("RERANK_CACHE_SIZE", "50000")))
+
+
+def invalidate_corpus_caches():
+    """Drop state tied to the previous corpus after an index swap. Scores are keyed by corpus
+    version and would never hit again; clearing just frees the space at once."""
+    _score_cache.clear()
+
+
+def doc_id(doc) -> str:
+    """Stable document id: explicit metadata id if present, else a hash of the chunk text."""
+    meta = getattr(doc, "metadata", None) or {}
+    if meta.get("doc_id"):
+        return str(meta["doc_id"])
+    return hashlib.sha1((doc.page_content or "").encode("utf-8")).hexdigest()
+
+
+def rerank_scores_batch(requests: list, corpus_version: str = "", stats_list: Optional[list] = None,
+                        batch_size: Optional[int] = None) -> list[list[float]]:
+    """Cross-encoder scores for several ``(query, docs)`` requests at once.
+
+    Cached pairs are reused and the misses of all requests go to the model in a single
+    ``predict`` call. Per-request counts go to ``stats_list[i]["rerank"]``.
     """
-    Retrieves relevant context from ChromaDB and queries the LLM with a strict prompt.
+    keys_per, counts = [], []
+    scores, misses = {}, {}
+    for query, docs in requests:
+        q = normalize_query(query)
+        keys = [(corpus_version, q, doc_id(d)) for d in docs]
+        keys_per.append(keys)
+        hits = missed = 0
+        for key, d in dict(zip(keys, docs)).items():
+            if key in misses:
+                missed += 1
+                continue
+            if key not in scores:
+                cached = _score_cache.get(key)
+                if cached is None:
+                    misses[key] = (query, d)
+                    missed += 1
+                    continue
+                scores[key] = cached
+            hits += 1
+        counts.append((len(docs), hits, missed))
+    if misses:
+        kwargs = {"batch_size": batch_size} if batch_size else {}
+        preds = get_cross_encoder().predict([(q, d.page_content) for q, d in misses.values()], **kwargs)
+        for key, score in zip(misses, preds):
+            scores[key] = float(score)
+            _score_cache.put(key, float(score))
+    if stats_list is not None:
+        for stats, (pairs, hits, missed) in zip(stats_list, counts):
+            unique = hits + missed
+            stats["rerank"] = {
+                "pairs": pairs, "unique": unique, "hits": hits, "misses": missed,
+                "hit_ratio": round(hits / unique, 4) if unique else 0.0,
+            }
+    return [[scores[key] for key in keys] for keys in keys_per]
+
+
+def rerank_scores(query: str, docs: list, corpus_version: str = "", stats: Optional[dict] = None) -> list[float]:
+    """Cross-encoder scores for ``docs`` (same order). Cached pairs are reused; only misses,
+    each scored once, are sent to the model. Per-call counts go to ``stats["rerank"]``."""
+    stats_list = [stats] if stats is not None else None
+    return rerank_scores_batch([(query, docs)], corpus_version, stats_list)[0]
+
+
+# --- Rerank cascade: cross-encoder over the fused retrieval order, in chunks, with early stop ---
+RERANK_CASCADE = os.getenv("RERANK_CASCADE", "1") != "0"
+# Candidates scored per round after the first top_k
+RERANK_CASCADE_CHUNK = int(os.getenv("RERANK_CASCADE_CHUNK", "8"))
+# Stop once the best score of the latest chunk trails the current k-th best by more than this (logits)
+RERANK_CASCADE_MARGIN = float(os.getenv("RERANK_CASCADE_MARGIN", "2.0"))
+# Reciprocal-rank-fusion constant for the prior order
+RRF_K = 60
+
+
+def fuse_ranked(ranked_lists: list, k: int = RRF_K) -> list:
+    """Unique docs ordered by reciprocal-rank fusion of the dense and BM25 result lists."""
+    fused, first = {}, {}
+    for ranked in ranked_lists:
+        for rank, doc in enumerate(ranked):
+            did = doc_id(doc)
+            fused[did] = fused.get(did, 0.0) + 1.0 / (k + rank + 1)
+            first.setdefault(did, doc)
+    return [first[did] for did in sorted(first, key=lambda did: -fused[did])]
+
+
+def cascade_rerank_batch(requests: list, top_k: int, corpus_version: str = "", stats_list: Optional[list] = None,
+                         batch_size: Optional[int] = None) -> list[list]:
+    """Rerank several ``(query, docs)`` requests whose docs are in prior (fused) order.
+
+    The first ``top_k`` docs of each request are scored, then ``RERANK_CASCADE_CHUNK`` more per
+    round. A request stops once its latest chunk's best score trails its k-th best score by
+    ``RERANK_CASCADE_MARGIN``: lower-prior candidates are then not expected to enter the top k.
+    Each round sends the chunks of all unfinished requests to the model together.
+    Returns, per request, the scored docs by score followed by the unscored tail in prior order.
     """
-
+    scores = [[] for _ in requests]
+    done = [not docs for _, docs in requests]
+    counts = [{"unique": 0, "hits": 0, "misses": 0, "rounds": 0} for _ in requests]
+    while not all(done):
+        active = [i for i, d in enumerate(done) if not d]
+        chunks = []
+        for i in active:
+            query, docs = requests[i]
+            start = len(scores[i])
+            size = len(docs) if not RERANK_CASCADE else (top_k if start == 0 else RERANK_CASCADE_CHUNK)
+            chunks.append((query, docs[start:start + max(1, size)]))
+        round_stats = [{} for _ in active]
+        for i, chunk_scores, rs in zip(active, rerank_scores_batch(chunks, corpus_version, round_stats, batch_size),
+                                       round_stats):
+            scores[i].extend(chunk_scores)
+            for key in ("unique", "hits", "misses"):
+                counts[i][key] += rs["rerank"][key]
+            counts[i]["rounds"] += 1
+            if len(scores[i]) >= len(requests[i][1]):
+                done[i] = True
+            elif len(scores[i]) > top_k:
+                kth = sorted(scores[i], reverse=True)[top_k - 1]
+                done[i] = max(chunk_scores) + RERANK_CASCADE_MARGIN < kth
+
+    ranked = []
+    for i, (query, docs) in enumerate(requests):
+        n = len(scores[i])
+        ranked.append(order_by_scores(scores[i], docs[:n], n) + list(docs[n:]))
+        skipped = len(docs) - n
+        metrics.inc("rerank_pairs", n, outcome="scored")
+        metrics.inc("rerank_pairs", skipped, outcome="skipped")
+        if stats_list is not None:
+            c = counts[i]
+            stats_list[i]["rerank"] = {
+                "pairs": len(docs), "scored": n, "pairs_skipped": skipped, "rounds": c["rounds"],
+                "unique": c["unique"], "hits": c["hits"], "misses": c["misses"],
+                "hit_ratio": round(c["hits"] / c["unique"], 4) if c["unique"] else 0.0,
+            }
+    return ranked
+
+
+def cascade_rerank(query: str, docs: list, top_k: int, corpus_version: str = "", stats: Optional[dict] = None) -> list:
+    stats_list = [stats] if stats is not None else None
+    ranked = cascade_rerank_batch([(query, docs)], top_k, corpus_version, stats_list)[0]
+    if stats is not None:
+        r = stats["rerank"]
+        print(f"[RERANK] scored {r['scored']}/{r['pairs']} pairs in {r['rounds']} rounds (skipped {r['pairs_skipped']})")
+    return ranked
+
+
+def _dense_search(vectordb, q: str, top_k: int):
     try:
-        # 1️⃣ Simplified query processing (removed QOQA for speed)
-        canonical = query.strip()
-        variants = [canonical]
-        if "iit ropar" not in canonical.lower():
-            variants.append(f"{canonical} IIT Ropar")
+        return vectordb.max_marginal_relevance_search(q, k=top_k, fetch_k=120)
+    except Exception:
+        return vectordb.similarity_search(q, k=top_k)
 
-        # 3️⃣ Retrieve (Dense: E5) with MMR for each variant (high fetch_k), then union
-        candidate_docs = []
-        for v in variants:
-            q_dense = v
-            try:
-                docs_v = vectordb.max_marginal_relevance_search(q_dense, k=top_k, fetch_k=120)
-            except Exception:
-                docs_v = vectordb.similarity_search(q_dense, k=top_k)
-            candidate_docs.extend(docs_v)
 
-        # Dense retrieval using HyDE passage as query (commented out)
-        # if hyde_passage:
-        #     try:
-        #         docs_h = vectordb.max_marginal_relevance_search(hyde_passage, k=top_k, fetch_k=120)
-        #     except Exception:
-        #         docs_h = vectordb.similarity_search(hyde_passage, k=top_k)
-        #     candidate_docs.extend(docs_h)
+def _dense_search_by_vector(vectordb, vec, top_k: int):
+    try:
+        return vectordb.max_marginal_relevance_search_by_vector(vec, k=top_k, fetch_k=120)
+    except Exception:
+        return vectordb.similarity_search_by_vector(vec, k=top_k)
+
 
-        # 4️⃣ (Optional) Sparse BM25 retrieval for hybrid
-        if bm25_retriever is not None:
-            try:
-                bm25_docs_q = bm25_retriever.get_relevant_documents(canonical) or []
-            except Exception:
-                bm25_docs_q = []
-            candidate_docs.extend(bm25_docs_q[: top_k])
-            # if hyde_passage:
-            #     try:
-            #         bm25_docs_h = bm25_retriever.get_relevant_documents(hyde_passage) or []
-            #     except Exception:
-            #         bm25_docs_h = []
-            #     candidate_docs.extend(bm25_docs_h[: top_k])
-
-        print(f"\n[RETRIEVE] collected {len(candidate_docs)} docs (dense only) across {len(variants)} variants")
-
-        # Rerank with cross-encoder for better accuracy
-        cross_encoder = CrossEncoder('cross-encoder/ms-marco-MiniLM-L-6-v2')
-        query_doc_pairs = [(canonical, doc.page_content) for doc in candidate_docs]
-        scores = cross_encoder.predict(query_doc_pairs)
-        # Sort with stable key to avoid Document comparison errors
-        sorted_pairs = sorted(zip(scores, candidate_docs), key=lambda x: (-x[0], id(x[1])))
-        ranked_docs = [doc for _, doc in sorted_pairs]
-        candidate_docs = ranked_docs[:top_k]
-
-        # 3️⃣ Deduplicate by a stable key: email or question (name) or first 100 chars
-        seen = set()
-        deduped = []
-        for d in candidate_docs:
-            meta = getattr(d, 'metadata', {}) or {}
-            email_key = str(meta.get('email') or '').strip().lower()
-            name_key = str(meta.get('question') or meta.get('name') or '').strip().lower()
-            key = email_key or name_key or (d.page_content[:100].lower() if d.page_content else '')
-            if key and key not in seen:
-                seen.add(key)
-                deduped.append(d)
+def _bm25_search(bm25_retriever, queries: list[str], top_k: int) -> list[list]:
+    """One ranked BM25 result list per query."""
+    lists = []
+    if bm25_retriever is None:
+        return lists
+    for v in queries:
+        try:
+            lists.append((bm25_retriever.get_relevant_documents(v) or [])[: top_k])
+        except Exception:
+            pass
+    return lists
 
-        # 4️⃣ Generic pre-LLM filter using intent/entity signals (safe fallback)
-        signals = _extract_signals(canonical)
-        filtered = [d for d in deduped if _passes_generic_filter(d, signals)]
-        chosen = filtered if filtered else deduped
 
-        # Keep only top_k after filter
-        results = chosen[:top_k]
+def _rewrite_variants(rewrite: Optional[dict], seen: set) -> list[str]:
+    """New retrieval variants from a QOQA result, skipping ones already searched."""
+    out = []
+    if not rewrite:
+        return out
+    for v in [rewrite.get("canonical") or ""] + list(rewrite.get("queries") or []):
+        s = re.sub(r"\s+", " ", v).strip()
+        if s and s.lower() not in seen:
+            seen.add(s.lower())
+            out.append(s)
+    return out
+
+
+# --- Pipeline stages (shared by answer_question and answer_batch) ---
+
+def query_variants(query: str, use_rules: bool = True) -> tuple[str, list[str], list[str]]:
+    """(canonical, retrieval variants, rule variants): raw query, "IIT Ropar" suffix, alias variants."""
+    canonical = query.strip()
+    variants = [canonical]
+    if "iit ropar" not in canonical.lower():
+        variants.append(f"{canonical} IIT Ropar")
+    # Alias expansion (microseconds) adds variants; it doesn't stand in for the QOQA rewrite
+    rule_variants = expand_query(canonical) if use_rules else []
+    variants.extend(rule_variants)
+    if rule_variants:
+        print(f"[EXPAND] rule variants: {rule_variants}")
+    return canonical, variants, rule_variants
+
+
+def retrieve_candidates(vectordb, query: str, top_k: int = 20, bm25_retriever: Optional[object] = None,
+                        use_qoqa: bool = True, rewrite_budget: Optional[float] = None,
+                        use_rules: bool = True) -> tuple[str, list]:
+    """Dense + BM25 candidates for ``query`` with speculative QOQA merging. Returns (canonical, docs),
+    the docs unique and in reciprocal-rank-fusion order over all result lists."""
+    t0 = time.perf_counter()
+    # 1️⃣ Raw query variants go out first; the QOQA rewrite (cached or speculative) runs alongside
+    canonical, variants, rule_variants = query_variants(query, use_rules)
+    rewrite = cached_rewrite(canonical) if use_qoqa else None
+    rewrite_future = submit_rewrite(canonical) if (use_qoqa and rewrite is None) else None
+
+    # 2️⃣ Retrieve (Dense: E5) with MMR for each variant (high fetch_k); one ranked list per search
+    ranked_lists = []
+    for v in variants:
+        ranked_lists.append(_dense_search(vectordb, v, top_k))
+
+    # Dense retrieval using HyDE passage as query (commented out)
+    # if hyde_passage:
+    #     ranked_lists.append(_dense_search(vectordb, hyde_passage, top_k))
+
+    # 3️⃣ (Optional) Sparse BM25 retrieval for hybrid
+    ranked_lists.extend(_bm25_search(bm25_retriever, [canonical] + rule_variants, top_k))
+
+    # 4️⃣ Merge rewritten variants only if the rewrite made it within the budget
+    if rewrite_future is not None:
+        budget = QOQA_BUDGET_S if rewrite_budget is None else rewrite_budget
+        remaining = max(0.0, budget - (time.perf_counter() - t0))
+        try:
+            rewrite = rewrite_future.result(timeout=remaining)
+        except Exception:
+            print(f"[QOQA] rewrite not ready within {budget:.2f}s budget; using raw-query results")
+            rewrite = None
+    extra = _rewrite_variants(rewrite, {v.lower() for v in variants})
+    for v in extra:
+        ranked_lists.append(_dense_search(vectordb, v, top_k))
+    variants.extend(extra)
+
+    candidate_docs = fuse_ranked(ranked_lists)
+    print(f"\n[RETRIEVE] collected {sum(map(len, ranked_lists))} docs ({len(candidate_docs)} unique) "
+          f"across {len(variants)} variants ({len(extra)} from QOQA)")
+    return canonical, candidate_docs
+
+
+def unique_docs(docs: list) -> list:
+    """The same chunk usually comes back for several variants; keep its first occurrence."""
+    out, seen_ids = [], set()
+    for doc in docs:
+        did = doc_id(doc)
+        if did not in seen_ids:
+            seen_ids.add(did)
+            out.append(doc)
+    return out
+
+
+def order_by_scores(scores, docs: list, top_k: int) -> list:
+    # Sort on the score only (stable) to avoid Document comparison errors
+    return [doc for _, doc in sorted(zip(scores, docs), key=lambda x: -x[0])][:top_k]
+
+
+def select_context(canonical: str, ranked_docs: list, top_k: int = 20, verbose: bool = True) -> list:
+    """Dedup by email/question, apply the generic intent/entity filter and keep ``top_k``."""
+    # Deduplicate by a stable key: email or question (name) or first 100 chars
+    seen = set()
+    deduped = []
+    for d in ranked_docs:
+        meta = getattr(d, 'metadata', {}) or {}
+        email_key = str(meta.get('email') or '').strip().lower()
+        name_key = str(meta.get('question') or meta.get('name') or '').strip().lower()
+        key = email_key or name_key or (d.page_content[:100].lower() if d.page_content else '')
+        if key and key not in seen:
+            seen.add(key)
+            deduped.append(d)
+
+    # Generic pre-LLM filter using intent/entity signals (safe fallback)
+    signals = _extract_signals(canonical)
+    filtered = [d for d in deduped if _passes_generic_filter(d, signals)]
+    chosen = filtered if filtered else deduped
+
+    # Keep only top_k after filter
+    results = chosen[:top_k]
+    if verbose:
         print(f"[RETRIEVE] dedup={len(deduped)} filtered={len(filtered)} -> using {len(results)} (top_k={top_k})")
-
-        if not results:
-            return "I’m sorry, I don’t have information on that."
         for i, r in enumerate(results):
             print(f"\n[Result {i+1}]")
             print(r.page_content[:300])
-        
+    return results
+
+
+def generate_answer(query: str, results: list) -> str:
+    """Prompt the LLM with the selected context."""
+    if not results:
+        return "I’m sorry, I don’t have information on that."
 
-        # 2️⃣ Build clean context (answers only, no redundant Q/A labels)
-        context = "\n\n".join(doc.page_content for doc in results)
+    # Build clean context (answers only, no redundant Q/A labels)
+    context = "\n\n".join(doc.page_content for doc in results)
 
-        # 3️⃣ Format with your strict IIT Ropar prompt template
-        prompt_text = prompt_template.format_prompt(
-            context=context,
-            question=query
-        ).to_string()
+    # Format with your strict IIT Ropar prompt template
+    prompt_text = get_prompt_template().format_prompt(
+        context=context,
+        question=query
+    ).to_string()
 
-        # 4️⃣ Debug what’s going to LLM
-        '''print("\n=== FINAL PROMPT SENT TO LLM ===")
-        print(prompt_text[:2000])  # print first 2000 chars only to avoid flooding console'''
+    # Debug what’s going to LLM
+    '''print("\n=== FINAL PROMPT SENT TO LLM ===")
+    print(prompt_text[:2000])  # print first 2000 chars only to avoid flooding console'''
 
-        # 5️⃣ Call Llama3
-        response = llm.invoke(prompt_text)
+    response = get_llm().invoke(prompt_text)
+    return response.strip()
 
-        # 6️⃣ Return clean answer
-        return response.strip()
+
+# --- Follow-up turns: re-score the previous turn's candidate pool before retrieving again ---
+FOLLOWUP_POOL_SIZE = int(os.getenv("FOLLOWUP_POOL_SIZE", "40"))
+# Cross-encoder score (logit) the best pooled doc needs for the follow-up to be answered from the pool.
+# ms-marco-MiniLM puts clearly relevant passages well above 0; below this a fresh retrieval does better.
+FOLLOWUP_MIN_SCORE = float(os.getenv("FOLLOWUP_MIN_SCORE", "3.0"))
+_FOLLOWUP_OPENERS = re.compile(r"^(and|also|then|what about|how about|what of)\b")
+# Personal pronouns only: "it" / "this" / "that" occur in plenty of standalone questions
+# ("the fee for this semester", "the IT department")
+_ANAPHORA = {"he", "him", "his", "she", "her", "hers", "they", "them", "their", "theirs"}
+
+
+def is_follow_up(query: str) -> bool:
+    """Short query leaning on the previous turn: a personal pronoun or a "what about ..." opener."""
+    q = normalize_query(query)
+    tokens = re.findall(r"[a-z0-9']+", q)
+    if not tokens or len(tokens) > 12:
+        return False
+    return bool(_FOLLOWUP_OPENERS.match(q)) or any(t in _ANAPHORA for t in tokens)
+
+
+def _rank_pool(query: str, prev: dict, top_k: int, corpus_version: str, stats: Optional[dict]):
+    """Rank the previous turn's pool against "<previous question> <follow-up>".
+    Returns (ranked docs, contextual query), or None when the pool doesn't cover the follow-up."""
+    contextual = f"{prev['query']} {query.strip()}"
+    pool = prev.get("candidates") or []
+    scores = rerank_scores(contextual, pool, corpus_version, stats)
+    best = max(scores, default=float("-inf"))
+    info = {"detected": True, "pool": len(pool), "best_score": round(best, 4) if pool else None,
+            "reused_pool": bool(pool) and best >= FOLLOWUP_MIN_SCORE}
+    if stats is not None:
+        stats["follow_up"] = info
+    print(f"[FOLLOWUP] '{query}' vs pool of '{prev['query']}': best={info['best_score']} reused={info['reused_pool']}")
+    if not info["reused_pool"]:
+        return None
+    return order_by_scores(scores, pool, top_k), contextual
+
+
+@contextmanager
+def _stage(stats: Optional[dict], name: str):
+    """Add the block's wall time to ``stats["timings_ms"][name]`` (no-op without stats)."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        if stats is not None:
+            timings = stats.setdefault("timings_ms", {})
+            timings[name] = round(timings.get(name, 0.0) + (time.perf_counter() - t0) * 1000, 1)
+
+
+def answer_question(vectordb, query, top_k=20, use_mmr=True, bm25_retriever: Optional[object] = None, use_hyde: bool = True,
+                    use_qoqa: bool = True, rewrite_budget: Optional[float] = None, use_rules: bool = True,
+                    rerank: bool = True, corpus_version: str = "", stats: Optional[dict] = None,
+                    session: Optional[dict] = None):
+    """
+    Retrieves relevant context from ChromaDB and queries the LLM with a strict prompt.
+    With ``rerank=False`` candidates keep their retrieval order (no cross-encoder load).
+    Reranker scores are cached per ``corpus_version``; pass a dict as ``stats`` to receive
+    the per-request cache counts.
+
+    ``session`` (see sessions.SessionStore) carries the previous turn. A follow-up ("what about
+    his email?") is first answered by re-scoring that turn's candidate pool with the previous
+    question as context; full retrieval runs only if no pooled doc scores FOLLOWUP_MIN_SCORE.
+
+    Query variants from the rule-based alias expander (``use_rules``) are merged alongside the
+    QOQA rewrite (``use_qoqa``), which always runs speculatively: retrieval on the raw query and
+    the alias variants starts immediately while the rewrite runs in the background, and rewritten
+    variants are merged only if the rewrite finishes within ``rewrite_budget`` seconds (default
+    QOQA_BUDGET_S). Rewrites are cached.
+    Wall time per stage (retrieve, rerank, select, generate, ...) goes to ``stats["timings_ms"]``.
+    """
+
+    try:
+        prev = session.get("last") if session is not None else None
+        if prev and rerank and is_follow_up(query):
+            with _stage(stats, "followup_pool"):
+                pooled = _rank_pool(query, prev, top_k, corpus_version, stats)
+            if pooled is not None:
+                ranked, contextual = pooled
+                with _stage(stats, "select"):
+                    results = select_context(contextual, ranked, top_k)
+                with _stage(stats, "generate"):
+                    return generate_answer(f"{query.strip()} (follow-up to: {prev['query']})", results)
+
+        with _stage(stats, "retrieve"):
+            canonical, candidate_docs = retrieve_candidates(
+                vectordb, query, top_k=top_k, bm25_retriever=bm25_retriever, use_qoqa=use_qoqa,
+                rewrite_budget=rewrite_budget, use_rules=use_rules,
+            )
+
+        # Rerank with the cross-encoder, cascading down the fused order until the top_k is settled
+        pool = unique_docs(candidate_docs)
+        if rerank:
+            with _stage(stats, "rerank"):
+                pool = cascade_rerank(canonical, pool, top_k, corpus_version, stats)[:max(top_k, FOLLOWUP_POOL_SIZE)]
+            candidate_docs = pool[:top_k]
+        if session is not None:
+            session["last"] = {"query": canonical, "candidates": pool[:FOLLOWUP_POOL_SIZE]}
+
+        with _stage(stats, "select"):
+            results = select_context(canonical, candidate_docs, top_k)
+        with _stage(stats, "generate"):
+            return generate_answer(query, results)
 
     except Exception as e:
         print(f"Error in answer_question: {e}")
         return "I encountered an error while processing your request."
 
 
+# --- Batch answering: shared encoder and reranker passes, concurrent generation ---
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "128"))
+
+
+def _embed_many(vectordb, texts: list[str]) -> list:
+    emb = vectordb.embeddings
+    embed = getattr(emb, "embed_queries", None) or emb.embed_documents
+    return embed(texts)
+
+
+def answer_batch(vectordb, questions: list[str], top_k: int = 20, bm25_retriever: Optional[object] = None,
+                 use_rules: bool = True, rerank: bool = True, corpus_version: str = "",
+                 max_concurrency: Optional[int] = None, with_context: bool = False):
+    """Answer many questions, yielding ``{"index", "question", "answer", "stats"}`` as each completes
+    (plus ``"context"``, the documents the answer was generated from, with ``with_context``).
+
+    Work is shared across the batch: every variant string is embedded in one encoder call,
+    dense retrieval runs by vector, and all (question, candidate) pairs are scored in one
+    cross-encoder pass. Generations run on a pool of ``max_concurrency`` (BATCH_LLM_CONCURRENCY).
+    QOQA rewrites are used only when already cached; batch mode never calls the LLM rewriter.
+    """
+    t0 = time.perf_counter()
+    plans = []
+    for q in questions:
+        canonical, variants, rule_variants = query_variants(q, use_rules)
+        variants = variants + _rewrite_variants(cached_rewrite(canonical), {v.lower() for v in variants})
+        plans.append((canonical, variants, rule_variants))
+
+    all_variants = list(dict.fromkeys(v for _, variants, _ in plans for v in variants))
+    vec_of = dict(zip(all_variants, _embed_many(vectordb, all_variants)))
+    t_embed = time.perf_counter()
+
+    candidates = []
+    for canonical, variants, rule_variants in plans:
+        ranked_lists = []
+        try:
+            for v in variants:
+                ranked_lists.append(_dense_search_by_vector(vectordb, vec_of[v], top_k))
+            ranked_lists.extend(_bm25_search(bm25_retriever, [canonical] + rule_variants, top_k))
+        except Exception as e:
+            print(f"[BATCH] retrieval failed for '{canonical}': {e}")
+        candidates.append(fuse_ranked(ranked_lists))
+    t_retrieve = time.perf_counter()
+
+    stats_list = [{} for _ in questions]
+    if rerank:
+        requests = [(plan[0], docs) for plan, docs in zip(plans, candidates)]
+        ranked = cascade_rerank_batch(requests, top_k, corpus_version, stats_list, batch_size=RERANK_BATCH_SIZE)
+        candidates = [docs[:top_k] for docs in ranked]
+    contexts = [select_context(plan[0], docs, top_k, verbose=False) for plan, docs in zip(plans, candidates)]
+    t_rerank = time.perf_counter()
+    print(f"[BATCH] {len(questions)} questions, {len(all_variants)} variants: embed={t_embed - t0:.2f}s "
+          f"retrieve={t_retrieve - t_embed:.2f}s rerank={t_rerank - t_retrieve:.2f}s")
+
+    pool = ThreadPoolExecutor(max_workers=max_concurrency or BATCH_LLM_CONCURRENCY, thread_name_prefix="batch-llm")
+    try:
+        futures = {pool.submit(generate_answer, q, ctx): i for i, (q, ctx) in enumerate(zip(questions, contexts))}
+        for fut in as_completed(futures):
+            i = futures[fut]
+            try:
+                answer = fut.result()
+            except Exception as e:
+                print(f"[BATCH] generation failed for question {i}: {e}")
+                answer = "I encountered an error while processing your request."
+            item = {"index": i, "question": questions[i], "answer": answer, "stats": stats_list[i]}
+            if with_context:
+                item["context"] = contexts[i]
+            yield item
+    finally:
+        # Client gone or batch finished: drop generations that haven't started
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
 def debug_retrieve(vectordb, query, top_k=5):
     """Diagnostics for retrieval: returns canonical, queries, candidates, filter decisions, and final prompt (truncated)."""
     info = {"query": query, "canonical": None, "queries": [], "candidates": [], "filtered": [], "selected": [], "final_prompt": None}
     try:
-        qo = qoqa_rewrite(query, n=3)
+        qo = qoqa_rewrite_cached(query, n=3)
         canonical = qo.get("canonical", query.strip())
         variants = [canonical] + qo.get("queries", [])
         if "iit ropar" not in canonical.lower():
@@ -457,7 +960,7 @@ def debug_retrieve(vectordb, query, top_k=5):
         info["selected"] = [{"snippet": (d.page_content or '')[:300], "metadata": getattr(d, 'metadata', {}) or {}} for d in selected]
 
         context = "\n\n".join(doc.page_content for doc in selected)
-        prompt_text = prompt_template.format_prompt(context=context, question=query).to_string()
+        prompt_text = get_prompt_template().format_prompt(context=context, question=query).to_string()
         info["final_prompt"] = prompt_text[:2000]
         return info
     except Exception as e:
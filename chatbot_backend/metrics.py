@@ -0,0 +1,63 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# In-process counters and latency summaries behind GET /metrics. Each series keeps exact
+# count/sum plus a window of the most recent observations for percentiles, so memory stays
+# fixed no matter how long the process runs. Per worker process (not aggregated across workers).
+
+WINDOW = 1024
+
+
+def _series_key(name: str, labels: dict) -> str:
+    if not labels:
+        return name
+    return name + "{" + ",".join(f"{k}={labels[k]}" for k in sorted(labels)) + "}"
+
+
+class Metrics:
+    def __init__(self, window: int = WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._latencies = {}  # key -> [count, total, deque]
+
+    def inc(self, name: str, n: int = 1, **labels):
+        key = _series_key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + n
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = _series_key(name, labels)
+        with self._lock:
+            entry = self._latencies.get(key)
+            if entry is None:
+                entry = self._latencies[key] = [0, 0.0, deque(maxlen=self.window)]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2].append(seconds)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Observe the block's wall time under ``name`` (also when it raises)."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            lat = {k: (c, t, sorted(w)) for k, (c, t, w) in self._latencies.items()}
+        out = {}
+        for key, (count, total, window) in lat.items():
+            pct = lambda p: round(window[min(len(window) - 1, int(p * len(window)))] * 1000, 2) if window else None
+            out[key] = {"count": count, "mean_ms": round(total / count * 1000, 2) if count else None,
+                        "p50_ms": pct(0.50), "p95_ms": pct(0.95), "max_ms": round(window[-1] * 1000, 2) if window else None}
+        return {"counters": counters, "latency": out}
+
+
+# Process-wide registry
+metrics = Metrics()
@@ -0,0 +1,175 @@
+import os
+
+import numpy as np
+
+# ONNX Runtime inference for the bi-encoder and the cross-encoder. Only numpy, onnxruntime and tokenizers are
+# needed at runtime; torch/transformers are imported by the export helpers (build time only).
+
+ENCODER_FILE = "model.onnx"
+QUANTIZED_FILE = "model.int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+
+# Exported models used by EMBED_BACKEND=onnx / RERANK_BACKEND=onnx (see scripts/export_onnx.py):
+#   <ONNX_MODEL_DIR>/embedder   bi-encoder (last_hidden_state, mean-pooled here)
+#   <ONNX_MODEL_DIR>/reranker   cross-encoder (logits)
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "models/onnx")
+# Use the dynamically int8-quantized weights when they were exported
+ONNX_QUANTIZED = os.getenv("ONNX_QUANTIZED", "0") == "1"
+# 0 lets ONNX Runtime pick (one intra-op thread per physical core)
+ORT_INTRA_OP_THREADS = int(os.getenv("ORT_INTRA_OP_THREADS", "0"))
+ORT_INTER_OP_THREADS = int(os.getenv("ORT_INTER_OP_THREADS", "0"))
+
+
+def _session(path: str, intra_op_threads: int | None = None, inter_op_threads: int | None = None):
+    import onnxruntime as ort
+
+    opts = ort.SessionOptions()
+    opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    intra_op_threads = intra_op_threads or ORT_INTRA_OP_THREADS
+    inter_op_threads = inter_op_threads or ORT_INTER_OP_THREADS
+    if intra_op_threads:
+        opts.intra_op_num_threads = intra_op_threads
+    if inter_op_threads:
+        opts.inter_op_num_threads = inter_op_threads
+        opts.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+    return ort.InferenceSession(path, sess_options=opts, providers=["CPUExecutionProvider"])
+
+
+def _model_path(model_dir: str, quantized: bool | None) -> str:
+    quantized = ONNX_QUANTIZED if quantized is None else quantized
+    path = os.path.join(model_dir, QUANTIZED_FILE)
+    if quantized and os.path.exists(path):
+        return path
+    if quantized:
+        print(f"[ONNX] No quantized model in {model_dir}; using {ENCODER_FILE}")
+    return os.path.join(model_dir, ENCODER_FILE)
+
+
+def _tokenizer(model_dir: str, max_length: int):
+    from tokenizers import Tokenizer
+
+    tok = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+    tok.enable_truncation(max_length=max_length)
+    tok.enable_padding(pad_id=tok.token_to_id("[PAD]") or 0, pad_token="[PAD]")
+    return tok
+
+
+def _feeds(enc, input_names) -> tuple[dict, np.ndarray]:
+    ids = np.asarray([e.ids for e in enc], dtype=np.int64)
+    mask = np.asarray([e.attention_mask for e in enc], dtype=np.int64)
+    feeds = {"input_ids": ids, "attention_mask": mask}
+    if "token_type_ids" in input_names:
+        feeds["token_type_ids"] = np.asarray([e.type_ids for e in enc], dtype=np.int64)
+    return feeds, mask
+
+
+class OnnxEmbeddings:
+    """Mean-pooled, L2-normalized sentence embeddings from an exported transformer.
+
+    Implements embed_query/embed_documents, so it can stand in for HuggingFaceEmbeddings
+    wherever the index only needs to encode queries.
+    """
+
+    def __init__(self, model_dir: str, max_length: int = 512, batch_size: int = 32,
+                 intra_op_threads: int | None = None, inter_op_threads: int | None = None,
+                 quantized: bool | None = None):
+        self.model_dir = model_dir
+        self.batch_size = batch_size
+        self.tokenizer = _tokenizer(model_dir, max_length)
+        self.session = _session(_model_path(model_dir, quantized), intra_op_threads, inter_op_threads)
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        out = []
+        for i in range(0, len(texts), self.batch_size):
+            enc = self.tokenizer.encode_batch(list(texts[i:i + self.batch_size]))
+            feeds, mask = _feeds(enc, self.input_names)
+            hidden = self.session.run(None, feeds)[0]  # (batch, seq, dim)
+            m = mask[..., None].astype(np.float32)
+            pooled = (hidden * m).sum(axis=1) / np.clip(m.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            out.append(pooled.astype(np.float32))
+        return np.concatenate(out) if out else np.zeros((0, 0), dtype=np.float32)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.encode(texts).tolist()
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.encode([text])[0].tolist()
+
+
+class OnnxCrossEncoder:
+    """(query, passage) relevance scores from an exported cross-encoder.
+
+    ``predict`` mirrors sentence_transformers.CrossEncoder.predict for single-label models and
+    returns the raw logits (the ms-marco rerankers use an identity activation).
+    """
+
+    def __init__(self, model_dir: str, max_length: int = 512, batch_size: int = 32,
+                 intra_op_threads: int | None = None, inter_op_threads: int | None = None,
+                 quantized: bool | None = None):
+        self.model_dir = model_dir
+        self.batch_size = batch_size
+        self.tokenizer = _tokenizer(model_dir, max_length)
+        self.session = _session(_model_path(model_dir, quantized), intra_op_threads, inter_op_threads)
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def predict(self, pairs, batch_size: int | None = None, **kwargs) -> np.ndarray:
+        pairs = [(str(q), str(p)) for q, p in pairs]
+        batch_size = batch_size or self.batch_size
+        out = []
+        for i in range(0, len(pairs), batch_size):
+            enc = self.tokenizer.encode_batch(pairs[i:i + batch_size])
+            feeds, _ = _feeds(enc, self.input_names)
+            logits = self.session.run(None, feeds)[0]  # (batch, num_labels)
+            out.append(logits[:, 0] if logits.shape[1] == 1 else logits)
+        return np.concatenate(out).astype(np.float32) if out else np.zeros(0, dtype=np.float32)
+
+
+def _export(model, tokenizer, out_dir: str, sample, output_name: str, output_axes: dict, opset: int):
+    import torch
+
+    os.makedirs(out_dir, exist_ok=True)
+    tokenizer.backend_tokenizer.save(os.path.join(out_dir, TOKENIZER_FILE))
+    names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in sample]
+    dynamic = {n: {0: "batch", 1: "seq"} for n in names}
+    dynamic[output_name] = output_axes
+    with torch.no_grad():
+        torch.onnx.export(
+            model, tuple(sample[n] for n in names), os.path.join(out_dir, ENCODER_FILE),
+            input_names=names, output_names=[output_name], dynamic_axes=dynamic, opset_version=opset,
+        )
+
+
+def export_sentence_encoder(model_name: str, out_dir: str, opset: int = 14) -> str:
+    """Export a HF sentence-transformer's transformer body + tokenizer to ``out_dir`` (needs torch)."""
+    from transformers import AutoModel, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    _export(model, tokenizer, out_dir, sample, "last_hidden_state", {0: "batch", 1: "seq"}, opset)
+    print(f"[ONNX] Exported {model_name} to {out_dir}")
+    return out_dir
+
+
+def export_cross_encoder(model_name: str, out_dir: str, opset: int = 14) -> str:
+    """Export a HF sequence-classification cross-encoder + tokenizer to ``out_dir`` (needs torch)."""
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+    sample = tokenizer([("export query", "export passage")], return_tensors="pt")
+    _export(model, tokenizer, out_dir, sample, "logits", {0: "batch"}, opset)
+    print(f"[ONNX] Exported {model_name} to {out_dir}")
+    return out_dir
+
+
+def quantize_model(model_dir: str) -> str:
+    """Dynamic (weight-only int8, activations quantized at runtime) copy of ``model_dir``'s model."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    src, dst = os.path.join(model_dir, ENCODER_FILE), os.path.join(model_dir, QUANTIZED_FILE)
+    quantize_dynamic(src, dst, weight_type=QuantType.QInt8)
+    print(f"[ONNX] Quantized {src} -> {dst} ({os.path.getsize(src) / 1e6:.1f} MB -> {os.path.getsize(dst) / 1e6:.1f} MB)")
+    return dst
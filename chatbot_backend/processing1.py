@@ -1,61 +1,157 @@
-import pandas as pd
-from langchain_core.documents import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import hashlib
+import os
 
 # ==========================
-# Load CSV into Documents
+# Corpus version (content hash of the source file)
 # ==========================
-def load_csv(csv_path: str):
-    print(f"[DEBUG] Loading CSV from: {csv_path}")
-    df = pd.read_csv(csv_path)
-    # Normalize headers to lowercase to tolerate 'Category, Question, Answer'
-    df.columns = [str(c).strip().lower() for c in df.columns]
-    print(f"[DEBUG] Detected columns: {list(df.columns)}")
+def corpus_version(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
 
-    documents = []
-    for i, row in df.iterrows():
-        # Expect lowercase: category, question, answer (after normalization above)
-        question = str(row.get("question", "")).strip()
-        answer = str(row.get("answer", "")).strip()
-        category = str(row.get("category", "General")).strip()
+# Rows per pandas chunk (or Parquet record batch) while streaming the source file
+CSV_CHUNK_ROWS = int(os.getenv("CSV_CHUNK_ROWS", "10000"))
 
-        if not question or not answer:
-            continue  # skip incomplete rows
+# ==========================
+# Stream CSV / Parquet into Documents
+# ==========================
+def _iter_frames(path: str, chunk_rows: int):
+    """DataFrames of at most ``chunk_rows`` rows, all cells as strings ("" for missing)."""
+    import pandas as pd
+
+    if path.lower().endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq  # only needed for Parquet sources
+        except ImportError as e:
+            raise ImportError(f"Reading {path} needs pyarrow (pip install pyarrow)") from e
+
+        offset = 0
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            df = batch.to_pandas().fillna("").astype(str)
+            df.index = pd.RangeIndex(offset, offset + len(df))
+            offset += len(df)
+            yield df
+        return
+    # Index continues across chunks, so "row" matches the whole-file row number
+    yield from pd.read_csv(path, chunksize=chunk_rows, dtype=str, keep_default_na=False)
+
+
+def _column(df, name: str):
+    """Stripped string column, or empty strings when the file has no such column."""
+    if name in df.columns:
+        return df[name].str.strip()
+    return df.index.to_series().map(lambda _: "")
 
-        # Q&A style content
-        content = f"Q: {question}\nA: {answer}"
 
-        # Metadata: keep category + row index
-        metadata = {
-            "row": i,
-            "source": csv_path,
-            "category": category,
-            "question": question,
-            "answer": answer
-        }
+def iter_csv_documents(csv_path: str, chunk_rows: int = CSV_CHUNK_ROWS):
+    """Yield one Q&A Document per complete row, reading ``chunk_rows`` rows at a time.
 
-        doc = Document(page_content=content, metadata=metadata)
-        documents.append(doc)
+    Content and metadata are built with column operations per chunk, so memory is bounded by
+    the chunk size rather than the file size.
+    """
+    from langchain_core.documents import Document
 
+    for df in _iter_frames(csv_path, chunk_rows):
+        # Normalize headers to lowercase to tolerate 'Category, Question, Answer'
+        df.columns = [str(c).strip().lower() for c in df.columns]
+        question, answer, category = (_column(df, name) for name in ("question", "answer", "category"))
+        category = category.mask(category == "", "General")
+        keep = (question != "") & (answer != "")  # skip incomplete rows
+        question, answer, category = question[keep], answer[keep], category[keep]
+        # Q&A style content
+        content = "Q: " + question + "\nA: " + answer
+        for i, text, cat, q, a in zip(question.index, content, category, question, answer):
+            # Metadata: keep category + row index
+            yield Document(page_content=text, metadata={
+                "row": int(i),
+                "source": csv_path,
+                "category": cat,
+                "question": q,
+                "answer": a,
+            })
+
+
+def load_csv(csv_path: str, chunk_rows: int = CSV_CHUNK_ROWS):
+    """All documents of ``csv_path`` as a list (see iter_csv_documents for streaming)."""
+    print(f"[DEBUG] Loading CSV from: {csv_path}")
+    documents = list(iter_csv_documents(csv_path, chunk_rows))
     print(f"[DEBUG] Loaded {len(documents)} Q&A documents with categories")
     return documents
 
 # ==========================
 # Split only long answers
 # ==========================
-def split_documents(documents, chunk_size=500, chunk_overlap=50):
-    print(f"[DEBUG] Splitting {len(documents)} documents into chunks (if needed)...")
+def iter_split_documents(documents, chunk_size=500, chunk_overlap=50):
+    """Lazily split an iterable of documents; short docs pass through whole."""
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap
     )
-
-    chunks = []
     for doc in documents:
         if len(doc.page_content) > chunk_size:
-            chunks.extend(text_splitter.split_documents([doc]))
+            yield from text_splitter.split_documents([doc])
         else:
-            chunks.append(doc)  # short docs remain whole
+            yield doc  # short docs remain whole
 
+
+def split_documents(documents, chunk_size=500, chunk_overlap=50):
+    print("[DEBUG] Splitting documents into chunks (if needed)...")
+    chunks = list(iter_split_documents(documents, chunk_size, chunk_overlap))
     print(f"[DEBUG] Created {len(chunks)} chunks total")
     return chunks
+
+# ==========================
+# Chunking for the index
+# ==========================
+# "tokens": token-aware chunks sized to the embedder window (chunking.py)
+# "chars":  the character splitter above with the historical 1000/200 settings
+CHUNKER = os.getenv("CHUNKER", "tokens").lower()
+CHAR_CHUNK_SIZE, CHAR_CHUNK_OVERLAP = 1000, 200
+
+
+def chunking_id(chunker: str = CHUNKER) -> str:
+    """Identifies the chunking (and near-duplicate collapse) settings; part of the ingest key and
+    the artifact manifest."""
+    from .chunking import CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS
+    from .dedup import DEDUP_ENABLED, DEDUP_NUM_PERM, DEDUP_THRESHOLD
+
+    if chunker == "chars":
+        cid = f"chars:{CHAR_CHUNK_SIZE}:{CHAR_CHUNK_OVERLAP}"
+    else:
+        cid = f"tokens:{CHUNK_MAX_TOKENS}:{CHUNK_OVERLAP_TOKENS}"
+    return cid + (f"+dedup:{DEDUP_THRESHOLD}:{DEDUP_NUM_PERM}" if DEDUP_ENABLED else "")
+
+
+def iter_chunks(documents, stats=None, chunker: str = CHUNKER, dedup_report: str | None = None):
+    """Lazily chunk documents for indexing with ``chunker``; ``stats`` (chunking.new_stats())
+    receives chunk counts, token lengths and how many chunks exceed the embedder limit.
+    Near-duplicate rows are collapsed first (dedup.py, DEDUP_ENABLED); that step reads all rows
+    before the first chunk comes out, and writes its cluster report to ``dedup_report`` when given."""
+    from .chunking import iter_measured, iter_token_chunks, new_stats
+    from .dedup import DEDUP_ENABLED, iter_dedup
+
+    stats = new_stats() if stats is None else stats
+    if DEDUP_ENABLED:
+        documents = iter_dedup(documents, report_path=dedup_report)
+    if chunker == "chars":
+        def counted(docs):
+            for doc in docs:
+                stats["documents"] += 1
+                stats["split_documents"] += len(doc.page_content) > CHAR_CHUNK_SIZE
+                yield doc
+        return iter_measured(iter_split_documents(counted(documents), CHAR_CHUNK_SIZE, CHAR_CHUNK_OVERLAP), stats)
+    return iter_token_chunks(documents, stats=stats)
+
+
+def chunk_documents(documents, chunker: str = CHUNKER, dedup_report: str | None = None):
+    """All chunks as a list, with the chunking report printed."""
+    from .chunking import new_stats, report
+
+    stats = new_stats()
+    chunks = list(iter_chunks(documents, stats, chunker, dedup_report))
+    print(f"[CHUNK] {chunker}: {report(stats)}")
+    return chunks
@@ -0,0 +1,205 @@
+import heapq
+import itertools
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Opt-in profiling of single requests, plus an always-on record of the slowest ones.
+#   arm:     POST /admin/profile (next N requests of this process) or X-Profile: 1 with admin rights
+#   cpu:     a sampler thread reads the request thread's stack every PROFILE_INTERVAL_S and writes
+#            collapsed stacks ("a;b;c <count>", flamegraph.pl / speedscope) to PROFILE_DIR/<id>.cpu.folded
+#   memory:  tracemalloc snapshots before and after; allocations still held at the end go to
+#            <id>.alloc.folded (bytes per stack) and the peak to the request stats. tracemalloc is
+#            process-wide, so one memory profile runs at a time and it sees other threads' allocations too.
+#            It slows allocation-heavy Python code a lot; read timings from a memory=0 profile
+# Unarmed, the cost per request is one integer check. The slow log keeps the SLOW_LOG_SIZE slowest
+# requests of the last SLOW_LOG_WINDOW_S seconds with their stage timings (GET /admin/slow).
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL_S = float(os.getenv("PROFILE_INTERVAL_S", "0.005"))
+PROFILE_MAX_REQUESTS = int(os.getenv("PROFILE_MAX_REQUESTS", "100"))
+PROFILE_TRACEMALLOC_FRAMES = int(os.getenv("PROFILE_TRACEMALLOC_FRAMES", "8"))
+SLOW_LOG_SIZE = int(os.getenv("SLOW_LOG_SIZE", "20"))
+SLOW_LOG_WINDOW_S = float(os.getenv("SLOW_LOG_WINDOW_S", "3600"))
+
+
+def _short_path(filename: str) -> str:
+    # Last two path parts keep names short but tell chatbot_backend/llm.py from langchain/.../llm.py
+    return "/".join(filename.replace("\\", "/").split("/")[-2:])
+
+
+def _frame_name(filename: str, name: str, firstlineno: int) -> str:
+    return f"{_short_path(filename)}:{name}:{firstlineno}"
+
+
+class StackSampler:
+    """Samples one thread's Python stack on a background thread and counts collapsed stacks."""
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_INTERVAL_S):
+        self.thread_id, self.interval = thread_id, interval
+        self.counts = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _run(self):
+        names = {}  # code object -> frame name
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                name = names.get(code)
+                if name is None:
+                    name = names[code] = _frame_name(code.co_filename, code.co_name, code.co_firstlineno)
+                stack.append(name)
+                frame = frame.f_back
+            if stack:
+                key = ";".join(reversed(stack))
+                self.counts[key] = self.counts.get(key, 0) + 1
+                self.samples += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+def _write_folded(path: str, counts: dict):
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, n in sorted(counts.items(), key=lambda kv: -kv[1]):
+            f.write(f"{stack} {n}\n")
+
+
+class Profiler:
+    """Arms profiling for the next N requests and runs it around a block of one request."""
+
+    def __init__(self, out_dir: str = PROFILE_DIR):
+        self.out_dir = out_dir
+        self._armed = 0
+        self._memory = True
+        self._lock = threading.Lock()
+        self._mem_lock = threading.Lock()
+        self._seq = itertools.count(1)
+        self.recent = []  # latest profile summaries, newest last
+
+    def arm(self, requests: int = 1, memory: bool = True) -> dict:
+        with self._lock:
+            self._armed = max(0, min(int(requests), PROFILE_MAX_REQUESTS))
+            self._memory = memory
+        print(f"[PROFILE] armed for the next {self._armed} requests (memory={memory})")
+        return self.state()
+
+    def take(self, forced: bool = False) -> bool:
+        """Whether to profile this request; consumes one armed slot. Lock-free when unarmed."""
+        if forced:
+            return True
+        if self._armed <= 0:
+            return False
+        with self._lock:
+            if self._armed <= 0:
+                return False
+            self._armed -= 1
+            return True
+
+    @contextmanager
+    def profile(self, label: str, stats: dict | None = None, memory: bool | None = None):
+        """Profile the enclosed block of the current thread. Adds file paths and totals to ``stats["profile"]``."""
+        os.makedirs(self.out_dir, exist_ok=True)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(self._seq)}"
+        memory = self._memory if memory is None else memory
+        tracing = memory and self._mem_lock.acquire(blocking=False)
+        started_tracing, before = False, None
+        if tracing:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(PROFILE_TRACEMALLOC_FRAMES)
+                started_tracing = True
+            tracemalloc.reset_peak()
+            before = tracemalloc.take_snapshot()
+        sampler = StackSampler(threading.get_ident()).start()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - t0
+            sampler.stop()
+            info = {"id": name, "label": label[:200], "seconds": round(seconds, 3), "samples": sampler.samples,
+                    "cpu": os.path.join(self.out_dir, f"{name}.cpu.folded")}
+            _write_folded(info["cpu"], sampler.counts)
+            if tracing:
+                try:
+                    after = tracemalloc.take_snapshot()
+                    _, peak = tracemalloc.get_traced_memory()
+                    info["memory"] = os.path.join(self.out_dir, f"{name}.alloc.folded")
+                    info["peak_mb"] = round(peak / 1e6, 2)
+                    self._write_allocations(info, before, after)
+                finally:
+                    if started_tracing:
+                        tracemalloc.stop()
+                    self._mem_lock.release()
+            print(f"[PROFILE] {label[:80]!r}: {seconds * 1000:.0f}ms, {sampler.samples} samples -> {info['cpu']}"
+                  + (f", peak {info['peak_mb']} MB -> {info['memory']}" if "memory" in info else ""))
+            with self._lock:
+                self.recent = (self.recent + [info])[-SLOW_LOG_SIZE:]
+            if stats is not None:
+                stats["profile"] = info
+
+    @staticmethod
+    def _write_allocations(info: dict, before, after):
+        # Drop tracemalloc's and the profiler's own allocations (sampler thread, snapshots)
+        own = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__, all_frames=True)]
+        diff = after.filter_traces(own).compare_to(before.filter_traces(own), "traceback")
+        counts = {}
+        for stat in diff:
+            if stat.size_diff <= 0:
+                continue
+            stack = ";".join(f"{_short_path(fr.filename)}:{fr.lineno}" for fr in stat.traceback)
+            counts[stack] = counts.get(stack, 0) + stat.size_diff
+        _write_folded(info["memory"], counts)
+        info["retained_mb"] = round(sum(counts.values()) / 1e6, 2)
+
+    def state(self) -> dict:
+        with self._lock:
+            return {"armed": self._armed, "memory": self._memory, "dir": os.path.abspath(self.out_dir),
+                    "recent": list(self.recent)}
+
+
+class SlowLog:
+    """The ``size`` slowest requests of the last ``window_s`` seconds (min-heap on duration)."""
+
+    def __init__(self, size: int = SLOW_LOG_SIZE, window_s: float = SLOW_LOG_WINDOW_S):
+        self.size, self.window_s = size, window_s
+        self._heap = []  # (seconds, seq, entry)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, **entry):
+        now = time.time()
+        with self._lock:
+            if any(now - e["at"] > self.window_s for _, _, e in self._heap):
+                self._heap = [item for item in self._heap if now - item[2]["at"] <= self.window_s]
+                heapq.heapify(self._heap)
+            if len(self._heap) >= self.size and seconds <= self._heap[0][0]:
+                return
+            item = (seconds, next(self._seq), dict(entry, at=now, ms=round(seconds * 1000, 1)))
+            if len(self._heap) >= self.size:
+                heapq.heapreplace(self._heap, item)
+            else:
+                heapq.heappush(self._heap, item)
+
+    def snapshot(self) -> list[dict]:
+        now = time.time()
+        with self._lock:
+            items = [e for _, _, e in self._heap if now - e["at"] <= self.window_s]
+        return sorted(items, key=lambda e: -e["ms"])
+
+
+# Process-wide instances
+profiler = Profiler()
+slow_log = SlowLog()
@@ -0,0 +1,67 @@
+import numpy as np
+
+# Compressed embedding storage for the index artifact.
+#   float16: plain half-precision copy (2 bytes/dim)
+#   int8:    symmetric per-vector quantization, x ~= codes * scale with scale = max|x| / 127 (1 byte/dim + 4 bytes/vector)
+# Scores are computed block-wise, upcasting one block at a time, so the float32 working set stays
+# bounded no matter how large the corpus grows.
+
+DTYPES = ("float32", "float16", "int8")
+
+
+def quantize_int8(mat: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    mat = np.asarray(mat, dtype=np.float32)
+    scales = np.abs(mat).max(axis=1) / 127.0
+    scales = np.where(scales == 0, 1.0, scales).astype(np.float32)
+    codes = np.clip(np.rint(mat / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales
+
+
+def compress(mat: np.ndarray, dtype: str):
+    """Return (data, scales) for ``dtype``; scales is None except for int8."""
+    if dtype == "float16":
+        return np.asarray(mat, dtype=np.float16), None
+    if dtype == "int8":
+        return quantize_int8(mat)
+    if dtype == "float32":
+        return np.asarray(mat, dtype=np.float32), None
+    raise ValueError(f"Unsupported embedding dtype '{dtype}', expected one of {DTYPES}")
+
+
+class CompressedMatrix:
+    """Row-major embedding matrix in float32/float16/int8 supporting blocked dot-product scoring."""
+
+    def __init__(self, data: np.ndarray, scales: np.ndarray | None = None, block_rows: int = 16384):
+        self.data = data
+        self.scales = scales
+        self.block_rows = block_rows
+
+    @property
+    def dtype(self) -> str:
+        return str(self.data.dtype)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.data.nbytes + (self.scales.nbytes if self.scales is not None else 0))
+
+    def __len__(self):
+        return len(self.data)
+
+    def scores(self, q: np.ndarray) -> np.ndarray:
+        q = np.asarray(q, dtype=np.float32)
+        if self.data.dtype == np.float32:
+            return self.data @ q
+        out = np.empty(len(self.data), dtype=np.float32)
+        for lo in range(0, len(self.data), self.block_rows):
+            hi = min(lo + self.block_rows, len(self.data))
+            out[lo:hi] = self.data[lo:hi].astype(np.float32) @ q
+        if self.scales is not None:
+            out *= self.scales
+        return out
+
+    def rows(self, idx) -> np.ndarray:
+        """Dequantized float32 rows (approximate for int8/float16)."""
+        r = np.asarray(self.data[idx], dtype=np.float32)
+        if self.scales is not None:
+            r *= self.scales[idx][:, None]
+        return r
@@ -0,0 +1,133 @@
+import json
+import os
+import re
+import threading
+from typing import Optional
+
+# Alias table written by scripts/mine_aliases.py: {"aliases": {phrase: [alias, ...]}}
+ALIAS_TABLE_PATH = os.getenv(
+    "ALIAS_TABLE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "aliases.json"),
+)
+
+# Hand-curated pairs (previously only listed inside the QOQA prompt). Always merged into the table.
+SEED_ALIASES = [
+    ("hod", "head of department"),
+    ("cse", "computer science"),
+    ("cse", "computer science and engineering"),
+    ("ece", "electronics and communication engineering"),
+    ("ee", "electrical engineering"),
+    ("mess", "hostel mess"),
+    ("sports complex", "gym"),
+]
+
+_TOKEN_RE = re.compile(r"[A-Za-z0-9&]+(?:['.][A-Za-z0-9]+)*")
+
+
+def tokenize(text: str) -> list[str]:
+    return [m.group(0).lower() for m in _TOKEN_RE.finditer(text or "")]
+
+
+def _add_pair(table: dict, a: str, b: str):
+    a, b = " ".join(tokenize(a)), " ".join(tokenize(b))
+    if not a or not b or a == b:
+        return
+    for x, y in ((a, b), (b, a)):
+        lst = table.setdefault(x, [])
+        if y not in lst:
+            lst.append(y)
+
+
+class QueryExpander:
+    """Token-trie alias matcher producing retrieval variants without an LLM call.
+
+    The trie is keyed by lowercase tokens; a scan over the query does greedy longest
+    matching, so "head of department" wins over "head".
+    """
+
+    _END = "\0"
+
+    def __init__(self, table: dict):
+        self.table = table
+        self.trie = {}
+        for phrase, aliases in table.items():
+            node = self.trie
+            for tok in phrase.split():
+                node = node.setdefault(tok, {})
+            node[self._END] = aliases
+
+    @classmethod
+    def from_file(cls, path: str = ALIAS_TABLE_PATH, seeds=SEED_ALIASES) -> "QueryExpander":
+        table = {}
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for phrase, aliases in (data.get("aliases") or {}).items():
+                for a in aliases:
+                    _add_pair(table, phrase, a)
+            print(f"[EXPAND] Loaded {len(table)} alias phrases from {path}")
+        for a, b in seeds or []:
+            _add_pair(table, a, b)
+        return cls(table)
+
+    def matches(self, query: str) -> list[tuple[int, int, list[str]]]:
+        """Return (char_start, char_end, aliases) for each longest non-overlapping match."""
+        spans = [(m.start(), m.end(), m.group(0).lower()) for m in _TOKEN_RE.finditer(query or "")]
+        out, i = [], 0
+        while i < len(spans):
+            node, best = self.trie, None
+            j = i
+            while j < len(spans) and spans[j][2] in node:
+                node = node[spans[j][2]]
+                j += 1
+                if self._END in node:
+                    best = (j, node[self._END])
+            if best:
+                end, aliases = best
+                out.append((spans[i][0], spans[end - 1][1], aliases))
+                i = end
+            else:
+                i += 1
+        return out
+
+    def expand(self, query: str, max_variants: int = 3) -> list[str]:
+        """Variants of ``query`` with matched spans replaced by their aliases (at most ``max_variants``)."""
+        found = self.matches(query)
+        if not found:
+            return []
+        variants, seen = [], {(query or "").strip().lower()}
+
+        def _push(text: str):
+            s = re.sub(r"\s+", " ", text).strip()
+            if s and s.lower() not in seen:
+                seen.add(s.lower())
+                variants.append(s)
+
+        # best alias per span first, then the all-spans variant, then second-choice aliases
+        for start, end, aliases in found:
+            _push(query[:start] + aliases[0] + query[end:])
+        if len(found) > 1:
+            text = query
+            for start, end, aliases in reversed(found):
+                text = text[:start] + aliases[0] + text[end:]
+            _push(text)
+        for start, end, aliases in found:
+            for alias in aliases[1:2]:
+                _push(query[:start] + alias + query[end:])
+        return variants[:max_variants]
+
+
+_expander: Optional[QueryExpander] = None
+_expander_lock = threading.Lock()
+
+
+def get_expander() -> QueryExpander:
+    global _expander
+    with _expander_lock:
+        if _expander is None:
+            _expander = QueryExpander.from_file()
+    return _expander
+
+
+def expand_query(query: str, max_variants: int = 3) -> list[str]:
+    return get_expander().expand(query, max_variants=max_variants)
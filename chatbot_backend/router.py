@@ -0,0 +1,222 @@
+import os
+import re
+import time
+
+import numpy as np
+
+from .metrics import metrics
+
+# Query router run before answer_question. Greetings, thanks, goodbyes, "who are you" and clearly
+# off-domain questions get a canned reply without retrieval, reranking or an LLM call.
+#   1. exact rules: whole-message small-talk patterns (word boundaries, so "this"/"which" never
+#      look like "hi") and IIT Ropar keywords that force the domain route;
+#   2. the query embedding (cached, so retrieval reuses it) against per-category domain centroids
+#      computed from the index, and against small-talk / off-domain exemplars embedded at load.
+# Anything uncertain goes to the domain route: a wrong refusal costs more than one extra retrieval.
+
+ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "1") != "0"
+# Min cosine to the nearest small-talk exemplar, and its required lead over the domain centroids
+ROUTER_SMALLTALK_MIN = float(os.getenv("ROUTER_SMALLTALK_MIN", "0.60"))
+# Below this cosine to every domain centroid a query is off-domain
+ROUTER_DOMAIN_MIN = float(os.getenv("ROUTER_DOMAIN_MIN", "0.25"))
+# Lead an off-domain / small-talk exemplar needs over the best domain centroid
+ROUTER_MARGIN = float(os.getenv("ROUTER_MARGIN", "0.05"))
+# Spherical k-means centroids per category (fewer for small categories)
+ROUTER_CENTROIDS_PER_CATEGORY = int(os.getenv("ROUTER_CENTROIDS_PER_CATEGORY", "4"))
+# Extra comma-separated domain keywords
+ROUTER_DOMAIN_KEYWORDS = [k.strip().lower() for k in os.getenv("ROUTER_DOMAIN_KEYWORDS", "").split(",") if k.strip()]
+
+GREETING_REPLY = "Hello! I'm the IIT Ropar chatbot. How can I help you today?"
+REFUSAL_REPLY = "I’m sorry, I can only answer questions related to IIT Ropar."
+
+REPLIES = {
+    "greeting": GREETING_REPLY,
+    "thanks": "You're welcome! Feel free to ask anything else about IIT Ropar.",
+    "bye": "Goodbye! Come back any time you have questions about IIT Ropar.",
+    "about": ("I'm the IIT Ropar chatbot. I can answer questions about academics, departments, faculty, "
+              "admissions, hostels, the mess and campus life."),
+    "off_domain": REFUSAL_REPLY,
+}
+
+_TAIL = r"(?:\s+(?:there|bot|chatbot|all|everyone|buddy|friend|again))?[\s!.,?:)]*"
+RULES = [
+    ("greeting", re.compile(
+        r"^\s*(?:(?:hi+|hello+|hey+|hiya|howdy|greetings|namaste|yo|"
+        r"good\s+(?:morning|afternoon|evening|day)|what'?s\s+up|sup|"
+        r"how\s+are\s+you(?:\s+doing)?(?:\s+today)?|how'?s\s+it\s+going)" + _TAIL + r")+$", re.I)),
+    # "ok" / "great" alone is an acknowledgement mid-conversation, not thanks; only as a prefix
+    ("thanks", re.compile(
+        r"^\s*(?:(?:ok(?:ay)?|great|cool|nice|perfect|awesome|got\s+it)[\s,!.]*)?"
+        r"(?:thanks?(?:\s+(?:a\s+lot|so\s+much|very\s+much))?|thank\s+you(?:\s+(?:so|very)\s+much)?|thx|ty)" + _TAIL + r"$",
+        re.I)),
+    ("bye", re.compile(r"^\s*(?:bye+|good\s*bye|see\s+you(?:\s+later)?|good\s+night|cya|take\s+care)" + _TAIL + r"$", re.I)),
+    ("about", re.compile(
+        r"^\s*(?:who\s+are\s+you|what\s+are\s+you|what\s+can\s+you\s+do|what\s+do\s+you\s+do|"
+        r"are\s+you\s+a\s+(?:bot|robot|human))[\s?!.]*$", re.I)),
+]
+
+DOMAIN_KEYWORDS = [
+    "iit", "iitrpr", "ropar", "rupnagar", "campus", "institute", "hostel", "mess", "hod", "dean", "director",
+    "professor", "prof", "faculty", "department", "dept", "cse", "ece", "saide", "dbme", "chemical",
+    "civil", "mechanical", "admission", "admissions", "jee", "josaa", "gate", "course", "courses",
+    "curriculum", "syllabus", "elective", "library", "scholarship", "scholarships", "fee", "fees", "semester",
+    "btech", "b.tech", "mtech", "m.tech", "phd", "msc", "placement", "placements", "lab", "labs", "guest house",
+    "transport", "bus", "cdc", "convocation", "registrar", "warden", "student", "students",
+]
+
+# Embedded once per process; labels match the rule names above
+EXEMPLARS = {
+    "greeting": ["hello", "hi there", "hey, good morning", "good evening to you", "how are you doing today"],
+    "thanks": ["thank you so much", "thanks for the help", "that was helpful, thanks"],
+    "bye": ["goodbye", "see you later", "bye, have a nice day"],
+    "about": ["who are you", "what can you help me with", "are you a human or a bot", "what is your name"],
+    "off_domain": [
+        "what is the weather today", "tell me a joke", "who won the cricket world cup",
+        "write a python function to sort a list", "what is the capital of france",
+        "recommend a good movie to watch", "what is the price of bitcoin", "how do I cook pasta",
+        "who is the prime minister of the united kingdom", "translate this sentence into spanish",
+        "explain quantum entanglement", "what is the best smartphone to buy",
+    ],
+}
+
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9.]*")
+
+
+def _decision(route: str, by: str, **scores) -> dict:
+    return {"route": route, "reply": REPLIES.get(route), "by": by,
+            "scores": {k: round(float(v), 4) for k, v in scores.items()}}
+
+
+def match_rules(text: str) -> dict | None:
+    """Rule-only routing (no model needed). None when no rule applies."""
+    text = (text or "").strip()
+    if not text:
+        return None
+    for label, pattern in RULES:
+        if pattern.match(text):
+            return _decision(label, "rule")
+    tokens = [w.rstrip(".") for w in _WORD_RE.findall(text.lower())]
+    words, lowered = set(tokens), " " + " ".join(tokens) + " "
+    for kw in DOMAIN_KEYWORDS + ROUTER_DOMAIN_KEYWORDS:
+        if (" " in kw and f" {kw} " in lowered) or kw in words:
+            return _decision("domain", "keyword")
+    return None
+
+
+def _normalize(mat: np.ndarray) -> np.ndarray:
+    mat = np.asarray(mat, dtype=np.float32)
+    norms = np.linalg.norm(mat, axis=-1, keepdims=True)
+    return mat / np.where(norms > 0, norms, 1.0)
+
+
+def spherical_kmeans(vectors: np.ndarray, k: int, iters: int = 10, seed: int = 0) -> np.ndarray:
+    """Unit-norm centroids of ``vectors`` (rows assumed normalized)."""
+    n = len(vectors)
+    if n <= k:
+        return _normalize(vectors)
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(n, size=k, replace=False)].copy()
+    for _ in range(iters):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        for c in range(k):
+            members = vectors[assign == c]
+            if len(members):
+                centroids[c] = members.sum(axis=0)
+        centroids = _normalize(centroids)
+    return centroids
+
+
+def domain_centroids(vectors: np.ndarray, categories: list, per_category: int = ROUTER_CENTROIDS_PER_CATEGORY,
+                     rows_per_centroid: int = 50) -> np.ndarray:
+    """A few centroids per corpus category, so narrow categories keep their own direction."""
+    vectors = _normalize(vectors)
+    categories = np.asarray([str(c or "General") for c in categories])
+    out = []
+    for cat in dict.fromkeys(categories.tolist()):
+        members = vectors[categories == cat]
+        k = max(1, min(per_category, -(-len(members) // rows_per_centroid)))
+        out.append(spherical_kmeans(members, k))
+    return np.concatenate(out, axis=0) if out else np.zeros((0, vectors.shape[1]), dtype=np.float32)
+
+
+def corpus_vectors(vectordb, page: int = 5000) -> tuple[np.ndarray, list]:
+    """(document vectors, categories) from the index artifact or a Chroma collection."""
+    artifact = getattr(vectordb, "artifact", None)
+    if artifact is not None:
+        return artifact.vectors(np.arange(len(artifact))), list(artifact.metadata_columns.get("category") or [None] * len(artifact))
+    collection = vectordb._collection
+    vecs, cats, offset = [], [], 0
+    while True:
+        got = collection.get(include=["embeddings", "metadatas"], limit=page, offset=offset)
+        if not len(got["ids"]):
+            break
+        vecs.append(np.asarray(got["embeddings"], dtype=np.float32))
+        cats.extend((m or {}).get("category") for m in got["metadatas"])
+        offset += len(got["ids"])
+    return (np.concatenate(vecs, axis=0) if vecs else np.zeros((0, 0), dtype=np.float32)), cats
+
+
+class Router:
+    """Rules first, then cosine similarity of the query embedding to domain centroids and exemplars."""
+
+    def __init__(self, embeddings, centroids: np.ndarray, exemplars: dict = EXEMPLARS,
+                 smalltalk_min: float = ROUTER_SMALLTALK_MIN, domain_min: float = ROUTER_DOMAIN_MIN,
+                 margin: float = ROUTER_MARGIN):
+        self.embeddings = embeddings
+        self.centroids = _normalize(centroids)
+        self.smalltalk_min, self.domain_min, self.margin = smalltalk_min, domain_min, margin
+        texts = [t for ts in exemplars.values() for t in ts]
+        self.exemplar_labels = np.asarray([label for label, ts in exemplars.items() for _ in ts])
+        self.exemplar_vectors = _normalize(embeddings.embed_documents(texts)) if texts else np.zeros((0, 0))
+
+    def classify(self, text: str) -> dict:
+        rule = match_rules(text)
+        if rule is not None:
+            return rule
+        q = _normalize(np.asarray(self.embeddings.embed_query(text.strip()), dtype=np.float32))
+        dom = float((self.centroids @ q).max()) if len(self.centroids) else 1.0
+        sims = self.exemplar_vectors @ q
+        best = {label: float(sims[self.exemplar_labels == label].max()) for label in dict.fromkeys(self.exemplar_labels)}
+        off = best.pop("off_domain", -1.0)
+        small_label = max(best, key=best.get) if best else None
+        small = best.get(small_label, -1.0)
+        if small_label and small >= self.smalltalk_min and small - dom >= self.margin:
+            return _decision(small_label, "embedding", domain=dom, smalltalk=small, off_domain=off)
+        if dom < self.domain_min or off - dom >= self.margin:
+            return _decision("off_domain", "embedding", domain=dom, smalltalk=small, off_domain=off)
+        return _decision("domain", "embedding", domain=dom, smalltalk=small, off_domain=off)
+
+    def route(self, text: str) -> dict:
+        """Like classify, but fails open (domain) on encoder errors and records metrics."""
+        t0 = time.perf_counter()
+        try:
+            decision = self.classify(text)
+        except Exception as e:
+            print(f"[ROUTER] embedding route failed, using retrieval: {e}")
+            decision = _decision("domain", "error")
+        decision["ms"] = round((time.perf_counter() - t0) * 1000, 2)
+        metrics.inc("router_routes", route=decision["route"], by=decision["by"])
+        metrics.observe("router", decision["ms"] / 1000)
+        return decision
+
+
+def build_router(vectordb, embeddings=None) -> Router:
+    """Router over ``vectordb``'s documents (centroids are recomputed whenever the index changes)."""
+    t0 = time.perf_counter()
+    vectors, categories = corpus_vectors(vectordb)
+    centroids = domain_centroids(vectors, categories) if len(vectors) else np.zeros((0, 0), dtype=np.float32)
+    router = Router(embeddings if embeddings is not None else vectordb.embeddings, centroids)
+    print(f"[ROUTER] {len(centroids)} domain centroids from {len(vectors)} documents "
+          f"({time.perf_counter() - t0:.1f}s)")
+    return router
+
+
+def route_message(text: str, router: Router | None = None) -> dict:
+    """Full routing when ``router`` is available, rules only otherwise. Domain decisions carry no reply."""
+    if router is not None and ROUTER_ENABLED:
+        return router.route(text)
+    decision = match_rules(text) if ROUTER_ENABLED else None
+    if decision is None:
+        decision = _decision("domain", "default")
+    metrics.inc("router_routes", route=decision["route"], by=decision["by"])
+    return decision
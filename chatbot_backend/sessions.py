@@ -0,0 +1,55 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Per-conversation state for follow-up turns, keyed by the client's session id (the frontend chatId).
+# Bounded two ways: at most SESSION_MAX sessions (least recently used evicted first) and each session
+# expires SESSION_TTL_S seconds after its last request. A session holds only the last standalone
+# question and its reranked candidate pool (FOLLOWUP_POOL_SIZE docs, see llm.py).
+
+SESSION_MAX = int(os.getenv("SESSION_MAX", "5000"))
+SESSION_TTL_S = float(os.getenv("SESSION_TTL_S", "1800"))
+
+
+class SessionStore:
+    """Thread-safe LRU + TTL map of session id -> state dict."""
+
+    def __init__(self, maxsize: int = SESSION_MAX, ttl_s: float = SESSION_TTL_S):
+        self.maxsize = max(1, int(maxsize))
+        self.ttl_s = ttl_s
+        self._data = OrderedDict()  # id -> (last_used, state)
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> dict:
+        """State dict for ``session_id`` (a fresh one if unknown or expired). Callers update it in place."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(session_id)
+            state = entry[1] if entry is not None and now - entry[0] <= self.ttl_s else {}
+            self._data[session_id] = (now, state)
+            self._data.move_to_end(session_id)
+            self._evict(now)
+            return state
+
+    def drop(self, session_id: str):
+        with self._lock:
+            self._data.pop(session_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def _evict(self, now: float):
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+        # Oldest entries sit at the front; stop at the first one still alive
+        while self._data:
+            sid, (last_used, _) = next(iter(self._data.items()))
+            if now - last_used <= self.ttl_s:
+                break
+            self._data.popitem(last=False)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
@@ -0,0 +1,78 @@
+import threading
+
+from .metrics import metrics
+
+# Single-flight: concurrent callers with the same key share one computation. The first caller
+# (leader) runs it; the others (followers) block until it finishes and get the same result, or the
+# same exception. Entries live only while in flight; nothing is cached afterwards.
+
+
+class Flight:
+    """One in-progress computation and, once finished, its result or error."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self.done = False
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+    def finish(self, result=None, error: BaseException | None = None):
+        with self._cond:
+            self.result, self.error, self.done = result, error, True
+            self._cond.notify_all()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        with self._cond:
+            return self._cond.wait_for(lambda: self.done, timeout)
+
+
+class SingleFlight:
+    """Key -> in-flight Flight. Counts leader/follower requests under ``<name>_requests``."""
+
+    def __init__(self, name: str = "singleflight"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def begin(self, key) -> tuple[Flight, bool]:
+        """(flight, is_leader). The leader must call ``end(key, ...)`` exactly once."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Flight()
+            else:
+                flight.followers += 1
+        metrics.inc(f"{self.name}_requests", role="leader" if leader else "follower")
+        return flight, leader
+
+    def end(self, key, flight: Flight, result=None, error: BaseException | None = None):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.finish(result, error)
+        if flight.followers:
+            print(f"[SINGLEFLIGHT] {self.name}: 1 computation served {flight.followers + 1} requests")
+
+    def do(self, key, fn, timeout: float | None = None):
+        """``(fn(flight), shared)``: run ``fn`` unless an identical call is in flight, in which case
+        wait (up to ``timeout``) for its result. ``shared`` tells followers from the leader."""
+        flight, leader = self.begin(key)
+        if not leader:
+            if not flight.wait(timeout):
+                raise TimeoutError("single-flight leader did not finish in time")
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+        try:
+            result = fn(flight)
+        except BaseException as e:
+            self.end(key, flight, error=e)
+            raise
+        self.end(key, flight, result=result)
+        return result, False
+
+    def __len__(self):
+        with self._lock:
+            return len(self._flights)
@@ -0,0 +1,361 @@
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from .admission import Overloaded
+from .metrics import metrics
+
+# Speech-to-text behind /stt. Backends share one interface (``transcribe(audio) -> str`` where
+# ``audio`` is a WAV path or file object) and run on a bounded worker pool with a per-request time
+# limit, so a slow engine can't hold request threads indefinitely. At most STT_QUEUE_MAX clips wait
+# for a worker; beyond that /stt answers 429 with Retry-After instead of queueing without bound.
+#   STT_BACKEND=google  speech_recognition + Google Web Speech API (network; the original behaviour)
+#   STT_BACKEND=vosk    offline Kaldi models on CPU (VOSK_MODEL_PATH, e.g. vosk-model-small-en-in-0.4)
+#   STT_BACKEND=mock    local stand-in for tests/dev: fixed transcript after STT_MOCK_DELAY_S
+
+STT_BACKEND = os.getenv("STT_BACKEND", "google").lower()
+STT_WORKERS = int(os.getenv("STT_WORKERS", "2"))
+STT_TIMEOUT_S = float(os.getenv("STT_TIMEOUT_S", "15"))
+STT_QUEUE_MAX = int(os.getenv("STT_QUEUE_MAX", "8"))
+VOSK_MODEL_PATH = os.getenv("VOSK_MODEL_PATH", "models/vosk")
+
+# Upload limits. The multipart parser already holds the upload in a spooled file (memory, then disk),
+# which is decoded in place; only a non-seekable stream is copied into a spooled temp file (in memory
+# up to STT_SPOOL_MEMORY_BYTES). Audio is decoded/resampled STT_CHUNK_S at a time, so memory per
+# request stays bounded by the chunk size rather than the clip length.
+STT_MAX_BYTES = int(os.getenv("STT_MAX_BYTES", str(25 * 1024 * 1024)))
+STT_MAX_SECONDS = float(os.getenv("STT_MAX_SECONDS", "60"))
+STT_SPOOL_MEMORY_BYTES = int(os.getenv("STT_SPOOL_MEMORY_BYTES", str(1024 * 1024)))
+STT_SAMPLE_RATE = 16000
+STT_CHUNK_S = 0.5
+
+UNRECOGNIZED = "Could not understand audio"
+
+
+class STTError(Exception):
+    """Engine failure (network, model, decode). ``str(e)`` is safe to show to the client."""
+
+
+class STTTimeout(STTError):
+    pass
+
+
+class AudioLimitError(STTError):
+    """Upload exceeds STT_MAX_BYTES or STT_MAX_SECONDS."""
+
+
+def spool_upload(stream, max_bytes: int = STT_MAX_BYTES, memory_bytes: int = STT_SPOOL_MEMORY_BYTES):
+    """A seekable file object for ``stream`` no larger than ``max_bytes``. Seekable streams (werkzeug's
+    parsed upload) are used as they are; others are copied into a SpooledTemporaryFile 64 KiB at a time."""
+    if _seekable(stream):
+        size = stream.seek(0, io.SEEK_END)
+        stream.seek(0)
+        if size > max_bytes:
+            stream.close()
+            raise AudioLimitError(f"Audio upload exceeds {max_bytes / 1e6:.1f} MB")
+        return stream
+    spool = tempfile.SpooledTemporaryFile(max_size=memory_bytes)
+    total = 0
+    while True:
+        block = stream.read(64 * 1024)
+        if not block:
+            break
+        total += len(block)
+        if total > max_bytes:
+            spool.close()
+            raise AudioLimitError(f"Audio upload exceeds {max_bytes / 1e6:.1f} MB")
+        spool.write(block)
+    spool.seek(0)
+    return spool
+
+
+def _seekable(stream) -> bool:
+    try:
+        return stream.seekable()
+    except (AttributeError, ValueError):
+        return False
+
+
+def probe_wav(audio, max_seconds: float = STT_MAX_SECONDS):
+    """Header check: seconds of audio for a WAV file, or None if it isn't WAV. Rewinds ``audio``."""
+    try:
+        with wave.open(audio, "rb") as wf:
+            seconds = wf.getnframes() / float(wf.getframerate() or 1)
+    except (wave.Error, EOFError):
+        seconds = None
+    audio.seek(0)
+    if seconds is not None and seconds > max_seconds:
+        raise AudioLimitError(f"Audio is {seconds:.0f}s long; the limit is {max_seconds:.0f}s")
+    return seconds
+
+
+def iter_pcm_chunks(audio, target_rate: int = STT_SAMPLE_RATE, chunk_s: float = STT_CHUNK_S,
+                    max_seconds: float = STT_MAX_SECONDS):
+    """Yield mono 16-bit PCM at ``target_rate`` from a WAV file, ``chunk_s`` of input at a time.
+
+    Resampling is linear interpolation carried across chunk boundaries. The duration limit is
+    enforced on the decoded frames too, so a lying header can't bypass it.
+    """
+    import numpy as np
+
+    with wave.open(audio, "rb") as wf:
+        rate, channels, width = wf.getframerate(), wf.getnchannels(), wf.getsampwidth()
+        if width not in (1, 2, 4):
+            raise STTError(f"Unsupported audio: {8 * width}-bit PCM")
+        frames_per_chunk = max(1, int(rate * chunk_s))
+        step = rate / float(target_rate)
+        pos, consumed = 0.0, 0  # next output position / input samples seen (absolute)
+        carry = np.empty(0, dtype=np.float32)
+        while True:
+            data = wf.readframes(frames_per_chunk)
+            if not data:
+                break
+            if width == 1:
+                x = (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128.0) * 256.0
+            elif width == 2:
+                x = np.frombuffer(data, dtype=np.int16).astype(np.float32)
+            else:
+                x = np.frombuffer(data, dtype=np.int32).astype(np.float32) / 65536.0
+            if channels > 1:
+                x = x.reshape(-1, channels).mean(axis=1)
+            if (consumed + len(x)) / float(rate) > max_seconds:
+                raise AudioLimitError(f"Audio exceeds the {max_seconds:.0f}s limit")
+            if rate == target_rate:
+                consumed += len(x)
+                yield np.clip(x, -32768, 32767).astype(np.int16).tobytes()
+                continue
+            buf = np.concatenate([carry, x])
+            base = consumed - len(carry)
+            last = base + len(buf) - 1
+            n = int((last - pos) // step) + 1 if last >= pos else 0
+            t = pos + step * np.arange(n)
+            y = np.interp(t - base, np.arange(len(buf)), buf)
+            pos += step * n
+            consumed += len(x)
+            carry = buf[-1:]
+            yield np.clip(y, -32768, 32767).astype(np.int16).tobytes()
+
+
+class STTBackend:
+    name = "base"
+
+    def load(self):
+        """Load models/clients up front (called once, from warm-up)."""
+
+    def transcribe(self, audio) -> str:
+        """Whole-clip recognition from a WAV path or file object."""
+        raise NotImplementedError
+
+    def transcribe_stream(self, chunks, sample_rate: int) -> str:
+        """Recognition from an iterator of mono 16-bit PCM chunks. Engines that can decode
+        incrementally override this; the default buffers the PCM and calls ``transcribe``."""
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(sample_rate)
+            for chunk in chunks:
+                wf.writeframes(chunk)
+        buf.seek(0)
+        return self.transcribe(buf)
+
+
+class GoogleSTT(STTBackend):
+    name = "google"
+
+    def transcribe(self, audio) -> str:
+        import speech_recognition as sr
+
+        recognizer = sr.Recognizer()
+        try:
+            # AIFF/FLAC uploads land here; ``duration`` caps how much of the clip is read
+            with sr.AudioFile(audio) as source:
+                clip = recognizer.record(source, duration=STT_MAX_SECONDS)
+            return self._recognize(recognizer, clip)
+        except ValueError as e:
+            raise STTError(f"Unsupported audio: {e}") from e
+
+    def transcribe_stream(self, chunks, sample_rate: int) -> str:
+        # The web API takes one request per clip, so PCM is collected (bounded by STT_MAX_SECONDS)
+        import speech_recognition as sr
+
+        clip = sr.AudioData(b"".join(chunks), sample_rate, 2)
+        return self._recognize(sr.Recognizer(), clip)
+
+    def _recognize(self, recognizer, clip) -> str:
+        import speech_recognition as sr
+
+        try:
+            return recognizer.recognize_google(clip)
+        except sr.UnknownValueError:
+            return UNRECOGNIZED
+        except sr.RequestError as e:
+            raise STTError(f"STT service error: {e}") from e
+
+
+class VoskSTT(STTBackend):
+    """Offline recognizer. The model is loaded once and shared; each request gets its own recognizer."""
+
+    name = "vosk"
+
+    def __init__(self, model_path: str = VOSK_MODEL_PATH):
+        self.model_path = model_path
+        self._model = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            if self._model is None:
+                try:
+                    from vosk import Model, SetLogLevel  # optional, see requirements-optional.txt
+                except ImportError as e:
+                    raise STTError("STT_BACKEND=vosk needs the vosk package (pip install vosk)") from e
+                SetLogLevel(-1)
+                if not os.path.isdir(self.model_path):
+                    raise STTError(f"Vosk model not found at {self.model_path}")
+                self._model = Model(self.model_path)
+        return self._model
+
+    def transcribe(self, audio) -> str:
+        try:
+            return self.transcribe_stream(iter_pcm_chunks(audio), STT_SAMPLE_RATE)
+        except (wave.Error, EOFError) as e:
+            raise STTError(f"Unsupported audio (expected PCM WAV): {e}") from e
+
+    def transcribe_stream(self, chunks, sample_rate: int) -> str:
+        from vosk import KaldiRecognizer
+
+        # Recognition advances as each chunk is decoded; no full-clip buffer
+        rec = KaldiRecognizer(self.load(), sample_rate)
+        for chunk in chunks:
+            rec.AcceptWaveform(chunk)
+        text = json.loads(rec.FinalResult()).get("text", "").strip()
+        return text or UNRECOGNIZED
+
+
+class MockSTT(STTBackend):
+    name = "mock"
+
+    def __init__(self, text: str = None, delay_s: float = None):
+        self.text = text if text is not None else os.getenv("STT_MOCK_TEXT", "who is the hod of cse")
+        self.delay_s = delay_s if delay_s is not None else float(os.getenv("STT_MOCK_DELAY_S", "0"))
+
+    def transcribe(self, audio) -> str:
+        if self.delay_s:
+            time.sleep(self.delay_s)
+        return self.text
+
+    def transcribe_stream(self, chunks, sample_rate: int) -> str:
+        for _ in chunks:  # decode like a real engine so limits and resampling are exercised
+            pass
+        return self.transcribe(None)
+
+
+BACKENDS = {"google": GoogleSTT, "vosk": VoskSTT, "mock": MockSTT}
+
+
+def make_backend(name: str) -> STTBackend:
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown STT_BACKEND '{name}', expected one of {sorted(BACKENDS)}")
+
+
+class SpeechService:
+    """Runs a backend on a bounded pool; ``transcribe`` waits at most ``timeout_s``. At most
+    ``queue_max`` clips wait for a worker, further ones are rejected with Overloaded."""
+
+    def __init__(self, backend: STTBackend, workers: int = STT_WORKERS, timeout_s: float = STT_TIMEOUT_S,
+                 queue_max: int = STT_QUEUE_MAX):
+        self.backend = backend
+        self.timeout_s = timeout_s
+        self.workers = max(1, workers)
+        self.capacity = self.workers + max(0, queue_max)
+        self.pending = 0  # queued + running; a timed-out clip counts until its worker is done
+        self.service_s = 1.0  # EWMA of decode time, for Retry-After
+        self._lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"stt-{backend.name}")
+
+    def _submit(self, audio):
+        with self._lock:
+            if self.pending >= self.capacity:
+                retry_after = self.service_s * (self.pending - self.workers + 1) / self.workers
+                full = True
+            else:
+                self.pending += 1
+                full = False
+        if full:
+            audio.close()
+            metrics.inc("stt_requests", backend=self.backend.name, outcome="rejected")
+            raise Overloaded("stt_queue_full", retry_after)
+        t0 = time.perf_counter()
+        fut = self.pool.submit(self._run, audio)
+        fut.add_done_callback(lambda _f: self._done(time.perf_counter() - t0))
+        return fut
+
+    def _done(self, seconds: float):
+        with self._lock:
+            self.pending -= 1
+            self.service_s = 0.8 * self.service_s + 0.2 * seconds
+
+    def _run(self, audio) -> str:
+        try:
+            with metrics.timer("stt_decode_seconds", backend=self.backend.name):
+                if probe_wav(audio) is None:
+                    return self.backend.transcribe(audio)  # not WAV: let the engine try (Google reads AIFF/FLAC)
+                return self.backend.transcribe_stream(iter_pcm_chunks(audio), STT_SAMPLE_RATE)
+        finally:
+            audio.close()
+
+    def transcribe(self, audio, timeout_s: float = None) -> str:
+        """``audio``: seekable file object (owned and closed by the worker) or bytes.
+        Raises AudioLimitError/STTTimeout/STTError, or admission.Overloaded when the queue is full."""
+        if isinstance(audio, (bytes, bytearray)):
+            audio = io.BytesIO(audio)
+        try:
+            probe_wav(audio)  # reject over-long clips before queueing
+        except AudioLimitError:
+            audio.close()
+            metrics.inc("stt_requests", backend=self.backend.name, outcome="too_large")
+            raise
+        fut = self._submit(audio)
+        t0 = time.perf_counter()
+        try:
+            text = fut.result(timeout=timeout_s or self.timeout_s)
+        except FutureTimeout:
+            # The decode keeps its worker until it finishes; the caller is released now
+            metrics.inc("stt_requests", backend=self.backend.name, outcome="timeout")
+            raise STTTimeout(f"STT timed out after {timeout_s or self.timeout_s:.0f}s")
+        except AudioLimitError:
+            metrics.inc("stt_requests", backend=self.backend.name, outcome="too_large")
+            raise
+        except STTError:
+            metrics.inc("stt_requests", backend=self.backend.name, outcome="error")
+            raise
+        except Exception as e:
+            metrics.inc("stt_requests", backend=self.backend.name, outcome="error")
+            raise STTError(f"STT failed: {e}") from e
+        finally:
+            metrics.observe("stt_request_seconds", time.perf_counter() - t0, backend=self.backend.name)
+        metrics.inc("stt_requests", backend=self.backend.name,
+                    outcome="unrecognized" if text == UNRECOGNIZED else "ok")
+        return text
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_speech_service() -> SpeechService:
+    global _service
+    with _service_lock:
+        if _service is None:
+            backend = make_backend(STT_BACKEND)
+            backend.load()
+            _service = SpeechService(backend)
+    return _service
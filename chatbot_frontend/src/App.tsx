@@ -5,14 +5,15 @@ import { theme } from './theme';
 import { ChatInterface } from './components/ChatInterface';
 import { Header } from './components/Header';
 import Testing from './components/Testing';
-import { Message } from './services/api';
+import { Message, apiHeaders } from './services/api';
 import ChatIcon from '@mui/icons-material/Chat';
 import BuildIcon from '@mui/icons-material/Build';
 
 export default function App() {
   const [messages, setMessages] = useState<Message[]>([]);
   const [isLoading, setIsLoading] = useState(false);
-  const [chatId, setChatId] = useState<string>('');
+  // Also the backend session id: lets /chat resolve follow-ups against the previous turn
+  const [chatId, setChatId] = useState<string>(() => localStorage.getItem('chatId') || `chat-${Date.now()}`);
   const messagesEndRef = useRef<HTMLDivElement>(null);
   const controllerRef = useRef<AbortController | null>(null);
   const timersRef = useRef<number[]>([]);
@@ -31,6 +32,10 @@ export default function App() {
     }
   }, []);
 
+  useEffect(() => {
+    localStorage.setItem('chatId', chatId);
+  }, [chatId]);
+
   // Save messages to localStorage whenever they change
   useEffect(() => {
     if (messages.length > 0) {
@@ -93,11 +98,8 @@ export default function App() {
       console.log('Sending request to:', apiUrl);
       const response = await fetch(apiUrl, {
         method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-          'Accept': 'application/json',
-        },
-        body: JSON.stringify({ question: message }),
+        headers: apiHeaders({ 'Accept': 'application/json' }),
+        body: JSON.stringify({ question: message, session_id: chatId }),
         signal: controller.signal,
       });
 
@@ -1,6 +1,6 @@
 import { useEffect, useMemo, useRef, useState } from 'react';
 import { Box, Button, Card, CardContent, CircularProgress, Container, Stack, Typography, FormControlLabel, Switch } from '@mui/material';
-import { RedTeamItem, loadRedTeamSet, askBackend } from '../services/testingApi';
+import { RedTeamItem, TESTING_HEADERS, loadRedTeamSet, askBackend, askBackendBatch } from '../services/testingApi';
 
 export default function Testing() {
   const [items, setItems] = useState<RedTeamItem[]>([]);
@@ -13,6 +13,11 @@ export default function Testing() {
   const controllerRef = useRef<AbortController | null>(null);
   const timeoutRef = useRef<number | null>(null);
   const [autoAsk, setAutoAsk] = useState<boolean>(false); // off by default
+  // Answers prefetched for every item via /chat/batch, keyed by item index
+  const [batchAnswers, setBatchAnswers] = useState<Record<number, string>>({});
+  const [batchRunning, setBatchRunning] = useState(false);
+  const [batchStatus, setBatchStatus] = useState<string>('');
+  const batchControllerRef = useRef<AbortController | null>(null);
 
   const current = items[idx];
 
@@ -30,9 +35,16 @@ export default function Testing() {
       // cleanup on unmount
       if (controllerRef.current) controllerRef.current.abort();
       if (timeoutRef.current) window.clearTimeout(timeoutRef.current);
+      if (batchControllerRef.current) batchControllerRef.current.abort();
     };
   }, []);
 
+  // Show the prefetched batch answer for the current item as soon as it arrives
+  useEffect(() => {
+    const prefetched = batchAnswers[idx];
+    if (prefetched !== undefined && !answer && !loading) setAnswer(prefetched);
+  }, [idx, batchAnswers]);
+
   const hasMore = useMemo(() => idx + 1 < items.length, [idx, items.length]);
 
   // Optional auto-ask (off by default). When enabled, it behaves like before.
@@ -71,7 +83,7 @@ export default function Testing() {
     try {
       const res = await fetch('/api/chat', {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: TESTING_HEADERS,
         body: JSON.stringify({ message: current.generated_question }),
         signal: controller.signal,
       });
@@ -87,6 +99,29 @@ export default function Testing() {
     }
   }
 
+  async function runBatch() {
+    if (!items.length) return;
+    if (batchControllerRef.current) batchControllerRef.current.abort();
+    const controller = new AbortController();
+    batchControllerRef.current = controller;
+    setBatchRunning(true);
+    setBatchAnswers({});
+    setBatchStatus('');
+    try {
+      const { count, seconds } = await askBackendBatch(
+        items.map((it) => it.generated_question),
+        (r) => setBatchAnswers((prev) => ({ ...prev, [r.index]: r.answer })),
+        controller.signal,
+      );
+      setBatchStatus(`Batch finished: ${count} answers in ${seconds.toFixed(1)}s`);
+    } catch (e: any) {
+      if (e?.name !== 'AbortError') setBatchStatus(e?.message || 'Batch failed');
+    } finally {
+      setBatchRunning(false);
+      batchControllerRef.current = null;
+    }
+  }
+
   function next() {
     setIdx((i) => Math.min(i + 1, items.length - 1));
     setAnswer('');
@@ -139,6 +174,11 @@ export default function Testing() {
       <Stack spacing={2}>
         <Typography variant="h5">Testing (Red Team)</Typography>
         <Typography variant="body2">Items: {items.length} • Current: {idx + 1}</Typography>
+        <Stack direction="row" spacing={1} alignItems="center">
+          <Button variant="outlined" onClick={runBatch} disabled={batchRunning || !items.length}>Run all (batch)</Button>
+          {batchRunning && <><CircularProgress size={16} /><Typography variant="body2">{Object.keys(batchAnswers).length} / {items.length} answered</Typography></>}
+          {!batchRunning && batchStatus && <Typography variant="body2">{batchStatus}</Typography>}
+        </Stack>
 
         {current && (
           <Card>
@@ -2,6 +2,8 @@
 
 interface ImportMetaEnv {
   readonly VITE_API_URL: string;
+  // Sent as X-API-Key when the backend is started with API_KEY
+  readonly VITE_API_KEY?: string;
   // Add other environment variables here as needed
 }
 
@@ -4,7 +4,14 @@ export interface Message {
   timestamp: Date;
 }
 
-export const sendMessage = async (message: string): Promise<string> => {
+// JSON headers for backend calls, plus X-API-Key when VITE_API_KEY is set
+export const apiHeaders = (extra: Record<string, string> = {}): Record<string, string> => ({
+  'Content-Type': 'application/json',
+  ...(import.meta.env.VITE_API_KEY ? { 'X-API-Key': import.meta.env.VITE_API_KEY } : {}),
+  ...extra,
+});
+
+export const sendMessage = async (message: string, sessionId?: string): Promise<string> => {
   try {
     console.log('Sending message to API');
 
@@ -13,12 +20,10 @@ export const sendMessage = async (message: string): Promise<string> => {
 
     const response = await fetch(apiUrl, {
       method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-        'Accept': 'application/json',
-      },
+      headers: apiHeaders({ 'Accept': 'application/json' }),
       body: JSON.stringify({
-        question: message
+        question: message,
+        session_id: sessionId
       }),
     });
 
@@ -1,3 +1,8 @@
+import { apiHeaders } from './api';
+
+// Red-team traffic runs at batch priority so it never delays interactive chat
+export const TESTING_HEADERS = apiHeaders({ 'X-Priority': 'batch' });
+
 export type RedTeamItem = {
   category: string;
   source_question: string;
@@ -17,9 +22,53 @@ export async function askBackend(message: string): Promise<ChatResponse> {
   // Reuse existing proxy to backend
   const res = await fetch('/api/chat', {
     method: 'POST',
-    headers: { 'Content-Type': 'application/json' },
+    headers: TESTING_HEADERS,
     body: JSON.stringify({ message }),
   });
   if (!res.ok) throw new Error(`Backend error ${res.status}`);
   return res.json();
 }
+
+export type BatchResult = {
+  index: number;
+  question: string;
+  answer: string;
+  stats?: Record<string, unknown>;
+};
+
+// Send many questions in one request to /chat/batch. The backend streams NDJSON lines
+// as answers complete (not in input order); onResult fires for each one.
+export async function askBackendBatch(
+  questions: string[],
+  onResult: (result: BatchResult) => void,
+  signal?: AbortSignal,
+): Promise<{ count: number; seconds: number }> {
+  const res = await fetch('/api/chat/batch', {
+    method: 'POST',
+    headers: TESTING_HEADERS,
+    body: JSON.stringify({ questions }),
+    signal,
+  });
+  if (!res.ok || !res.body) throw new Error(`Backend error ${res.status}`);
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let summary = { count: 0, seconds: 0 };
+  const handleLine = (line: string) => {
+    if (!line.trim()) return;
+    const item = JSON.parse(line);
+    if (item.done) summary = { count: item.count, seconds: item.seconds };
+    else onResult(item as BatchResult);
+  };
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split('\n');
+    buffer = lines.pop() ?? '';
+    lines.forEach(handleLine);
+  }
+  handleLine(buffer + decoder.decode());
+  return summary;
+}
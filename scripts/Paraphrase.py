@@ -1,11 +1,51 @@
-import pandas as pd
+"""
+Expand the FAQ CSV with LLM paraphrases (Ollama).
+
+Paraphrases are generated concurrently with a bounded thread pool and stored in an
+on-disk JSONL cache keyed by a hash of the model, the prompt version and the
+(normalized) question. Re-running the script only calls the LLM for rows whose
+question is new or changed, that were last asked for fewer than --n paraphrases, or
+that were generated by another model or prompt; everything else is served from the
+cache (a row whose LLM answer had fewer usable paraphrases is not retried). Output
+rows are streamed to the expanded CSV in input order as soon as they are available,
+and every finished paraphrase set is appended to the cache immediately, so a crash
+loses at most the in-flight rows.
+
+Usage example:
+  python scripts/Paraphrase.py --input "data/DATA_05_09_2025 - Sheet1.csv" --output data/DATA_FAQ_EXPANDED.csv
+"""
+
+import os
+import re
+import csv
 import json
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
 from langchain_ollama.llms import OllamaLLM
 
 # Choose Ollama model: "mistral:7b-instruct" (better quality, slower) OR "phi:latest" (faster)
-llm = OllamaLLM(model="mistral:7b-instruct", temperature=0.4, max_tokens=300)
+DEFAULT_MODEL = "mistral:7b-instruct"
+# Bump whenever the prompt in generate_paraphrases changes, so cached paraphrases are regenerated
+PROMPT_VERSION = 1
+
+_llms = {}
+_llm_lock = threading.Lock()
+
 
-def generate_paraphrases(question: str, n: int = 4):
+def get_llm(model: str = DEFAULT_MODEL):
+    """Build one Ollama client per model and share it across worker threads."""
+    with _llm_lock:
+        if model not in _llms:
+            _llms[model] = OllamaLLM(model=model, temperature=0.4, max_tokens=300)
+        return _llms[model]
+
+
+def generate_paraphrases(question: str, n: int = 4, model: str = DEFAULT_MODEL):
     """
     Generate n paraphrases for a given question using Ollama.
     Returns a list of unique paraphrases.
@@ -36,7 +76,7 @@ Facilities,Does the campus have a clinic?,Yes, there is a health center
     Question: {question}
     """
     try:
-        raw = llm.invoke(prompt).strip()
+        raw = get_llm(model).invoke(prompt).strip()
         paras = json.loads(raw)  # Parse JSON
         if isinstance(paras, list):
             cleaned = []
@@ -50,26 +90,137 @@ Facilities,Does the campus have a clinic?,Yes, there is a health center
             return cleaned[:n]
     except Exception as e:
         print(f"[WARN] Failed to parse paraphrases for '{question}': {e}")
-    return [question]  # fallback
+    return None  # not cached, retried on the next run
+
+
+# ==========================
+# Paraphrase cache (JSONL, append-only)
+# ==========================
+def normalize_question(question: str) -> str:
+    return re.sub(r"\s+", " ", str(question or "")).strip().lower()
+
+
+def question_key(question: str, model: str = DEFAULT_MODEL, prompt_version: int = PROMPT_VERSION) -> str:
+    raw = f"{model}\n{prompt_version}\n{normalize_question(question)}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def load_cache(cache_path: str) -> dict:
+    """Read the paraphrase cache; later lines win, truncated trailing lines are ignored."""
+    cache = {}
+    if not os.path.exists(cache_path):
+        return cache
+    with open(cache_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                obj = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # partial write from a crash
+            if isinstance(obj.get("variants"), list):
+                cache[obj["key"]] = obj
+    return cache
+
+
+class CacheWriter:
+    """Thread-safe appender that flushes every entry so progress survives crashes."""
+
+    def __init__(self, cache_path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        self._f = open(cache_path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def append(self, entry: dict):
+        with self._lock:
+            self._f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._f.flush()
+            os.fsync(self._f.fileno())
+
+    def close(self):
+        self._f.close()
+
+
+# ==========================
+# Main expansion
+# ==========================
+def expand(input_csv: str, output_csv: str, cache_path: str, n: int = 4,
+           workers: int = 4, model: str = DEFAULT_MODEL):
+    df = pd.read_csv(input_csv)
+    # Normalize headers to lowercase to tolerate 'Category, Question, Answer'
+    df.columns = [str(c).strip().lower() for c in df.columns]
+    rows = [(str(r.get("category", "General")), str(r.get("question", "")), str(r.get("answer", "")))
+            for r in df.to_dict("records")]
+
+    cache = load_cache(cache_path)
+    todo = {}
+    for _, question, _ in rows:
+        key = question_key(question, model)
+        entry = cache.get(key)
+        # A row is done once it was asked for at least n paraphrases, even if fewer came back;
+        # entries written before "n" was stored count as asked for as many as they hold
+        if entry is None or entry.get("n", len(entry["variants"])) < n:
+            todo.setdefault(key, question)
+    print(f"[PARA] {len(rows)} rows, {len(rows) - len(todo)} cached, {len(todo)} to generate (workers={workers})")
+
+    writer = CacheWriter(cache_path)
+    start = time.perf_counter()
+
+    def _work(key: str, question: str):
+        variants = generate_paraphrases(question, n=n, model=model)
+        if variants is None:
+            return [question]  # fallback, deliberately not cached
+        entry = {"key": key, "question": question, "variants": variants, "model": model,
+                 "prompt_version": PROMPT_VERSION, "n": n}
+        writer.append(entry)
+        cache[key] = entry
+        return variants
+
+    written = 0
+    tmp_path = output_csv + ".partial"
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = {key: pool.submit(_work, key, q) for key, q in todo.items()}
+            with open(tmp_path, "w", newline="", encoding="utf-8") as out:
+                w = csv.writer(out)
+                w.writerow(["category", "question", "answer"])
+                # Rows are emitted in input order: each one waits only for its own future
+                for i, (category, question, answer) in enumerate(rows, 1):
+                    key = question_key(question, model)
+                    if key in futures:
+                        variants = futures[key].result()
+                    else:
+                        variants = cache[key]["variants"]
+                    for q in [question] + variants[:n]:
+                        w.writerow([category, q, answer])
+                        written += 1
+                    out.flush()
+                    if i % 25 == 0:
+                        print(f"[PARA] [{i}/{len(rows)}] rows written ({time.perf_counter() - start:.1f}s)")
+        os.replace(tmp_path, output_csv)
+    finally:
+        writer.close()
+
+    print(f"✅ Expanded dataset saved to {output_csv} with {written} rows in {time.perf_counter() - start:.1f}s")
+    return written
 
-# === Main Script ===
-input_csv = r"C:\Users\Dell\Chatbot_test2\DATA_05_09_2025 - Sheet1.csv"        # your input CSV with category, question, answer
-output_csv = r"DATA_FAQ_EXPANDED.csv"
 
-df = pd.read_csv(input_csv)
-expanded_rows = []
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--input", type=str, default=r"C:\Users\Dell\Chatbot_test2\DATA_05_09_2025 - Sheet1.csv",
+                    help="Input CSV with category, question, answer")
+    ap.add_argument("--output", type=str, default=r"DATA_FAQ_EXPANDED.csv", help="Expanded CSV to write")
+    ap.add_argument("--cache", type=str, default=None,
+                    help="Paraphrase cache (JSONL). Defaults to <output>.paraphrases.jsonl")
+    ap.add_argument("--n", type=int, default=4, help="Paraphrases per question")
+    ap.add_argument("--workers", type=int, default=4, help="Concurrent LLM calls")
+    ap.add_argument("--model", type=str, default=DEFAULT_MODEL, help="Ollama model")
+    args = ap.parse_args()
 
-for _, row in df.iterrows():
-    category, question, answer = row["Category"], row["Question"], row["Answer"]
-    
-    # Generate 4 variants
-    variants = generate_paraphrases(question, n=4)
-    
-    # Save original + variants with category intact
-    for q in [question] + variants:
-        expanded_rows.append({"category": category, "question": q, "answer": answer})
+    cache_path = args.cache or (os.path.splitext(args.output)[0] + ".paraphrases.jsonl")
+    expand(args.input, args.output, cache_path, n=args.n, workers=args.workers, model=args.model)
 
-df_expanded = pd.DataFrame(expanded_rows)
-df_expanded.to_csv(output_csv, index=False)
 
-print(f"✅ Expanded dataset saved to {output_csv} with {len(df_expanded)} rows")
+if __name__ == "__main__":
+    main()
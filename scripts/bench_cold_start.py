@@ -0,0 +1,80 @@
+"""
+Measure cold-start and warm retrieval latency of the serverless handler (api/chat/index.py).
+
+Each run is a fresh Python process, like a new function instance: it times the handler
+import, the first init_db() (artifact + ONNX encoder, or Chroma + torch as fallback) and
+then warm retrieval for the eval questions. Generation is excluded so Ollama latency does
+not drown out the numbers.
+
+Usage example:
+  python scripts/bench_cold_start.py --runs 5 --eval-file scripts/sample_eval.jsonl
+  INDEX_ARTIFACT_DIR=/nonexistent python scripts/bench_cold_start.py   # legacy Chroma path
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(THIS_DIR, os.pardir))
+
+CHILD = r"""
+import importlib.util, json, sys, time
+t0 = time.perf_counter()
+spec = importlib.util.spec_from_file_location("handler", sys.argv[1])
+handler = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(handler)
+import_ms = (time.perf_counter() - t0) * 1000
+t1 = time.perf_counter()
+handler.init_db()
+init_ms = (time.perf_counter() - t1) * 1000
+questions = json.loads(sys.argv[2])
+warm = []
+for q in questions:
+    t = time.perf_counter()
+    handler.vectordb.max_marginal_relevance_search(q, k=20, fetch_k=120)
+    if handler.bm25_retriever is not None:
+        handler.bm25_retriever.get_relevant_documents(q)
+    warm.append((time.perf_counter() - t) * 1000)
+heavy = sorted(m for m in ("torch", "chromadb", "sentence_transformers") if m in sys.modules)
+print(json.dumps({"import_ms": import_ms, "init_ms": init_ms, "warm_ms": warm, "heavy_modules": heavy}))
+"""
+
+
+def load_questions(path: str) -> list[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line)["question"] for line in f if line.strip()]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--handler", type=str, default=os.path.join(PROJECT_ROOT, "api", "chat", "index.py"))
+    ap.add_argument("--eval-file", type=str, default=os.path.join(THIS_DIR, "sample_eval.jsonl"))
+    ap.add_argument("--runs", type=int, default=3, help="Fresh processes (cold starts) to measure")
+    args = ap.parse_args()
+
+    questions = load_questions(args.eval_file)
+    results = []
+    for i in range(args.runs):
+        out = subprocess.run([sys.executable, "-c", CHILD, args.handler, json.dumps(questions)],
+                             capture_output=True, text=True, cwd=PROJECT_ROOT)
+        if out.returncode != 0:
+            print(out.stderr)
+            sys.exit(out.returncode)
+        res = json.loads(out.stdout.strip().splitlines()[-1])
+        results.append(res)
+        print(f"[BENCH] run {i + 1}: import={res['import_ms']:.0f}ms init={res['init_ms']:.0f}ms "
+              f"warm_p50={statistics.median(res['warm_ms']):.1f}ms heavy={res['heavy_modules']}")
+
+    cold = [r["import_ms"] + r["init_ms"] for r in results]
+    warm = sorted(ms for r in results for ms in r["warm_ms"])
+    p95 = warm[min(len(warm) - 1, int(0.95 * len(warm)))]
+    print(f"\n[BENCH] cold start (import + init): median={statistics.median(cold):.0f}ms max={max(cold):.0f}ms")
+    print(f"[BENCH] warm retrieval: p50={statistics.median(warm):.1f}ms p95={p95:.1f}ms over {len(warm)} queries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Build the compact, self-contained index artifact used by the serverless handler
+(api/chat/index.py) and by the pre-fork backend (INDEX_BACKEND=mmap).
+
+The artifact directory contains:
+  embeddings.npy    normalized document embeddings, one flat (n, dim) array
+  embeddings_<dtype>.npy  compressed copy searched first (--dtype float16|int8; int8 adds embeddings_scale.npy)
+  columns.json      page_content + metadata, column-wise
+  bm25_*.npy/json   BM25 statistics and postings
+  encoder/          ONNX query encoder + tokenizer.json (runs without torch)
+  manifest.json
+
+Usage example:
+  python scripts/build_artifact.py --csv data/DATA_FAQ_EXPANDED.csv --out chromaDb_expanded_artifact
+  python scripts/build_artifact.py --dtype int8      # ~4x smaller scan; top candidates re-scored in float32
+"""
+
+import os
+import sys
+import time
+import argparse
+
+# Ensure project root is on sys.path so local imports work when running from scripts/
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(THIS_DIR, os.pardir))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from chatbot_backend.dedup import report_path_for
+from chatbot_backend.chunking import new_stats, report
+from chatbot_backend.processing1 import CHUNKER, chunking_id, iter_chunks, iter_csv_documents, corpus_version
+from chatbot_backend.db import get_embeddings, EMBED_MODEL
+from chatbot_backend.index_artifact import export_artifact
+from chatbot_backend.quantization import DTYPES
+from chatbot_backend.onnx_models import export_sentence_encoder
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--csv", type=str, default="data/DATA_FAQ_EXPANDED.csv", help="FAQ CSV to index")
+    ap.add_argument("--out", type=str, default="chromaDb_expanded_artifact", help="Artifact directory")
+    ap.add_argument("--chunker", type=str, default=CHUNKER, choices=("tokens", "chars"),
+                    help="tokens: sized to the embedder window (CHUNK_MAX_TOKENS); chars: 1000/200 characters")
+    ap.add_argument("--dtype", type=str, default="float32", choices=DTYPES, help="Storage for the first-pass search matrix")
+    ap.add_argument("--skip-encoder", action="store_true", help="Don't export the ONNX query encoder")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    # Streamed: rows are read, chunked and embedded batch by batch
+    chunk_stats = new_stats()
+    chunks = iter_chunks(iter_csv_documents(args.csv), chunk_stats, chunker=args.chunker,
+                         dedup_report=report_path_for(args.out))
+    export_artifact(chunks, get_embeddings(), args.out, model_name=EMBED_MODEL,
+                    corpus_version=corpus_version(args.csv), dtype=args.dtype, chunking=chunking_id(args.chunker))
+    if not args.skip_encoder:
+        export_sentence_encoder(EMBED_MODEL, os.path.join(args.out, "encoder"))
+
+    size = sum(os.path.getsize(os.path.join(dp, f)) for dp, _, fs in os.walk(args.out) for f in fs)
+    print(f"[CHUNK] {args.chunker}: {report(chunk_stats)}")
+    print(f"[BUILD] Artifact {args.out}: {chunk_stats['chunks']} chunks, {size / 1e6:.1f} MB, built in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Compare float16 / int8 embedding storage against the float32 index artifact.
+
+For each storage option it reports the bytes held by the search matrix, recall@k of the
+compressed scan against exact float32 top-k, and recall@k after re-scoring the top
+oversample*k candidates in float32 (what IndexArtifact does at query time).
+
+Queries are the eval questions plus a sample of corpus questions, encoded with the artifact's
+ONNX encoder when present and the HuggingFace model otherwise.
+
+Usage example:
+  python scripts/eval_quantization.py --artifact chromaDb_expanded_artifact --k 20 --oversample 4
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+import numpy as np
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(THIS_DIR, os.pardir))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from chatbot_backend.index_artifact import IndexArtifact, _top_k
+from chatbot_backend.quantization import CompressedMatrix, compress
+
+
+def load_queries(artifact: IndexArtifact, eval_file: str, n_corpus: int, seed: int) -> list[str]:
+    queries = []
+    if eval_file and os.path.exists(eval_file):
+        with open(eval_file, "r", encoding="utf-8") as f:
+            queries += [json.loads(line)["question"] for line in f if line.strip()]
+    corpus_qs = [q for q in artifact.metadata_columns.get("question", []) if q]
+    if not corpus_qs:
+        corpus_qs = [artifact.page_content[i].split("\n")[0] for i in range(len(artifact))]
+    random.Random(seed).shuffle(corpus_qs)
+    return queries + corpus_qs[:n_corpus]
+
+
+def get_encoder(artifact_dir: str):
+    if os.path.exists(os.path.join(artifact_dir, "encoder")):
+        from chatbot_backend.onnx_models import OnnxEmbeddings
+        return OnnxEmbeddings(os.path.join(artifact_dir, "encoder"))
+    from chatbot_backend.db import get_embeddings
+    return get_embeddings()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--artifact", type=str, default="chromaDb_expanded_artifact", help="float32 index artifact")
+    ap.add_argument("--eval-file", type=str, default=os.path.join(THIS_DIR, "sample_eval.jsonl"))
+    ap.add_argument("--corpus-queries", type=int, default=200, help="Corpus questions added to the query set")
+    ap.add_argument("--k", type=int, default=20)
+    ap.add_argument("--oversample", type=int, default=4)
+    ap.add_argument("--seed", type=int, default=13)
+    args = ap.parse_args()
+
+    art = IndexArtifact(args.artifact, mmap=True, rescore=False)
+    ref = np.asarray(np.load(os.path.join(args.artifact, "embeddings.npy")), dtype=np.float32)
+    queries = load_queries(art, args.eval_file, args.corpus_queries, args.seed)
+    qvecs = np.asarray(get_encoder(args.artifact).embed_documents(queries), dtype=np.float32)
+    qvecs /= np.clip(np.linalg.norm(qvecs, axis=1, keepdims=True), 1e-12, None)
+    print(f"[QUANT] {len(ref)} docs x {ref.shape[1]} dims, {len(queries)} queries, k={args.k}")
+
+    exact = [set(_top_k(ref @ q, args.k).tolist()) for q in qvecs]
+    print(f"{'dtype':<8} {'MB':>8} {'ratio':>6} {'recall@k':>9} {'+rescore':>9} {'ms/query':>9}")
+    for dtype in ("float32", "float16", "int8"):
+        data, scales = compress(ref, dtype)
+        mat = CompressedMatrix(data, scales)
+        plain, rescored = [], []
+        t0 = time.perf_counter()
+        for q, truth in zip(qvecs, exact):
+            s = mat.scores(q)
+            plain.append(len(truth & set(_top_k(s, args.k).tolist())) / args.k)
+            cand = _top_k(s, args.k * args.oversample)
+            top = cand[np.argsort(-(ref[cand] @ q), kind="stable")[:args.k]]
+            rescored.append(len(truth & set(top.tolist())) / args.k)
+        ms = (time.perf_counter() - t0) * 1000 / max(1, len(qvecs))
+        print(f"{dtype:<8} {mat.nbytes / 1e6:>8.2f} {ref.nbytes / mat.nbytes:>6.1f} "
+              f"{np.mean(plain):>9.4f} {np.mean(rescored):>9.4f} {ms:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
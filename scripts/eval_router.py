@@ -0,0 +1,140 @@
+"""
+Evaluate the small-talk / off-domain router (chatbot_backend/router.py) on a labeled set.
+
+Reports per-label precision/recall, a confusion matrix, accuracy at label level and at
+"answer directly vs. retrieve" level, the legacy substring greeting check as a baseline, and
+the work the router saves: queries that skip retrieval, reranking and the LLM, multiplied by
+the measured cost of retrieval + rerank on the domain queries plus --llm-ms per generation.
+
+Labels: greeting, thanks, bye, about, off_domain, domain (one JSON object per line: {"text", "label"}).
+
+Usage example:
+  python scripts/eval_router.py --artifact chromaDb_expanded_artifact
+  python scripts/eval_router.py --artifact chromaDb_expanded_artifact --measure --sweep
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from collections import Counter
+
+import numpy as np
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(THIS_DIR, os.pardir))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from chatbot_backend.router import build_router
+
+# The substring check /chat used before the router, kept as the baseline
+LEGACY_GREETING_WORDS = ["hello", "hi", "hey", "good morning", "good afternoon", "good evening", "how are you",
+                         "what's up", "greetings", "good day"]
+
+
+def load_labeled(path: str) -> list[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def legacy_route(text: str) -> str:
+    return "greeting" if any(w in text.lower() for w in LEGACY_GREETING_WORDS) else "domain"
+
+
+def coarse(label: str) -> str:
+    return "retrieve" if label == "domain" else "direct"
+
+
+def report(rows: list[dict], preds: list[str], title: str):
+    gold = [r["label"] for r in rows]
+    labels = sorted(set(gold) | set(preds))
+    acc = np.mean([g == p for g, p in zip(gold, preds)])
+    coarse_acc = np.mean([coarse(g) == coarse(p) for g, p in zip(gold, preds)])
+    # Domain questions refused or small-talked: the costly mistake
+    lost = sum(1 for g, p in zip(gold, preds) if g == "domain" and p != "domain")
+    print(f"\n== {title}: accuracy={acc:.3f} direct/retrieve accuracy={coarse_acc:.3f} "
+          f"domain questions not retrieved={lost}")
+    print(f"{'label':<11} {'precision':>9} {'recall':>7} {'n':>4}")
+    for label in labels:
+        tp = sum(1 for g, p in zip(gold, preds) if g == label and p == label)
+        n_pred, n_gold = preds.count(label), gold.count(label)
+        print(f"{label:<11} {tp / n_pred if n_pred else 0:>9.3f} {tp / n_gold if n_gold else 0:>7.3f} {n_gold:>4}")
+    counts = Counter(zip(gold, preds))
+    print("\nconfusion (rows=gold, cols=predicted)")
+    print(" " * 11 + "".join(f"{l[:9]:>10}" for l in labels))
+    for g in labels:
+        print(f"{g:<11}" + "".join(f"{counts[(g, p)]:>10}" for p in labels))
+    for r, p in zip(rows, preds):
+        if r["label"] != p:
+            print(f"  miss: {r['text']!r} gold={r['label']} predicted={p}")
+
+
+def measure_pipeline(vectordb, bm25, questions: list[str]) -> tuple[float, float]:
+    """Mean (retrieval + rerank ms, cross-encoder pairs) per question; QOQA off so no LLM is needed."""
+    from chatbot_backend.llm import cascade_rerank, retrieve_candidates
+
+    ms, pairs = [], []
+    for q in questions:
+        t0 = time.perf_counter()
+        stats = {}
+        canonical, docs = retrieve_candidates(vectordb, q, bm25_retriever=bm25, use_qoqa=False)
+        cascade_rerank(canonical, docs, 20, stats=stats)
+        ms.append((time.perf_counter() - t0) * 1000)
+        pairs.append(stats["rerank"]["scored"])
+    return float(np.mean(ms)), float(np.mean(pairs))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--artifact", type=str, default="chromaDb_expanded_artifact", help="Index artifact with encoder/")
+    ap.add_argument("--labeled", type=str, default=os.path.join(THIS_DIR, "router_eval.jsonl"))
+    ap.add_argument("--measure", action="store_true", help="Time retrieval + rerank on the domain questions")
+    ap.add_argument("--retrieval-ms", type=float, default=400.0, help="Per-query retrieval + rerank cost without --measure")
+    ap.add_argument("--llm-ms", type=float, default=2500.0, help="Per-query answer generation cost")
+    ap.add_argument("--sweep", action="store_true", help="Accuracy over a grid of ROUTER_DOMAIN_MIN x ROUTER_MARGIN")
+    args = ap.parse_args()
+
+    from chatbot_backend.index_artifact import load_retrievers
+
+    rows = load_labeled(args.labeled)
+    vectordb, bm25 = load_retrievers(args.artifact)
+    router = build_router(vectordb)
+
+    decisions, route_ms = [], []
+    for r in rows:
+        t0 = time.perf_counter()
+        decisions.append(router.classify(r["text"]))
+        route_ms.append((time.perf_counter() - t0) * 1000)
+    preds = [d["route"] for d in decisions]
+
+    report(rows, [legacy_route(r["text"]) for r in rows], "legacy substring greeting check")
+    report(rows, preds, "router")
+    by = Counter(d["by"] for d in decisions)
+    print(f"\nrouter latency: mean={np.mean(route_ms):.2f}ms max={np.max(route_ms):.2f}ms; decided by {dict(by)}")
+
+    retrieval_ms, pairs = args.retrieval_ms, None
+    if args.measure:
+        retrieval_ms, pairs = measure_pipeline(vectordb, bm25, [r["text"] for r in rows if r["label"] == "domain"])
+    skipped = sum(1 for p in preds if p != "domain")
+    print(f"\nanswered without retrieval: {skipped}/{len(rows)} queries "
+          f"({skipped} LLM calls, {skipped} retrieval passes"
+          + (f", ~{skipped * pairs:.0f} cross-encoder pairs" if pairs is not None else "") + " avoided)")
+    print(f"estimated time saved: {skipped * (retrieval_ms + args.llm_ms) / 1000:.1f}s "
+          f"(retrieval+rerank {retrieval_ms:.0f}ms{' measured' if args.measure else ''} + LLM {args.llm_ms:.0f}ms per query) "
+          f"for {np.sum(route_ms) / 1000:.2f}s of routing")
+
+    if args.sweep:
+        gold = [r["label"] for r in rows]
+        print(f"\n{'domain_min':>10} {'margin':>7} {'accuracy':>9} {'domain lost':>12}")
+        for domain_min in (0.15, 0.2, 0.25, 0.3, 0.35, 0.4):
+            for margin in (0.0, 0.05, 0.1):
+                router.domain_min, router.margin = domain_min, margin
+                swept = [router.classify(r["text"])["route"] for r in rows]
+                lost = sum(1 for g, p in zip(gold, swept) if g == "domain" and p != "domain")
+                print(f"{domain_min:>10.2f} {margin:>7.2f} {np.mean([g == p for g, p in zip(gold, swept)]):>9.3f} {lost:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Export the bi-encoder and the cross-encoder to ONNX (optionally with dynamic int8 weights),
+check that their scores match the PyTorch models, and benchmark both paths on CPU.
+
+Output layout (what EMBED_BACKEND=onnx / RERANK_BACKEND=onnx load from ONNX_MODEL_DIR):
+  <out>/embedder/model.onnx [+ model.int8.onnx], tokenizer.json
+  <out>/reranker/model.onnx [+ model.int8.onnx], tokenizer.json
+
+Parity: cosine between torch and ONNX embeddings, max |delta| of reranker logits, and
+top-k agreement of the reranked order for each eval question.
+
+Needs the onnx package (requirements-optional.txt) in addition to the server requirements.
+
+Usage example:
+  python scripts/export_onnx.py --out models/onnx --quantize
+  python scripts/export_onnx.py --out models/onnx --skip-export --threads 1 2 4
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+import numpy as np
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(THIS_DIR, os.pardir))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from chatbot_backend.db import EMBED_MODEL
+from chatbot_backend.llm import RERANK_MODEL
+from chatbot_backend.onnx_models import (
+    OnnxCrossEncoder, OnnxEmbeddings, QUANTIZED_FILE,
+    export_cross_encoder, export_sentence_encoder, quantize_model,
+)
+
+
+def load_questions(path: str) -> list[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line)["question"] for line in f if line.strip()]
+
+
+def load_passages(csv_path: str, limit: int) -> list[str]:
+    from itertools import islice
+    from chatbot_backend.processing1 import iter_csv_documents
+    return [d.page_content for d in islice(iter_csv_documents(csv_path), limit)]
+
+
+def timed(fn, repeat: int) -> float:
+    fn()  # warm-up
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        runs.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(runs)
+
+
+def check_embedder(model_dir: str, texts: list[str], quantized: bool):
+    from sentence_transformers import SentenceTransformer
+
+    ref = SentenceTransformer(EMBED_MODEL).encode(texts, normalize_embeddings=True)
+    for q in ([False, True] if quantized else [False]):
+        got = OnnxEmbeddings(model_dir, quantized=q).encode(texts)
+        cos = (ref * got).sum(axis=1)
+        print(f"[PARITY] embedder {'int8' if q else 'fp32'}: cosine min={cos.min():.5f} mean={cos.mean():.5f}")
+
+
+def check_reranker(model_dir: str, questions: list[str], passages: list[str], quantized: bool, k: int):
+    from sentence_transformers import CrossEncoder
+
+    torch_ce = CrossEncoder(RERANK_MODEL)
+    for q in ([False, True] if quantized else [False]):
+        ce = OnnxCrossEncoder(model_dir, quantized=q)
+        deltas, overlap = [], []
+        for question in questions:
+            pairs = [(question, p) for p in passages]
+            ref = np.asarray(torch_ce.predict(pairs), dtype=np.float32)
+            got = ce.predict(pairs)
+            deltas.append(float(np.abs(ref - got).max()))
+            top_ref = set(np.argsort(-ref)[:k].tolist())
+            overlap.append(len(top_ref & set(np.argsort(-got)[:k].tolist())) / k)
+        print(f"[PARITY] reranker {'int8' if q else 'fp32'}: max|delta logit|={max(deltas):.4f} "
+              f"top-{k} agreement={np.mean(overlap):.3f}")
+
+
+def benchmark(args, questions: list[str], passages: list[str]):
+    emb_dir, rr_dir = os.path.join(args.out, "embedder"), os.path.join(args.out, "reranker")
+    pairs = [(questions[0], p) for p in passages]
+    rows = []
+    try:
+        from sentence_transformers import CrossEncoder, SentenceTransformer
+        st, ce = SentenceTransformer(EMBED_MODEL), CrossEncoder(RERANK_MODEL)
+        rows.append(("torch", "-", timed(lambda: st.encode(questions), args.repeat),
+                     timed(lambda: ce.predict(pairs), args.repeat)))
+    except ImportError:
+        print("[BENCH] sentence_transformers not installed; skipping the torch baseline")
+    variants = [False, True] if os.path.exists(os.path.join(rr_dir, QUANTIZED_FILE)) else [False]
+    for quantized in variants:
+        for threads in args.threads:
+            emb = OnnxEmbeddings(emb_dir, intra_op_threads=threads, quantized=quantized)
+            rr = OnnxCrossEncoder(rr_dir, intra_op_threads=threads, quantized=quantized)
+            rows.append(("onnx-int8" if quantized else "onnx-fp32", threads,
+                         timed(lambda: emb.encode(questions), args.repeat),
+                         timed(lambda: rr.predict(pairs), args.repeat)))
+    print(f"\n{'backend':<10} {'threads':>7} {'embed ' + str(len(questions)) + ' q (ms)':>20} {'rerank ' + str(len(pairs)) + ' pairs (ms)':>24}")
+    for name, threads, emb_ms, rr_ms in rows:
+        print(f"{name:<10} {threads:>7} {emb_ms:>20.1f} {rr_ms:>24.1f}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--out", type=str, default="models/onnx", help="Export directory (ONNX_MODEL_DIR)")
+    ap.add_argument("--csv", type=str, default="data/DATA_FAQ_EXPANDED.csv", help="Passages for parity/benchmark")
+    ap.add_argument("--eval-file", type=str, default=os.path.join(THIS_DIR, "sample_eval.jsonl"))
+    ap.add_argument("--quantize", action="store_true", help="Also write dynamic int8 models")
+    ap.add_argument("--skip-export", action="store_true", help="Reuse models already in --out")
+    ap.add_argument("--skip-parity", action="store_true")
+    ap.add_argument("--passages", type=int, default=60, help="Passages scored per question")
+    ap.add_argument("--k", type=int, default=10, help="Top-k used for reranker agreement")
+    ap.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4], help="intra-op thread counts to benchmark")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    emb_dir, rr_dir = os.path.join(args.out, "embedder"), os.path.join(args.out, "reranker")
+    if not args.skip_export:
+        export_sentence_encoder(EMBED_MODEL, emb_dir)
+        export_cross_encoder(RERANK_MODEL, rr_dir)
+        if args.quantize:
+            quantize_model(emb_dir)
+            quantize_model(rr_dir)
+
+    questions = load_questions(args.eval_file)
+    passages = load_passages(args.csv, args.passages)
+    if not args.skip_parity:
+        check_embedder(emb_dir, questions + passages, args.quantize)
+        check_reranker(rr_dir, questions, passages, args.quantize, args.k)
+    benchmark(args, questions, passages)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+(Re)build the persisted Chroma index from the FAQ CSV with the batched ingestion pipeline
+(chatbot_backend/ingest.py): streamed read and split, embedding batches on a worker pool, one
+bulk upsert per batch, and a checkpoint after every write.
+
+Interrupt it at any point and run the same command again to continue where it stopped;
+--no-resume starts over. Progress and final throughput are printed in documents per second.
+
+Usage example:
+  python scripts/ingest.py --csv data/DATA_FAQ_EXPANDED.csv --persist-dir chromaDb_expanded --workers 4
+"""
+
+import os
+import sys
+import argparse
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(THIS_DIR, os.pardir))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from chatbot_backend.ingest import INGEST_BATCH_SIZE, INGEST_WORKERS, run_pipeline
+from chatbot_backend.processing1 import CHUNKER
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--csv", type=str, default="data/DATA_FAQ_EXPANDED.csv", help="FAQ CSV (or .parquet) to index")
+    ap.add_argument("--persist-dir", type=str, default="chromaDb_expanded", help="Chroma directory (VECTOR_DB_PATH)")
+    ap.add_argument("--collection", type=str, default="iitrpr_faq")
+    ap.add_argument("--chunker", type=str, default=CHUNKER, choices=("tokens", "chars"),
+                    help="tokens: sized to the embedder window (CHUNK_MAX_TOKENS); chars: 1000/200 characters")
+    ap.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE, help="Documents per embedding call / upsert")
+    ap.add_argument("--workers", type=int, default=INGEST_WORKERS, help="Embedding threads")
+    ap.add_argument("--no-resume", action="store_true", help="Ignore the checkpoint and rebuild from scratch")
+    args = ap.parse_args()
+
+    _, stats = run_pipeline(args.csv, args.persist_dir, args.collection, chunker=args.chunker,
+                            batch_size=args.batch_size, workers=args.workers, resume=not args.no_resume)
+    print(f"[INGEST] {stats}")
+
+
+if __name__ == "__main__":
+    main()
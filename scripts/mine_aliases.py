@@ -0,0 +1,195 @@
+"""
+Mine alias / abbreviation pairs from the FAQ corpus into a lookup table for the
+rule-based query expander (chatbot_backend/query_expansion.py).
+
+Sources:
+  1. Parenthetical definitions:   "Computer Science and Engineering (CSE)"
+  2. Acronym <-> capitalized phrase with matching initials in the same row
+     ("HoD" <-> "Head of Department")
+  3. Paraphrase alignment: each expanded question is aligned with the original question
+     for the same answer; a short differing span on both sides is an alias candidate.
+     Only acronym <-> expansion spans are kept ("hos" <-> "head of school"): other spans are
+     rewordings ("name" <-> "can you list") that break queries when substituted. Candidates
+     must show up for --min-support distinct answers to be kept.
+
+Usage example:
+  python scripts/mine_aliases.py --csv "data/DATA_05_09_2025 - Sheet1.csv" --expanded data/DATA_FAQ_EXPANDED.csv --out data/aliases.json
+"""
+
+import os
+import re
+import sys
+import csv
+import json
+import argparse
+from collections import Counter, defaultdict
+
+# Ensure project root is on sys.path so local imports work when running from scripts/
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(THIS_DIR, os.pardir))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from chatbot_backend.query_expansion import tokenize, SEED_ALIASES
+
+STOP = {"a", "an", "the", "of", "and", "&", "for", "in", "at", "to", "is", "are", "what", "who", "how",
+        "does", "do", "which", "where", "when", "there", "any", "iit", "ropar", "iitrpr", "on", "with", "by"}
+JOINERS = {"of", "and", "&", "for", "the", "in"}
+# Short acronyms that are also everyday words would fire on ordinary queries ("tell me", "is it")
+COMMON_WORDS = {"it", "me", "am", "an", "as", "is", "id", "us", "in", "on", "at", "or", "do", "go", "so", "no",
+                "be", "by", "he", "we", "my", "up", "if", "of", "to", "ok", "hi", "pm", "ac", "de", "ss", "rc"}
+
+ACRONYM_RE = re.compile(r"\b([A-Z][A-Za-z]{0,2}[A-Z]{1,5}s?)\b")
+PHRASE_RE = re.compile(r"\b([A-Z][a-z]+(?:\s+(?:of|and|&|for|the|in)?\s*[A-Z][a-z]+){1,5})\b")
+PAREN_RE = re.compile(r"([A-Z][A-Za-z]+(?:\s+(?:of|and|&|for|the|in|[A-Z][A-Za-z]+))+)\s*\(\s*([A-Z][A-Za-z&]{1,9})\s*\)")
+
+
+def read_rows(path: str) -> list[dict]:
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        return [{(k or "").strip().lower(): (v or "").strip() for k, v in r.items()} for r in reader]
+
+
+def _initials(phrase: str, with_joiners: bool) -> str:
+    words = phrase.split()
+    return "".join(w[0] for w in words if with_joiners or w.lower() not in JOINERS).lower()
+
+
+def acronym_matches(acr: str, phrase: str) -> bool:
+    # "HoDs" is the plural of "HoD", but the "s" of "HoS" (Head of School) is an initial
+    forms = {acr.lower()} | ({acr[:-1].lower()} if len(acr) > 2 and acr.endswith("s") else set())
+    initials = (_initials(phrase, True), _initials(phrase, False))
+    return any(len(a) >= 2 and a in initials for a in forms)
+
+
+def mine_parenthetical(texts: list[str]) -> Counter:
+    pairs = Counter()
+    for t in texts:
+        for phrase, acr in PAREN_RE.findall(t):
+            words = phrase.split()
+            # the definition is the shortest suffix of the phrase whose initials match the acronym
+            for k in range(len(words)):
+                cand = " ".join(words[k:])
+                if acronym_matches(acr, cand):
+                    pairs[(acr.lower(), cand.lower())] += 1
+                    break
+    return pairs
+
+
+def mine_cooccurring(texts: list[str]) -> Counter:
+    """Acronym and matching phrase appearing in the same row."""
+    pairs = Counter()
+    for t in texts:
+        acronyms = set(ACRONYM_RE.findall(t))
+        phrases = {p.strip() for p in PHRASE_RE.findall(t)}
+        for acr in acronyms:
+            for phrase in phrases:
+                if acronym_matches(acr, phrase):
+                    pairs[(acr.lower(), phrase.lower())] += 1
+    return pairs
+
+
+def is_acronym_pair(a: str, b: str) -> bool:
+    """One side is a single-token acronym whose letters are the initials of the other side."""
+    for acr, phrase in ((a, b), (b, a)):
+        if " " not in acr and " " in phrase and len(acr) <= 6 and acronym_matches(acr, phrase):
+            return True
+    return False
+
+
+def _diff_span(a: list[str], b: list[str]):
+    i = 0
+    while i < min(len(a), len(b)) and a[i] == b[i]:
+        i += 1
+    j = 0
+    while j < min(len(a), len(b)) - i and a[-1 - j] == b[-1 - j]:
+        j += 1
+    return a[i:len(a) - j], b[i:len(b) - j]
+
+
+def mine_paraphrases(original_rows: list[dict], expanded_rows: list[dict], max_span: int = 4) -> Counter:
+    originals = {}
+    for r in original_rows:
+        if r.get("question") and r.get("answer"):
+            originals.setdefault(r["answer"], r["question"])
+    groups = defaultdict(list)
+    for r in expanded_rows:
+        if r.get("question") and r.get("answer") in originals:
+            groups[r["answer"]].append(r["question"])
+
+    pairs = Counter()
+    for answer, paras in groups.items():
+        base = tokenize(originals[answer])
+        found = set()
+        for p in paras:
+            x, y = _diff_span(base, tokenize(p))
+            if not x or not y or len(x) > max_span or len(y) > max_span:
+                continue
+            if all(t in STOP for t in x) or all(t in STOP for t in y):
+                continue
+            # trim stopwords at the span edges so "the hod" and "hod" count together
+            while x and x[0] in STOP:
+                x = x[1:]
+            while y and y[0] in STOP:
+                y = y[1:]
+            while x and x[-1] in STOP:
+                x = x[:-1]
+            while y and y[-1] in STOP:
+                y = y[:-1]
+            sx, sy = " ".join(x), " ".join(y)
+            if sx and sy and sx != sy and sx not in sy and sy not in sx and is_acronym_pair(sx, sy):
+                found.add(tuple(sorted((sx, sy))))
+        # support counts distinct answers, so one noisy group cannot promote a pair on its own
+        pairs.update(found)
+    return pairs
+
+
+def build_table(pairs: Counter, max_aliases: int = 3) -> dict:
+    table = defaultdict(list)
+    for (a, b), _ in pairs.most_common():
+        if a in COMMON_WORDS or b in COMMON_WORDS:
+            continue
+        if len(table[a]) >= max_aliases or len(table[b]) >= max_aliases:
+            continue
+        if b not in table[a]:
+            table[a].append(b)
+        if a not in table[b]:
+            table[b].append(a)
+    return dict(sorted(table.items()))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--csv", type=str, default="data/DATA_05_09_2025 - Sheet1.csv", help="Original FAQ CSV")
+    ap.add_argument("--expanded", type=str, default="data/DATA_FAQ_EXPANDED.csv", help="Paraphrase-expanded CSV")
+    ap.add_argument("--out", type=str, default="data/aliases.json", help="Where to write the alias table")
+    ap.add_argument("--min-support", type=int, default=2, help="Min distinct answers supporting a paraphrase-mined pair")
+    args = ap.parse_args()
+
+    original = read_rows(args.csv)
+    expanded = read_rows(args.expanded) if os.path.exists(args.expanded) else []
+    texts = [f"{r.get('question', '')} {r.get('answer', '')}" for r in original + expanded]
+
+    paren = mine_parenthetical(texts)
+    cooc = mine_cooccurring(texts)
+    para = Counter({k: v for k, v in mine_paraphrases(original, expanded).items() if v >= args.min_support})
+    seeds = Counter({tuple(sorted(p)): 1 for p in SEED_ALIASES})
+    print(f"[ALIAS] parenthetical={len(paren)} cooccurring={len(cooc)} paraphrase={len(para)} seeds={len(seeds)}")
+
+    merged = Counter()
+    for c in (paren, cooc, para, seeds):
+        merged.update(c)
+    table = build_table(merged)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({
+            "version": 1,
+            "sources": {"parenthetical": len(paren), "cooccurring": len(cooc), "paraphrase": len(para)},
+            "aliases": table,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"[ALIAS] Wrote {len(table)} phrases to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
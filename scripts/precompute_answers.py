@@ -0,0 +1,133 @@
+"""
+Precompute answers for every question in the FAQ CSV (canonical and paraphrased rows) and the
+red-team set, and store them in the answer store the backend serves from
+(chatbot_backend/answer_store.py, ANSWER_STORE_PATH).
+
+Runs incrementally against the corpus the server would load (CSV_PATH, INDEX_BACKEND, ...):
+  - rows already valid for the current corpus version are skipped
+  - rows whose context documents and source CSV rows are unchanged are re-tagged with the new
+    version without regenerating
+  - only new or changed questions go through the pipeline (answer_batch: one embedding and
+    cross-encoder pass per batch, BATCH_LLM_CONCURRENCY generations at a time)
+
+Usage example:
+  CSV_PATH=data/DATA_FAQ_EXPANDED.csv VECTOR_DB_PATH=chromaDb_expanded \\
+    python scripts/precompute_answers.py --store answer_store.sqlite --qoqa
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(THIS_DIR, os.pardir))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from chatbot_backend.answer_store import ANSWER_STORE_PATH, AnswerStore, question_key
+
+DEFAULT_REDTEAM = os.path.join(PROJECT_ROOT, "chatbot_frontend", "public", "testing", "redteam_questions.json")
+
+
+def _sha1(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def collect_questions(csv_path: str, redteam_path: str | None) -> tuple[dict, dict]:
+    """(key -> question, key -> source hash). The source hash covers every CSV row asking the
+    question (or, for red-team questions, the row they were generated from)."""
+    from chatbot_backend.processing1 import iter_csv_documents
+
+    questions, rows = {}, {}
+    for doc in iter_csv_documents(csv_path):
+        m = doc.metadata
+        key = question_key(m["question"])
+        questions.setdefault(key, m["question"])
+        rows.setdefault(key, []).append(_sha1(f"{m['category']}\n{m['question']}\n{m['answer']}"))
+    if redteam_path and os.path.exists(redteam_path):
+        with open(redteam_path, "r", encoding="utf-8") as f:
+            items = json.load(f).get("items", [])
+        for item in items:
+            q = (item.get("generated_question") or "").strip()
+            if q and question_key(q) not in questions:
+                questions[question_key(q)] = q
+                rows[question_key(q)] = rows.get(question_key(item.get("source_question") or ""), [])
+        print(f"[PRECOMPUTE] {len(items)} red-team questions from {redteam_path}")
+    return questions, {k: _sha1("\n".join(sorted(v))) for k, v in rows.items()}
+
+
+def corpus_doc_ids(csv_path: str) -> set:
+    """Ids of the chunks the live index holds (same chunking as backend._load_indexes)."""
+    from chatbot_backend.llm import doc_id
+    from chatbot_backend.processing1 import iter_chunks, iter_csv_documents
+
+    return {doc_id(d) for d in iter_chunks(iter_csv_documents(csv_path))}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--store", type=str, default=ANSWER_STORE_PATH or "answer_store.sqlite",
+                    help="SQLite answer store (the server's ANSWER_STORE_PATH)")
+    ap.add_argument("--redteam", type=str, default=DEFAULT_REDTEAM, help="Red-team question set ('' to skip)")
+    ap.add_argument("--batch-size", type=int, default=32, help="Questions per answer_batch call")
+    ap.add_argument("--concurrency", type=int, default=None, help="Concurrent generations (BATCH_LLM_CONCURRENCY)")
+    ap.add_argument("--qoqa", action="store_true", help="Run the QOQA rewrite for each question first, as /chat would")
+    ap.add_argument("--limit", type=int, default=0, help="Compute at most this many questions (0 = all)")
+    ap.add_argument("--force", action="store_true", help="Recompute every question")
+    ap.add_argument("--prune", action="store_true", help="Delete rows not valid for the current corpus afterwards")
+    args = ap.parse_args()
+
+    from chatbot_backend import backend
+    from chatbot_backend.llm import answer_batch, doc_id, qoqa_rewrite_cached
+
+    t0 = time.perf_counter()
+    store = AnswerStore(args.store)
+    indexes = backend._load_indexes()
+    version = indexes["corpus_version"]
+    questions, source_hashes = collect_questions(backend.CSV_PATH, args.redteam)
+    print(f"[PRECOMPUTE] corpus {version[:12]}: {len(questions)} distinct questions")
+
+    counts = store.revalidate(version, corpus_doc_ids(backend.CSV_PATH), source_hashes)
+    print(f"[PRECOMPUTE] store: {counts['current']} current, {counts['retagged']} carried over unchanged, "
+          f"{counts['stale']} stale")
+    done = set() if args.force else store.current_keys(version)
+    todo = [k for k in questions if k not in done]
+    if args.limit:
+        todo = todo[:args.limit]
+    print(f"[PRECOMPUTE] {len(todo)} questions to compute")
+
+    computed = failed = 0
+    for start in range(0, len(todo), args.batch_size):
+        keys = todo[start:start + args.batch_size]
+        batch = [questions[k] for k in keys]
+        if args.qoqa:
+            for q in batch:
+                qoqa_rewrite_cached(q)  # answer_batch picks cached rewrites up
+        rows = []
+        for item in answer_batch(indexes["vectordb"], batch, bm25_retriever=indexes["bm25_retriever"],
+                                 corpus_version=version, max_concurrency=args.concurrency, with_context=True):
+            if item["answer"].startswith("I encountered an error"):
+                continue  # generation failed; left for the next run
+            context = item["context"]
+            rows.append({"question": item["question"], "answer": item["answer"],
+                         "contexts": [{"page_content": d.page_content, "metadata": dict(d.metadata or {})}
+                                      for d in context],
+                         "context_ids": [doc_id(d) for d in context],
+                         "source_hash": source_hashes[keys[item["index"]]]})
+        store.put_many(rows, version)
+        computed += len(rows)
+        failed += len(batch) - len(rows)
+        elapsed = time.perf_counter() - t0
+        print(f"[PRECOMPUTE] {computed}/{len(todo)} computed ({computed / elapsed:.2f} questions/s)")
+
+    if args.prune:
+        print(f"[PRECOMPUTE] pruned {store.prune(version)} rows of other corpus versions")
+    print(f"[PRECOMPUTE] done in {time.perf_counter() - t0:.1f}s: {computed} computed, {failed} failed, "
+          f"{counts['retagged']} carried over, {len(done & questions.keys())} already current; {store.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Report memory of a pre-fork server: the master plus every child process.
+
+RSS counts shared pages once per process; PSS splits shared pages between the processes
+that map them, and USS is memory private to the process. Going from 1 to N workers should
+add roughly N x USS, not N x RSS.
+
+Usage example (Linux):
+  gunicorn -c chatbot_backend/gunicorn.conf.py &
+  python scripts/worker_memory.py --pid $(pgrep -f "gunicorn" | head -1)
+"""
+
+import os
+import argparse
+
+
+def _rollup(pid: int) -> dict:
+    out = {}
+    with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[-1] == "kB":
+                out[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss": out.get("Rss", 0),
+        "pss": out.get("Pss", 0),
+        "uss": out.get("Private_Clean", 0) + out.get("Private_Dirty", 0),
+    }
+
+
+def _children(pid: int) -> list[int]:
+    kids = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        try:
+            with open(f"/proc/{pid}/task/{task}/children", "r") as f:
+                kids.extend(int(p) for p in f.read().split())
+        except OSError:
+            pass
+    return kids
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pid", type=int, required=True, help="PID of the gunicorn master")
+    args = ap.parse_args()
+
+    pids = [args.pid] + _children(args.pid)
+    total = {"rss": 0, "pss": 0, "uss": 0}
+    print(f"{'pid':>8} {'role':>7} {'RSS MB':>9} {'PSS MB':>9} {'USS MB':>9}")
+    for i, pid in enumerate(pids):
+        m = _rollup(pid)
+        for k in total:
+            total[k] += m[k]
+        role = "master" if i == 0 else "worker"
+        print(f"{pid:>8} {role:>7} {m['rss'] / 1024:>9.1f} {m['pss'] / 1024:>9.1f} {m['uss'] / 1024:>9.1f}")
+    print(f"{'total':>8} {'':>7} {total['rss'] / 1024:>9.1f} {total['pss'] / 1024:>9.1f} {total['uss'] / 1024:>9.1f}")
+    print("PSS total is the real footprint; compare it against a single-worker run.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import threading
+import time
+
+import pytest
+
+from chatbot_backend import backend
+from chatbot_backend.admission import AdmissionController, Overloaded, RateLimiter, priority_class
+
+
+def test_token_bucket_allows_burst_then_rejects_with_retry_after():
+    limiter = RateLimiter(rate=0.5, burst=2)
+    limiter.check("a")
+    limiter.check("a")
+    with pytest.raises(Overloaded) as info:
+        limiter.check("a")
+    assert info.value.reason == "rate_limited"
+    assert info.value.retry_after == 2
+    limiter.check("b")  # buckets are per key
+
+
+def test_token_bucket_refills():
+    limiter = RateLimiter(rate=100, burst=1)
+    limiter.check("a")
+    with pytest.raises(Overloaded):
+        limiter.check("a")
+    time.sleep(0.05)
+    limiter.check("a")
+
+
+def test_token_bucket_forgets_oldest_keys():
+    limiter = RateLimiter(rate=0.001, burst=1, max_keys=2)
+    for key in ("a", "b", "c"):
+        limiter.check(key)
+    assert list(limiter._buckets) == ["b", "c"]
+    limiter.check("a")  # evicted, so it starts with a full bucket again
+
+
+def test_priority_class_only_lowers():
+    assert priority_class("batch") == "batch"
+    assert priority_class("LOW") == "batch"
+    assert priority_class("urgent") == "interactive"
+    assert priority_class(None) == "interactive"
+
+
+def test_batch_never_takes_reserved_interactive_slot():
+    controller = AdmissionController(capacity=2, reserved=1, slo_s={"interactive": 10.0, "batch": 2.0})
+    controller.acquire("batch")
+    with pytest.raises(Overloaded) as info:
+        controller.acquire("batch")
+    assert info.value.retry_after >= 2
+    assert controller.acquire("interactive") == pytest.approx(0, abs=0.05)
+    assert controller.snapshot()["active"] == {"interactive": 1, "batch": 1}
+
+
+def test_acquire_more_takes_only_free_slots():
+    controller = AdmissionController(capacity=4, reserved=1, slo_s={"interactive": 10.0, "batch": 2.0})
+    controller.acquire("batch")
+    assert controller.acquire_more("batch", 5) == 2  # the last slot stays reserved for interactive
+    assert controller.acquire_more("batch", 1) == 0
+    controller.release("batch", 1.0, slots=3)
+    assert controller.snapshot()["active"]["batch"] == 0
+
+
+def test_sheds_at_once_when_expected_wait_exceeds_slo():
+    controller = AdmissionController(capacity=1, reserved=0, slo_s={"interactive": 1.0, "batch": 1.0})
+    controller.acquire("interactive")
+    t0 = time.monotonic()
+    with pytest.raises(Overloaded) as info:
+        controller.acquire("interactive")
+    assert time.monotonic() - t0 < 0.5
+    assert info.value.reason == "overloaded"
+    assert info.value.retry_after == 5  # one request ahead at the 5s interactive seed
+
+
+def test_queued_request_runs_when_a_slot_frees():
+    controller = AdmissionController(capacity=1, reserved=0, slo_s={"interactive": 10.0, "batch": 10.0})
+    controller.service_s["interactive"] = 0.1
+    controller.acquire("interactive")
+    waited = []
+    waiter = threading.Thread(target=lambda: waited.append(controller.acquire("interactive")))
+    waiter.start()
+    deadline = time.monotonic() + 5
+    while controller.snapshot()["waiting"]["interactive"] == 0:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+    controller.release("interactive", 0.1)
+    waiter.join(5)
+    assert waited and waited[0] > 0
+    assert controller.snapshot()["active"]["interactive"] == 1
+
+
+def test_rate_limited_chat_gets_429_with_retry_after(monkeypatch):
+    monkeypatch.setattr(backend, "rate_limiter", RateLimiter(rate=0.25, burst=1))
+    monkeypatch.setattr(backend, "REQUIRE_API_KEY", False)
+    client = backend.create_app(warm="none").test_client()
+
+    first = client.post("/chat", json={"question": "hello"})
+    assert first.status_code == 200
+    second = client.post("/chat", json={"question": "hello"})
+    assert second.status_code == 429
+    assert second.headers["Retry-After"] == "4"
+    assert second.get_json()["error"] == "rate_limited"
@@ -0,0 +1,63 @@
+import pytest
+
+from chatbot_backend.answer_store import AnswerStore, loose_form, question_key
+
+
+@pytest.mark.parametrize("a,b", [
+    ("What is the hostel fee?", "what's the hostel fees"),
+    ("Who is the HoD of CSE?", "who's HOD of CSE"),
+    ("Can you tell me the mess timings at IIT Ropar?", "mess timing"),
+])
+def test_loose_form_folds_surface_variants(a, b):
+    assert loose_form(a) == loose_form(b)
+
+
+def test_loose_form_keeps_content_words():
+    assert loose_form("What is the hostel fee?") != loose_form("What is the mess fee?")
+    assert loose_form("class timings") == "class timing"  # "ss" is not a plural
+    assert loose_form("the is a") == ""
+
+
+def _row(question, answer="answer", context_ids=("d1", "d2"), source_hash="h1"):
+    return {"question": question, "answer": answer, "contexts": [{"page_content": "ctx", "metadata": {"row": 1}}],
+            "context_ids": list(context_ids), "source_hash": source_hash}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return AnswerStore(str(tmp_path / "answers.sqlite"))
+
+
+def test_lookup_exact_and_near(store):
+    store.put_many([_row("What is the hostel fee?")], "v1")
+    exact = store.lookup("what is the hostel fee?", "v1")
+    assert exact["match"] == "exact" and exact["answer"] == "answer"
+    assert exact["contexts"][0]["metadata"] == {"row": 1}
+    assert store.lookup("whats the hostel fees", "v1")["match"] == "near"
+    assert store.lookup("whats the hostel fees", "v1", near=False) is None
+    assert store.lookup("What is the mess fee?", "v1") is None
+
+
+def test_lookup_only_serves_the_live_corpus_version(store):
+    store.put_many([_row("What is the hostel fee?")], "v1")
+    assert store.lookup("What is the hostel fee?", "v2") is None
+    assert store.lookup("What is the hostel fee?", "") is None
+
+
+def test_revalidate_retags_only_unchanged_rows(store):
+    store.put_many([_row("What is the hostel fee?"),
+                    _row("Who is the HoD of CSE?", context_ids=("d3",)),
+                    _row("When does the semester start?", source_hash="old")], "v1")
+    store.put_many([_row("Where is the library?")], "v2")
+    hashes = {question_key(q): "h1" for q in ("What is the hostel fee?", "Who is the HoD of CSE?",
+                                              "When does the semester start?", "Where is the library?")}
+
+    counts = store.revalidate("v2", doc_ids={"d1", "d2"}, source_hashes=hashes)
+
+    # The HoD answer cites a document that is gone; the semester question's source rows changed
+    assert counts == {"current": 1, "retagged": 1, "stale": 2}
+    assert store.lookup("What is the hostel fee?", "v2") is not None
+    assert store.lookup("Who is the HoD of CSE?", "v2") is None
+    assert store.current_keys("v2") == {question_key("What is the hostel fee?"), question_key("Where is the library?")}
+    assert store.prune("v2") == 2
+    assert store.stats()["rows"] == {"v2": 2}
@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from chatbot_backend import backend
+from chatbot_backend.admission import AdmissionController, RateLimiter
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(backend, "REQUIRE_API_KEY", False)
+    monkeypatch.setattr(backend, "rate_limiter", RateLimiter(rate=0))
+    monkeypatch.setattr(backend, "admission", AdmissionController(capacity=8, reserved=1))
+    monkeypatch.setattr(backend.status, "is_ready", lambda: True)
+    monkeypatch.setattr(backend, "_indexes", {"vectordb": object(), "bm25_retriever": None,
+                                              "corpus_version": "v1", "router": None})
+    return backend.create_app(warm="none").test_client()
+
+
+@pytest.fixture
+def batch_calls(monkeypatch):
+    calls = []
+
+    def fake_answer_batch(vectordb, questions, max_concurrency=None, **kwargs):
+        calls.append(max_concurrency)
+        for i, q in enumerate(questions):
+            yield {"index": i, "question": q, "answer": f"answer {i}", "stats": {}}
+
+    monkeypatch.setattr(backend, "answer_batch", fake_answer_batch)
+    return calls
+
+
+def _lines(response):
+    # Closing the streamed response releases its admission slots
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    response.close()
+    return lines
+
+
+@pytest.mark.parametrize("value", ["abc", "4.5x", 4.5, None, [2], True])
+def test_batch_rejects_bad_max_concurrency(client, batch_calls, value):
+    response = client.post("/chat/batch", json={"questions": ["What is the hostel fee?"], "max_concurrency": value})
+    assert response.status_code == 400
+    assert batch_calls == []
+    assert backend.admission.snapshot()["active"]["batch"] == 0
+
+
+@pytest.mark.parametrize("value,expected", [(1000, backend.BATCH_LLM_CONCURRENCY), ("2", 2), (0, 1), (-3, 1)])
+def test_batch_clamps_max_concurrency(client, batch_calls, value, expected):
+    response = client.post("/chat/batch", json={"questions": ["What is the hostel fee?", "hi"],
+                                                "max_concurrency": value})
+    lines = _lines(response)
+    assert response.status_code == 200
+    assert lines[-1]["done"] and lines[-1]["count"] == 2
+    assert batch_calls == [expected]
+
+
+def test_batch_generations_are_limited_to_the_slots_held(client, batch_calls, monkeypatch):
+    controller = AdmissionController(capacity=4, reserved=1)
+    monkeypatch.setattr(backend, "admission", controller)
+    controller.acquire("interactive")  # one busy, one reserved for interactive: two left for the batch
+
+    response = client.post("/chat/batch", json={"questions": ["What is the hostel fee?"], "max_concurrency": 4})
+    assert controller.snapshot()["active"]["batch"] == 2
+    lines = _lines(response)
+    assert lines[-1]["done"]
+    assert batch_calls == [2]
+    assert controller.snapshot()["active"] == {"interactive": 1, "batch": 0}
+
+
+class OffDomainRouter:
+    def route(self, text):
+        return {"route": "off_domain", "reply": "refused", "by": "embedding", "scores": {}}
+
+
+@pytest.mark.parametrize("message,has_last,expected", [
+    ("and his email?", True, "domain"),
+    ("and his email?", False, "off_domain"),
+    ("tell me a joke", True, "off_domain"),
+])
+def test_follow_ups_are_not_refused_as_off_domain(monkeypatch, message, has_last, expected):
+    monkeypatch.setattr(backend.status, "is_ready", lambda: True)
+    session = {"last": {"query": "who is the hod of cse", "candidates": []}} if has_last else {}
+    decision = backend.route(message, {"router": OffDomainRouter()}, session)
+    assert decision["route"] == expected
+    assert (decision["reply"] is None) == (expected == "domain")
@@ -0,0 +1,81 @@
+import pytest
+from langchain_core.documents import Document
+from tokenizers import Tokenizer, models, pre_tokenizers, trainers
+
+from chatbot_backend import chunking
+from chatbot_backend.chunking import SPECIAL_TOKENS, TokenCounter, iter_token_chunks, new_stats
+
+SENTENCES = [f"Sentence {i} explains how students of the department register for elective course {i}."
+             for i in range(60)]
+LONG_ANSWER = " ".join(SENTENCES)
+RUN_ON = " ".join(f"word{i}" for i in range(400))  # one "sentence" longer than any window
+
+
+def _wordpiece_tokenizer():
+    # A small vocabulary, so words split into several pieces and exact counts differ from word counts
+    tok = Tokenizer(models.WordPiece(unk_token="[UNK]"))
+    tok.pre_tokenizer = pre_tokenizers.BertPreTokenizer()
+    trainer = trainers.WordPieceTrainer(vocab_size=120, special_tokens=["[UNK]", "[CLS]", "[SEP]"])
+    tok.train_from_iterator(SENTENCES + [RUN_ON], trainer)
+    return tok
+
+
+@pytest.fixture(params=["approximate", "exact"])
+def counter(request, monkeypatch):
+    counter = TokenCounter(_wordpiece_tokenizer() if request.param == "exact" else None)
+    monkeypatch.setattr(chunking, "_counter", counter)
+    return counter
+
+
+def _doc(answer, row=0):
+    return Document(page_content=f"Q: How do I register for electives?\nA: {answer}", metadata={"row": row})
+
+
+@pytest.mark.parametrize("max_tokens", [48, 96, 256])
+def test_chunks_fit_the_token_window(counter, max_tokens):
+    stats = new_stats()
+    chunks = list(iter_token_chunks([_doc(LONG_ANSWER), _doc(RUN_ON, row=1)], max_tokens=max_tokens,
+                                    overlap_tokens=16, stats=stats))
+
+    lengths = counter.counts([c.page_content for c in chunks])
+    assert max(lengths) + SPECIAL_TOKENS <= max_tokens
+    assert stats["max_tokens"] == max(lengths)
+    assert (stats["documents"], stats["chunks"], stats["split_documents"]) == (2, len(chunks), 2)
+    assert stats["tokenizer"] == ("exact" if counter.exact else "approximate")
+    for c in chunks:
+        assert c.page_content.startswith("Q: How do I register for electives?\nA: ")
+        assert c.metadata["chunks"] == sum(1 for d in chunks if d.metadata["row"] == c.metadata["row"])
+
+
+def test_split_keeps_every_sentence_in_order(counter):
+    chunks = list(iter_token_chunks([_doc(LONG_ANSWER)], max_tokens=96, overlap_tokens=16))
+    assert [c.metadata["chunk"] for c in chunks] == list(range(len(chunks)))
+    seen = []
+    for c in chunks:
+        for sentence in chunking.split_sentences(c.page_content.split("\nA: ", 1)[1]):
+            if sentence not in seen:
+                seen.append(sentence)
+    assert seen == SENTENCES
+
+
+def test_overlap_is_bounded(counter):
+    chunks = list(iter_token_chunks([_doc(LONG_ANSWER)], max_tokens=96, overlap_tokens=16))
+    for prev, nxt in zip(chunks, chunks[1:]):
+        prev_s = chunking.split_sentences(prev.page_content.split("\nA: ", 1)[1])
+        next_s = chunking.split_sentences(nxt.page_content.split("\nA: ", 1)[1])
+        shared = [s for s in next_s if s in prev_s]
+        assert sum(counter.counts(shared)) <= 16
+
+
+def test_short_documents_are_kept_whole(counter):
+    doc = _doc("Registration opens in the first week of the semester.")
+    stats = new_stats()
+    assert list(iter_token_chunks([doc], max_tokens=96, stats=stats)) == [doc]
+    assert stats["split_documents"] == 0
+
+
+def test_cut_respects_token_boundaries(counter):
+    pieces = counter.cut(RUN_ON, 20)
+    assert all(n <= 20 for n in counter.counts(pieces))
+    # Word pieces may split a word across two cuts, but no text is lost or repeated
+    assert "".join(pieces).replace(" ", "") == RUN_ON.replace(" ", "")
@@ -0,0 +1,71 @@
+import json
+
+from langchain_core.documents import Document
+
+from chatbot_backend.dedup import MinHasher, dedup_documents, iter_dedup, lsh_bands
+
+FEE_ANSWER = ("The hostel fee for the autumn semester is 12,500 rupees, payable through the institute "
+              "fee portal before registration. Mess charges are billed separately every month by the "
+              "hostel office, and the security deposit is refunded when the student leaves the hostel.")
+BUS_ANSWER = ("Institute buses run between the main campus and Ropar city every hour from 7 am to 9 pm. "
+              "The timetable is posted on the transport page and students ride free with their ID card.")
+
+
+def _doc(row, question, answer):
+    return Document(page_content=f"Q: {question}\nA: {answer}",
+                    metadata={"row": row, "question": question, "answer": answer})
+
+
+def test_signature_similarity_tracks_jaccard():
+    hasher = MinHasher(128)
+    a = hasher.signature("what is the hostel fee")
+    assert (a == hasher.signature("what is the hostel fee")).all()
+    assert (a == hasher.signature("how do i reach the library")).mean() < 0.2
+
+
+def test_lsh_bands_midpoint_sits_below_threshold():
+    bands, rows = lsh_bands(128, 0.85)
+    assert bands * rows == 128
+    assert (1 / bands) ** (1 / rows) < 0.85
+
+
+def test_near_duplicates_collapse_into_the_first_row():
+    docs = [_doc(0, "What is the hostel fee?", FEE_ANSWER),
+            _doc(1, "How often do campus buses run?", BUS_ANSWER),
+            _doc(2, "What are the hostel fees?", FEE_ANSWER),
+            _doc(3, "what is the hostel fee", FEE_ANSWER)]
+
+    out = dedup_documents(iter(docs))
+
+    assert [d.metadata["row"] for d in out] == [0, 1]
+    rep = out[0]
+    assert rep.metadata["duplicates"] == 2
+    assert rep.metadata["alias_rows"] == "2,3"
+    # Row 3 only differs in case and punctuation, so it adds no alias
+    assert rep.metadata["aliases"] == "What are the hostel fees?"
+    assert rep.page_content == f"Q: What is the hostel fee?\nAlso asked: What are the hostel fees?\nA: {FEE_ANSWER}"
+    assert out[1].page_content == docs[1].page_content
+    assert "duplicates" not in out[1].metadata
+
+
+def test_distinct_rows_pass_through_unchanged():
+    docs = [_doc(0, "What is the hostel fee?", FEE_ANSWER), _doc(1, "How often do campus buses run?", BUS_ANSWER)]
+    out = dedup_documents(docs)
+    assert [(d.page_content, d.metadata) for d in out] == [(d.page_content, d.metadata) for d in docs]
+
+
+def test_report_is_written_once_the_output_is_consumed(tmp_path):
+    report = tmp_path / "index.dedup.json"
+    docs = [_doc(0, "What is the hostel fee?", FEE_ANSWER), _doc(1, "What are the hostel fees?", FEE_ANSWER)]
+
+    stream = iter_dedup(docs, report_path=str(report))
+    assert next(stream).metadata["row"] == 0
+    assert not report.exists()
+    assert list(stream) == []
+
+    data = json.loads(report.read_text(encoding="utf-8"))
+    assert (data["rows"], data["kept"], data["removed"], data["clusters"]) == (2, 1, 1, 1)
+    cluster = data["cluster_list"][0]
+    assert cluster["representative"] == {"row": 0, "question": "What is the hostel fee?"}
+    assert [d["row"] for d in cluster["duplicates"]] == [1]
+    assert cluster["duplicates"][0]["similarity"] >= 0.85
@@ -0,0 +1,90 @@
+import pytest
+
+from chatbot_backend.embedding_cache import CachedEmbeddings, cache_key
+
+
+class FakeEncoder:
+    """Deterministic vectors; records which entry point saw which texts."""
+
+    def __init__(self):
+        self.calls = []
+
+    @staticmethod
+    def _vec(text):
+        return [float(len(text)), float(sum(map(ord, text)) % 97), 0.5]
+
+    def embed_query(self, text):
+        self.calls.append(("query", [text]))
+        return self._vec(text)
+
+    def embed_documents(self, texts):
+        self.calls.append(("documents", list(texts)))
+        return [self._vec(t) for t in texts]
+
+
+@pytest.fixture
+def base():
+    return FakeEncoder()
+
+
+def test_memory_hit_skips_the_encoder(base):
+    emb = CachedEmbeddings(base, "m1", maxsize=8)
+    first = emb.embed_query("late fee")
+    assert emb.embed_query("late fee") == first == FakeEncoder._vec("late fee")
+    assert base.calls == [("query", ["late fee"])]
+    stats = emb.stats()
+    assert (stats["hits"], stats["encoded"], stats["disk_hits"], stats["disk_path"]) == (1, 1, 0, None)
+
+
+def test_misses_are_encoded_in_one_call(base):
+    emb = CachedEmbeddings(base, "m1", maxsize=8)
+    emb.embed_query("a")
+    out = emb.embed_queries(["a", "bb", "ccc", "bb"])
+    assert out == [FakeEncoder._vec(t) for t in ["a", "bb", "ccc", "bb"]]
+    # One miss goes through embed_query, several through one embed_documents call, duplicates once
+    assert base.calls == [("query", ["a"]), ("documents", ["bb", "ccc"])]
+    assert emb.stats()["encoded"] == 3
+
+
+def test_model_id_is_part_of_the_key(base):
+    assert cache_key("m1", "rent") != cache_key("m2", "rent")
+    m1 = CachedEmbeddings(base, "m1")
+    m1.embed_query("rent")
+    # Even sharing the LRU, another model never sees the first model's vectors
+    m2 = CachedEmbeddings(base, "m2")
+    m2.memory = m1.memory
+    m2.embed_query("rent")
+    assert len(base.calls) == 2
+
+
+def test_disk_hit_is_promoted_to_memory(base, tmp_path):
+    path = str(tmp_path / "cache" / "embeddings.sqlite")
+    CachedEmbeddings(base, "m1", path=path).embed_queries(["rent", "deposit"])
+
+    # A fresh worker: empty LRU, same SQLite file
+    emb = CachedEmbeddings(base, "m1", path=path)
+    vecs = emb.embed_queries(["rent", "deposit"])
+    assert vecs == [pytest.approx(FakeEncoder._vec(t)) for t in ["rent", "deposit"]]
+    assert len(base.calls) == 1
+    assert (emb.disk_hits, emb.encoded) == (2, 0)
+
+    emb.embed_query("rent")
+    assert emb.disk_hits == 2 and emb.stats()["hits"] == 1
+    assert emb.stats()["disk_path"] == path
+
+
+def test_lru_eviction_falls_through_to_disk(base, tmp_path):
+    emb = CachedEmbeddings(base, "m1", maxsize=1, path=str(tmp_path / "embeddings.sqlite"))
+    emb.embed_query("rent")
+    emb.embed_query("deposit")  # evicts "rent" from memory
+    emb.embed_query("rent")
+    assert (emb.disk_hits, emb.encoded) == (1, 2)
+    assert len(base.calls) == 2
+
+
+def test_documents_pass_through(base):
+    emb = CachedEmbeddings(base, "m1")
+    emb.embed_documents(["a", "b"])
+    emb.embed_documents(["a", "b"])
+    assert base.calls == [("documents", ["a", "b"])] * 2
+    assert emb.stats()["encoded"] == 0 and len(emb.memory) == 0
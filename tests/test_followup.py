@@ -0,0 +1,61 @@
+import pytest
+from langchain_core.documents import Document
+
+from chatbot_backend import llm
+from chatbot_backend.llm import is_follow_up
+
+
+@pytest.mark.parametrize("query", ["and his email?", "What about the mess?", "how about electives",
+                                   "what is their phone number", "where does she sit"])
+def test_follow_ups(query):
+    assert is_follow_up(query)
+
+
+@pytest.mark.parametrize("query", ["What is the fee for this semester?", "How do I reach the IT department?",
+                                   "Is that course offered every year?", "Who is the HoD of CSE?", "", "   ",
+                                   "could you please tell me in detail what his research group works on these days"])
+def test_standalone_questions(query):
+    assert not is_follow_up(query)
+
+
+def _pool():
+    return [Document(page_content=f"doc {i}", metadata={"row": i}) for i in range(4)]
+
+
+@pytest.fixture
+def scores(monkeypatch):
+    box = {}
+
+    def fake_rerank_scores(query, docs, corpus_version="", stats=None):
+        box["query"] = query
+        return box["scores"][:len(docs)]
+
+    monkeypatch.setattr(llm, "rerank_scores", fake_rerank_scores)
+    return box
+
+
+def test_pool_is_reused_when_a_doc_clears_the_threshold(scores):
+    scores["scores"] = [0.5, llm.FOLLOWUP_MIN_SCORE + 2, -3.0, llm.FOLLOWUP_MIN_SCORE]
+    stats = {}
+    ranked, contextual = llm._rank_pool("and his email?", {"query": "who is the hod of cse", "candidates": _pool()},
+                                        top_k=3, corpus_version="v1", stats=stats)
+    assert contextual == "who is the hod of cse and his email?" == scores["query"]
+    assert [d.metadata["row"] for d in ranked] == [1, 3, 0]
+    assert stats["follow_up"]["reused_pool"] and stats["follow_up"]["pool"] == 4
+
+
+def test_weak_pool_falls_back_to_retrieval(scores):
+    # A positive logit is not enough: the default threshold sits above 0
+    assert llm.FOLLOWUP_MIN_SCORE > 0
+    scores["scores"] = [0.1, llm.FOLLOWUP_MIN_SCORE - 0.01, -3.0, 0.0]
+    stats = {}
+    assert llm._rank_pool("and his email?", {"query": "who is the hod of cse", "candidates": _pool()},
+                          top_k=3, corpus_version="v1", stats=stats) is None
+    assert stats["follow_up"]["reused_pool"] is False
+
+
+def test_empty_pool_falls_back_to_retrieval(scores):
+    scores["scores"] = []
+    stats = {}
+    assert llm._rank_pool("and his email?", {"query": "who is the hod", "candidates": []}, 3, "v1", stats) is None
+    assert stats["follow_up"]["best_score"] is None
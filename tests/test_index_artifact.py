@@ -0,0 +1,92 @@
+import zlib
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from rank_bm25 import BM25Okapi
+
+from chatbot_backend.index_artifact import ArtifactBM25Retriever, export_artifact, load_artifact
+
+WORDS = ["hostel", "mess", "fee", "library", "bus", "timetable", "elective", "course", "hod", "cse",
+         "admission", "scholarship", "deadline", "semester", "lab", "placement"] + [f"term{i}" for i in range(200)]
+# Zipf-like word frequencies, so there are common, rare and absent terms
+WEIGHTS = 1 / np.arange(1, len(WORDS) + 1)
+WEIGHTS /= WEIGHTS.sum()
+
+
+class HashEmbeddings:
+    """Deterministic stand-in for the embedder: one random vector per text."""
+
+    dim = 32
+
+    def embed_documents(self, texts):
+        return [np.random.default_rng(zlib.crc32(t.encode())).standard_normal(self.dim) for t in texts]
+
+
+def _corpus(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    docs = []
+    for i in range(n):
+        # "the" is in every document, so its idf is negative and gets rank_bm25's epsilon floor
+        words = ["the"] + list(rng.choice(WORDS, size=int(rng.integers(3, 30)), p=WEIGHTS))
+        docs.append(Document(page_content=" ".join(words),
+                             metadata={"row": i, "category": ["Hostel", "Academics"][i % 2], **({"url": "x"} if i % 7 == 0 else {})}))
+    return docs
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    return _corpus()
+
+
+@pytest.fixture(scope="module")
+def artifact(corpus, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("artifact") / "index")
+    export_artifact(iter(corpus), HashEmbeddings(), path, model_name="test", corpus_version="v1", batch_size=64)
+    return load_artifact(path)
+
+
+@pytest.mark.parametrize("query", ["hostel fee", "the mess", "cse hod hod", "deadline for scholarship",
+                                   "term150 term7", "unknown words only", "the"])
+def test_bm25_scores_match_rank_bm25(corpus, artifact, query):
+    reference = BM25Okapi([d.page_content.split() for d in corpus]).get_scores(query.split())
+    np.testing.assert_allclose(artifact.bm25_scores(query), reference, rtol=1e-4, atol=1e-5)
+
+
+def test_bm25_retriever_returns_the_top_documents(corpus, artifact):
+    reference = BM25Okapi([d.page_content.split() for d in corpus]).get_scores("library term42".split())
+    got = ArtifactBM25Retriever(artifact, k=5).invoke("library term42")
+    assert [d.metadata["row"] for d in got] == list(np.argsort(-reference, kind="stable")[:5])
+
+
+def test_dense_search_matches_brute_force(corpus, artifact):
+    mat = np.asarray(HashEmbeddings().embed_documents([d.page_content for d in corpus]), dtype=np.float32)
+    mat /= np.linalg.norm(mat, axis=1, keepdims=True)
+    q = HashEmbeddings().embed_documents(["query"])[0]
+    idx, scores = artifact.dense_search(q, 10)
+    exact = mat @ (q / np.linalg.norm(q))
+    assert list(idx) == list(np.argsort(-exact)[:10])
+    np.testing.assert_allclose(scores, exact[idx], rtol=1e-5)
+
+
+def test_documents_round_trip(corpus, artifact):
+    assert len(artifact) == len(corpus)
+    assert artifact.manifest["count"] == len(corpus) and artifact.corpus_version == "v1"
+    assert isinstance(artifact.embeddings, np.memmap)
+    for i in (0, 1, 7, len(corpus) - 1):
+        doc = artifact.document(i)
+        assert doc.page_content == corpus[i].page_content
+        assert doc.metadata == corpus[i].metadata  # keys a document lacks are not filled in
+
+
+def test_export_replaces_an_existing_artifact(tmp_path):
+    path = str(tmp_path / "index")
+    export_artifact(_corpus(10), HashEmbeddings(), path)
+    export_artifact(_corpus(4, seed=1), HashEmbeddings(), path)
+    assert len(load_artifact(path)) == 4
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["index"]
+
+
+def test_export_rejects_unknown_dtype(tmp_path):
+    with pytest.raises(ValueError):
+        export_artifact(_corpus(4), HashEmbeddings(), str(tmp_path / "index"), dtype="bfloat16")
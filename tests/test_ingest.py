@@ -0,0 +1,113 @@
+import json
+import os
+import time
+
+import pytest
+from langchain_core.documents import Document
+
+from chatbot_backend.ingest import (_read_checkpoint, batched, checkpoint_path, current_collection, ingest,
+                                    versioned_collection)
+from chatbot_backend.processing1 import corpus_version
+
+
+class FakeCollection:
+    """The slice of a Chroma collection that ingest uses."""
+
+    def __init__(self):
+        self.rows = {}
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        for i, e, d, m in zip(ids, embeddings, documents, metadatas):
+            self.rows[i] = (e, d, m)
+
+    def get(self, include=None, limit=None):
+        return {"ids": list(self.rows)[:limit]}
+
+    def delete(self, ids):
+        for i in ids:
+            del self.rows[i]
+
+
+class CountingEmbeddings:
+    """Records every embedded text; raises on call number ``fail_on`` (1-based) to simulate a crash."""
+
+    def __init__(self, fail_on=None):
+        self.texts, self.calls, self.fail_on = [], 0, fail_on
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        if self.calls == self.fail_on:
+            raise RuntimeError("embedder crashed")
+        self.texts.extend(texts)
+        return [[float(len(t)), 1.0] for t in texts]
+
+
+def _docs(n=25):
+    return [Document(page_content=f"Q: question {i}\nA: answer {i}", metadata={"row": i, "source": "faq.csv"})
+            for i in range(n)]
+
+
+def test_batched():
+    assert list(batched(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(batched([], 3)) == []
+
+
+def test_ingest_writes_everything_and_marks_complete(tmp_path):
+    collection, emb, cp = FakeCollection(), CountingEmbeddings(), str(tmp_path / "c.ingest_checkpoint.json")
+    stats = ingest(iter(_docs()), collection, emb, batch_size=4, workers=2, checkpoint_path=cp, key="k1")
+    assert (stats["docs"], stats["batches"], stats["skipped"]) == (25, 7, 0)
+    assert len(collection.rows) == 25
+    assert _read_checkpoint(cp) == {"key": "k1", "batches_done": 7, "docs_done": 25, "complete": True}
+
+    again = CountingEmbeddings()
+    assert ingest(iter(_docs()), collection, again, batch_size=4, checkpoint_path=cp, key="k1")["docs"] == 0
+    assert again.calls == 0
+
+
+def test_interrupted_ingest_resumes_after_the_last_written_batch(tmp_path):
+    collection, cp = FakeCollection(), str(tmp_path / "c.ingest_checkpoint.json")
+    with pytest.raises(RuntimeError):
+        ingest(iter(_docs()), collection, CountingEmbeddings(fail_on=4), batch_size=4, workers=1,
+               checkpoint_path=cp, key="k1")
+    state = _read_checkpoint(cp)
+    assert not state.get("complete") and 0 < state["docs_done"] < 25
+    assert len(collection.rows) == state["docs_done"]
+
+    emb = CountingEmbeddings()
+    stats = ingest(iter(_docs()), collection, emb, batch_size=4, workers=1, checkpoint_path=cp, key="k1")
+    assert stats["skipped"] == state["docs_done"]
+    assert len(emb.texts) == 25 - state["docs_done"]  # finished batches are not embedded again
+    assert len(collection.rows) == 25
+    assert _read_checkpoint(cp)["complete"]
+
+
+def test_a_new_key_starts_over(tmp_path):
+    collection, cp = FakeCollection(), str(tmp_path / "c.ingest_checkpoint.json")
+    ingest(iter(_docs(10)), collection, CountingEmbeddings(), batch_size=4, checkpoint_path=cp, key="old")
+    stats = ingest(iter(_docs(3)), collection, CountingEmbeddings(), batch_size=4, checkpoint_path=cp, key="new")
+    assert (stats["docs"], stats["skipped"]) == (3, 0)
+    assert len(collection.rows) == 3  # rows of the old corpus are cleared
+
+
+def test_versioned_collection():
+    assert versioned_collection("iitrpr_faq", "0123456789abcdef") == "iitrpr_faq_0123456789ab"
+    assert versioned_collection("iitrpr_faq", "") == "iitrpr_faq"
+
+
+def test_current_collection(tmp_path):
+    persist = str(tmp_path)
+    csv = tmp_path / "faq.csv"
+    csv.write_text("question,answer\nq,a\n", encoding="utf-8")
+    assert current_collection(persist, "faq", str(csv)) == versioned_collection("faq", corpus_version(str(csv)))
+
+    # Without the CSV: the newest complete build, ignoring unfinished ones and other bases
+    assert current_collection(persist, "faq") == "faq"
+    assert current_collection(str(tmp_path / "missing"), "faq") == "faq"
+    for name, state in [("faq_aaa", {"complete": True}), ("faq_bbb", {"complete": True}),
+                        ("faq_ccc", {"batches_done": 1}), ("other_ddd", {"complete": True})]:
+        with open(checkpoint_path(persist, name), "w", encoding="utf-8") as f:
+            json.dump(state, f)
+    now = time.time()
+    for name, age in [("faq_aaa", 30), ("faq_bbb", 20), ("faq_ccc", 0), ("other_ddd", 0)]:
+        os.utime(checkpoint_path(persist, name), (now - age, now - age))
+    assert current_collection(persist, "faq") == "faq_bbb"
@@ -0,0 +1,61 @@
+import sys
+
+import pytest
+
+from chatbot_backend.processing1 import iter_csv_documents, load_csv
+
+CSV = """Category,Question , Answer
+Academics,What courses are offered?,"B.Tech, M.Tech and PhD"
+,Where is the library?,Near the main gate
+Hostel,What is the mess fee?,
+Hostel,  Is there a gym?  ,Yes
+Admin,NA,Not applicable
+Admin,Who is the registrar?,Dr. X
+Admin,,Orphan answer
+Hostel,Is Wi-Fi available?,"Yes, campus-wide"
+"""
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "faq.csv"
+    path.write_text(CSV, encoding="utf-8")
+    return str(path)
+
+
+def _rows(docs):
+    return [(d.metadata["row"], d.metadata["category"], d.metadata["question"], d.metadata["answer"]) for d in docs]
+
+
+def test_rows_keep_file_numbering_across_chunks(csv_path):
+    expected = [(0, "Academics", "What courses are offered?", "B.Tech, M.Tech and PhD"),
+                (1, "General", "Where is the library?", "Near the main gate"),
+                (3, "Hostel", "Is there a gym?", "Yes"),
+                (4, "Admin", "NA", "Not applicable"),  # "NA" is text, not a missing value
+                (5, "Admin", "Who is the registrar?", "Dr. X"),
+                (7, "Hostel", "Is Wi-Fi available?", "Yes, campus-wide")]
+    for chunk_rows in (1, 2, 3, 1000):
+        assert _rows(iter_csv_documents(csv_path, chunk_rows=chunk_rows)) == expected
+
+
+def test_document_content_and_source(csv_path):
+    doc = load_csv(csv_path, chunk_rows=2)[2]
+    assert doc.page_content == "Q: Is there a gym?\nA: Yes"
+    assert doc.metadata["source"] == csv_path
+
+
+def test_missing_columns(tmp_path):
+    no_category = tmp_path / "no_category.csv"
+    no_category.write_text("question,answer\nWhat is the fee?,100\n", encoding="utf-8")
+    assert _rows(iter_csv_documents(str(no_category))) == [(0, "General", "What is the fee?", "100")]
+
+    no_answer = tmp_path / "no_answer.csv"
+    no_answer.write_text("question,category\nWhat is the fee?,Fees\n", encoding="utf-8")
+    assert list(iter_csv_documents(str(no_answer))) == []
+
+
+def test_parquet_without_pyarrow_says_what_is_missing(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    monkeypatch.setitem(sys.modules, "pyarrow.parquet", None)
+    with pytest.raises(ImportError, match="needs pyarrow"):
+        list(iter_csv_documents(str(tmp_path / "faq.parquet")))
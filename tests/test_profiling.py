@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+
+import pytest
+
+from chatbot_backend import profiling
+from chatbot_backend.profiling import SlowLog
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(profiling, "time", SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+def test_keeps_the_slowest_requests(clock):
+    log = SlowLog(size=3, window_s=60)
+    for i, seconds in enumerate([0.5, 2.0, 0.1, 3.0, 1.0, 0.2]):
+        log.record(seconds, question=f"q{i}")
+    assert [(e["question"], e["ms"]) for e in log.snapshot()] == [("q3", 3000.0), ("q1", 2000.0), ("q4", 1000.0)]
+    assert all(e["at"] == 1000.0 for e in log.snapshot())
+
+
+def test_old_entries_leave_the_window(clock):
+    log = SlowLog(size=2, window_s=60)
+    log.record(5.0, question="old slow")
+    log.record(4.0, question="old slower")
+    clock.now += 30
+    assert len(log.snapshot()) == 2
+    clock.now += 31
+    assert log.snapshot() == []
+    # Expired entries no longer hold the heap, so a fast request gets in
+    log.record(0.1, question="new fast")
+    assert [e["question"] for e in log.snapshot()] == ["new fast"]
+
+
+def test_window_mixes_old_and_new(clock):
+    log = SlowLog(size=2, window_s=60)
+    log.record(5.0, question="old")
+    clock.now += 40
+    log.record(1.0, question="new")
+    assert [e["question"] for e in log.snapshot()] == ["old", "new"]
+    clock.now += 30
+    log.record(0.5, question="newer")
+    assert [e["question"] for e in log.snapshot()] == ["new", "newer"]
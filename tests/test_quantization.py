@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from chatbot_backend.index_artifact import IndexArtifact, export_artifact
+from chatbot_backend.quantization import CompressedMatrix, compress, quantize_int8
+
+N, DIM, K = 2000, 64, 10
+
+
+class TableEmbeddings:
+    """Embedder stand-in returning precomputed rows (page_content is the row index)."""
+
+    def __init__(self, mat):
+        self.mat = mat
+
+    def embed_documents(self, texts):
+        return self.mat[[int(t) for t in texts]]
+
+
+@pytest.fixture(scope="module")
+def vectors():
+    # Clustered, like real sentence embeddings: near neighbours have close scores
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((20, DIM))
+    mat = centers[rng.integers(0, 20, N)] + 0.3 * rng.standard_normal((N, DIM))
+    mat = (mat / np.linalg.norm(mat, axis=1, keepdims=True)).astype(np.float32)
+    queries = mat[rng.integers(0, N, 50)] + 0.1 * rng.standard_normal((50, DIM)).astype(np.float32)
+    return mat, queries
+
+
+@pytest.fixture(scope="module")
+def artifacts(vectors, tmp_path_factory):
+    mat, _ = vectors
+    docs = [Document(page_content=str(i), metadata={"row": i}) for i in range(N)]
+    out = {}
+    for dtype in ("float16", "int8"):
+        path = str(tmp_path_factory.mktemp(dtype) / "index")
+        export_artifact(docs, TableEmbeddings(mat), path, dtype=dtype, batch_size=256)
+        out[dtype] = path
+    return out
+
+
+def _recall(artifact, mat, queries):
+    hits = 0
+    for q in queries:
+        truth = set(np.argsort(-(mat @ (q / np.linalg.norm(q))))[:K])
+        idx, _ = artifact.dense_search(q, K)
+        hits += len(truth & set(idx.tolist()))
+    return hits / (K * len(queries))
+
+
+def test_int8_round_trip_error_is_bounded(vectors):
+    mat, _ = vectors
+    codes, scales = quantize_int8(mat)
+    assert codes.dtype == np.int8 and scales.shape == (N,)
+    assert np.abs(codes.astype(np.float32) * scales[:, None] - mat).max() <= scales.max() / 2 + 1e-7
+    assert (quantize_int8(np.zeros((1, DIM)))[0] == 0).all()
+
+
+def test_compressed_scores_are_close(vectors):
+    mat, queries = vectors
+    q = queries[0]
+    for dtype, tol in (("float16", 1e-3), ("int8", 2e-2)):
+        data, scales = compress(mat, dtype)
+        scores = CompressedMatrix(data, scales, block_rows=300).scores(q)
+        np.testing.assert_allclose(scores, mat @ q, atol=tol)
+    with pytest.raises(ValueError):
+        compress(mat, "int4")
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_rescoring_keeps_recall(vectors, artifacts, dtype):
+    mat, queries = vectors
+    artifact = IndexArtifact(artifacts[dtype])
+    assert artifact.dtype == dtype and artifact.rescore
+    assert _recall(artifact, mat, queries) >= 0.99
+    # Re-scored results carry exact float32 cosines
+    idx, scores = artifact.dense_search(queries[0], K)
+    q = queries[0] / np.linalg.norm(queries[0])
+    np.testing.assert_allclose(scores, mat[idx] @ q, rtol=1e-5)
+
+
+def test_rescoring_is_at_least_as_good_as_the_compressed_scan(vectors, artifacts):
+    mat, queries = vectors
+    plain = _recall(IndexArtifact(artifacts["int8"], rescore=False), mat, queries)
+    rescored = _recall(IndexArtifact(artifacts["int8"]), mat, queries)
+    assert plain >= 0.9
+    assert rescored >= plain
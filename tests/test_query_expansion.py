@@ -0,0 +1,61 @@
+import json
+import os
+import sys
+
+import pytest
+
+from chatbot_backend.query_expansion import ALIAS_TABLE_PATH, SEED_ALIASES, QueryExpander, _add_pair
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+import mine_aliases  # noqa: E402
+
+
+@pytest.mark.parametrize("a,b,expected", [
+    ("hod", "head of department", True),
+    ("hods", "head of department", True),
+    ("hos", "head of school", True),
+    ("cse", "computer science and engineering", True),
+    ("name", "can you list", False),
+    ("fee", "hostel fee", False),
+    ("head of department", "head of school", False),
+])
+def test_is_acronym_pair(a, b, expected):
+    assert mine_aliases.is_acronym_pair(a, b) is expected
+
+
+def test_paraphrase_mining_keeps_only_acronym_pairs():
+    originals = [{"question": "Who is the HoD of CSE?", "answer": "a1"},
+                 {"question": "Name the faculty of CSE", "answer": "a2"},
+                 {"question": "Who is the HoD of EE?", "answer": "a3"}]
+    expanded = [{"question": "Who is the head of department of CSE?", "answer": "a1"},
+                {"question": "Can you list the faculty of CSE", "answer": "a2"},
+                {"question": "Who is the head of department of EE?", "answer": "a3"}]
+    pairs = mine_aliases.mine_paraphrases(originals, expanded)
+    assert pairs == {("head of department", "hod"): 2}
+
+
+def test_shipped_alias_table_has_no_rewordings():
+    with open(ALIAS_TABLE_PATH, "r", encoding="utf-8") as f:
+        table = json.load(f)["aliases"]
+    seeds = {tuple(sorted(p)) for p in SEED_ALIASES}
+    for phrase, aliases in table.items():
+        for alias in aliases:
+            assert tuple(sorted((phrase, alias))) in seeds or mine_aliases.is_acronym_pair(phrase, alias), (phrase, alias)
+
+
+def _expander():
+    table = {}
+    for a, b in [("hod", "head of department"), ("cse", "computer science"), ("head", "chief")]:
+        _add_pair(table, a, b)
+    return QueryExpander(table)
+
+
+def test_expansion_prefers_the_longest_match():
+    expander = _expander()
+    assert expander.expand("Who is the head of department of CSE?") == [
+        "Who is the hod of CSE?", "Who is the head of department of computer science?", "Who is the hod of computer science?"]
+
+
+def test_queries_without_aliases_are_not_rewritten():
+    assert _expander().expand("What is the name of the director?") == []
+    assert QueryExpander.from_file().expand("Can you name the hostels?") == []
@@ -0,0 +1,70 @@
+import pytest
+
+from chatbot_backend import backend, llm
+from chatbot_backend.processing1 import corpus_version
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    csv = tmp_path / "faq.csv"
+    csv.write_text("question,answer\nWhat is the fee?,100\n", encoding="utf-8")
+    old = {"vectordb": None, "bm25_retriever": None, "corpus_version": "old", "router": None}
+    invalidations = []
+    monkeypatch.setattr(backend, "CSV_PATH", str(csv))
+    monkeypatch.setattr(backend, "_indexes", old)
+    monkeypatch.setattr(backend, "_reload_state", {"running": False, "last": None})
+    monkeypatch.setattr(backend, "_warm_indexes", lambda indexes: None)
+    monkeypatch.setattr(llm, "invalidate_corpus_caches", lambda: invalidations.append(1))
+    monkeypatch.setattr(backend.status, "is_ready", lambda: True)
+    monkeypatch.setattr(backend, "ADMIN_TOKEN", "")
+    return {"old": old, "version": corpus_version(str(csv)), "invalidations": invalidations}
+
+
+def test_changed_corpus_is_built_and_swapped_in(corpus, monkeypatch):
+    new = {"vectordb": None, "bm25_retriever": None, "corpus_version": corpus["version"], "router": None}
+    monkeypatch.setattr(backend, "_load_indexes", lambda phase=None, workers=None: new)
+    backend.sessions.get("s1")["last"] = {"query": "q", "candidates": []}
+
+    assert backend.reload_indexes("test") is True
+    assert backend._indexes is new
+    assert corpus["invalidations"] == [1]
+    assert backend.sessions.get("s1") == {}  # pools of the old corpus are dropped
+    assert backend._reload_state["last"]["changed"] and not backend._reload_state["running"]
+
+
+def test_unchanged_corpus_is_not_rebuilt(corpus, monkeypatch):
+    monkeypatch.setattr(backend, "_indexes", dict(corpus["old"], corpus_version=corpus["version"]))
+    monkeypatch.setattr(backend, "_load_indexes", lambda phase=None, workers=None: pytest.fail("rebuilt"))
+    assert backend.reload_indexes("test") is True
+    assert backend._reload_state["last"]["changed"] is False
+
+
+def test_failed_build_keeps_the_current_indexes(corpus, monkeypatch):
+    def broken(phase=None, workers=None):
+        raise RuntimeError("embedder unavailable")
+
+    monkeypatch.setattr(backend, "_load_indexes", broken)
+    assert backend.reload_indexes("test") is False
+    assert backend._indexes is corpus["old"]
+    assert corpus["invalidations"] == []
+    assert backend._reload_state["last"]["error"] == "embedder unavailable"
+    assert not backend._reload_lock.locked()
+
+    client = backend.create_app(warm="none").test_client()
+    response = client.post("/admin/reload?wait=1")
+    assert response.status_code == 500
+    assert backend._indexes is corpus["old"]
+
+
+def test_concurrent_reload_is_refused(corpus):
+    with backend._reload_lock:
+        assert backend.reload_indexes("test") is False
+        response = backend.create_app(warm="none").test_client().post("/admin/reload?wait=1")
+        assert response.status_code == 409
+    assert backend._indexes is corpus["old"]
+
+
+def test_admin_token_is_required_when_set(corpus, monkeypatch):
+    monkeypatch.setattr(backend, "ADMIN_TOKEN", "secret")
+    client = backend.create_app(warm="none").test_client()
+    assert client.post("/admin/reload", headers={"X-Admin-Token": "wrong"}).status_code == 403
@@ -0,0 +1,125 @@
+import pytest
+from langchain_core.documents import Document
+
+from chatbot_backend import llm
+from chatbot_backend.cache import LRUCache
+
+
+class FakeCrossEncoder:
+    """Scores a pair by a per-text table; records the size of every predict call."""
+
+    def __init__(self, score_of):
+        self.score_of = score_of
+        self.calls = []
+
+    def predict(self, pairs, **kwargs):
+        self.calls.append(len(pairs))
+        return [self.score_of[text] for _, text in pairs]
+
+
+def _docs(n):
+    return [Document(page_content=f"doc {i}", metadata={"row": i}) for i in range(n)]
+
+
+@pytest.fixture
+def encoder(monkeypatch):
+    enc = FakeCrossEncoder({f"doc {i}": float(-i) for i in range(50)})
+    monkeypatch.setattr(llm, "get_cross_encoder", lambda: enc)
+    monkeypatch.setattr(llm, "_score_cache", LRUCache(maxsize=1000))
+    return enc
+
+
+def test_score_cache_hits_on_the_normalized_query(encoder):
+    docs = _docs(5)
+    first = {}
+    assert llm.rerank_scores("What is the fee?", docs, "v1", first) == [0.0, -1.0, -2.0, -3.0, -4.0]
+    assert (first["rerank"]["hits"], first["rerank"]["misses"]) == (0, 5)
+
+    again = {}
+    assert llm.rerank_scores("  what is the FEE ", docs + _docs(7)[5:], "v1", again)[:5] == [0.0, -1.0, -2.0, -3.0, -4.0]
+    assert (again["rerank"]["hits"], again["rerank"]["misses"], again["rerank"]["hit_ratio"]) == (5, 2, 0.7143)
+    assert encoder.calls == [5, 2]  # only the misses reach the model
+
+
+def test_duplicate_pairs_are_scored_once(encoder):
+    stats_list = [{}, {}]
+    docs = _docs(3)
+    out = llm.rerank_scores_batch([("fee", docs + docs[:1]), ("Fee?", docs)], "v1", stats_list)
+    assert out == [[0.0, -1.0, -2.0, 0.0], [0.0, -1.0, -2.0]]
+    assert encoder.calls == [3]
+    assert stats_list[0]["rerank"] == {"pairs": 4, "unique": 3, "hits": 0, "misses": 3, "hit_ratio": 0.0}
+    assert stats_list[1]["rerank"]["misses"] == 3  # waiting on the same model call, not a hit
+
+
+def test_docs_are_keyed_by_id(encoder):
+    a = Document(page_content="doc 1", metadata={"doc_id": "x"})
+    b = Document(page_content="doc 2", metadata={"doc_id": "x"})
+    llm.rerank_scores("fee", [a], "v1")
+    # Same explicit id, so the cached score of ``a`` is returned for ``b``
+    assert llm.rerank_scores("fee", [b], "v1") == [-1.0]
+
+
+def test_scores_do_not_survive_a_corpus_change(encoder):
+    llm.rerank_scores("fee", _docs(3), "v1")
+    stats = {}
+    llm.rerank_scores("fee", _docs(3), "v2", stats)
+    assert stats["rerank"]["misses"] == 3
+
+    llm.invalidate_corpus_caches()
+    stats = {}
+    llm.rerank_scores("fee", _docs(3), "v2", stats)
+    assert stats["rerank"]["misses"] == 3
+    assert encoder.calls == [3, 3, 3]
+
+
+def _ids(docs):
+    return [d.page_content for d in docs]
+
+
+def test_fuse_ranked_orders_by_reciprocal_rank():
+    a, b, c, d = (Document(page_content=t) for t in "abcd")
+    # a: 1/61 + 1/62, c: 1/63 + 1/61, b: 1/62, d: 1/63
+    assert _ids(llm.fuse_ranked([[a, b, c], [c, a, d]])) == ["a", "c", "b", "d"]
+    # Ties keep the order in which docs were first seen
+    assert _ids(llm.fuse_ranked([[a], [b]])) == ["a", "b"]
+    assert _ids(llm.fuse_ranked([[b], [a]])) == ["b", "a"]
+
+
+def test_cascade_stops_once_the_tail_trails_the_kth_score(encoder):
+    docs = _docs(40)
+    stats = {}
+    ranked = llm.cascade_rerank("fee", docs, top_k=3, stats=stats)
+    # Round 1 scores 0..2, round 2 scores 3..10 (best -3 is within the margin of the k-th, -2),
+    # round 3 scores 11..18 and its best, -11, trails by more than the margin
+    s = stats["rerank"]
+    assert (s["pairs"], s["scored"], s["pairs_skipped"], s["rounds"]) == (40, 19, 21, 3)
+    assert encoder.calls == [3, 8, 8]
+    assert ranked[:19] == docs[:19] and ranked[19:] == docs[19:]
+
+
+def test_cascade_continues_while_a_chunk_is_competitive(encoder):
+    encoder.score_of["doc 15"] = 10.0
+    docs = _docs(40)
+    stats = {}
+    ranked = llm.cascade_rerank("fee", docs, top_k=3, stats=stats)
+    assert ranked[0] is docs[15]
+    assert (stats["rerank"]["scored"], stats["rerank"]["rounds"]) == (27, 4)
+
+
+def test_cascade_disabled_scores_everything(encoder, monkeypatch):
+    monkeypatch.setattr(llm, "RERANK_CASCADE", False)
+    stats = {}
+    llm.cascade_rerank("fee", _docs(40), top_k=3, stats=stats)
+    assert (stats["rerank"]["scored"], stats["rerank"]["pairs_skipped"], stats["rerank"]["rounds"]) == (40, 0, 1)
+    assert encoder.calls == [40]
+
+
+def test_cascade_batch_shares_model_calls(encoder):
+    stats_list = [{}, {}, {}]
+    requests = [("fee", _docs(40)), ("rent", _docs(5)), ("empty", [])]
+    ranked = llm.cascade_rerank_batch(requests, top_k=3, stats_list=stats_list)
+    # Both requests' chunks go to the model together; the short one finishes after round 2
+    assert encoder.calls == [3 + 3, 8 + 2, 8]
+    assert [stats["rerank"]["rounds"] for stats in stats_list[:2]] == [3, 2]
+    assert stats_list[1]["rerank"]["pairs_skipped"] == 0
+    assert ranked[2] == [] and stats_list[2]["rerank"]["rounds"] == 0
@@ -0,0 +1,93 @@
+import zlib
+
+import numpy as np
+import pytest
+
+from chatbot_backend.router import REPLIES, Router, match_rules, route_message, spherical_kmeans
+
+
+class BagOfWords:
+    """Embedder stand-in: hashed bag of words, so shared words mean high cosine."""
+
+    dim = 512
+
+    def embed_query(self, text):
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for word in text.lower().replace("?", " ").split():
+            vec[zlib.crc32(word.encode()) % self.dim] += 1
+        return vec
+
+    def embed_documents(self, texts):
+        return np.stack([self.embed_query(t) for t in texts])
+
+
+@pytest.mark.parametrize("text,label", [
+    ("hi", "greeting"), ("Hello!", "greeting"), ("hey there", "greeting"), ("good morning bot", "greeting"),
+    ("hi hello", "greeting"), ("thanks", "thanks"), ("Thank you so much!", "thanks"), ("ok thanks", "thanks"),
+    ("great, thank you", "thanks"), ("bye", "bye"), ("see you later", "bye"), ("who are you?", "about"),
+    ("what can you do", "about"),
+])
+def test_small_talk_rules(text, label):
+    decision = match_rules(text)
+    assert decision["route"] == label and decision["by"] == "rule"
+    assert decision["reply"] == REPLIES[label]
+
+
+@pytest.mark.parametrize("text", ["ok", "great", "okay.", "", "   ", "this is it", "which one"])
+def test_acknowledgements_and_lookalikes_match_no_rule(text):
+    # "ok" / "great" alone are not thanks; "this" / "which" must not look like "hi"
+    assert match_rules(text) is None
+
+
+@pytest.mark.parametrize("text", ["hi, who is the HoD of CSE?", "What is the hostel fee", "M.Tech admission dates",
+                                  "where is the guest house"])
+def test_domain_keywords_force_retrieval(text):
+    decision = match_rules(text)
+    assert decision["route"] == "domain" and decision["by"] == "keyword"
+    assert decision["reply"] is None
+
+
+def test_rules_only_routing_defaults_to_domain():
+    assert route_message("hello")["route"] == "greeting"
+    assert route_message("tell me a joke")["route"] == "domain"
+    assert route_message("tell me a joke")["by"] == "default"
+
+
+def _router():
+    emb = BagOfWords()
+    centroids = emb.embed_documents(["hostel mess fee warden room", "course credits semester exam grade"])
+    exemplars = {"greeting": ["nice to meet you"], "off_domain": ["what is the weather today", "tell me a joke"]}
+    return Router(emb, centroids, exemplars=exemplars, smalltalk_min=0.6, domain_min=0.25, margin=0.05)
+
+
+def test_embedding_routes():
+    router = _router()
+    assert router.classify("what is the weather today in delhi")["route"] == "off_domain"
+    assert router.classify("nice to meet you")["route"] == "greeting"
+    assert router.classify("room allotment for the new semester")["route"] == "domain"
+    decision = router.classify("quantum entanglement explained")
+    assert decision["route"] == "off_domain" and decision["scores"]["domain"] < 0.25
+
+
+def test_rules_run_before_the_embedding():
+    assert _router().classify("thanks")["by"] == "rule"
+
+
+def test_encoder_failure_fails_open():
+    router = _router()
+
+    def broken(text):
+        raise RuntimeError("encoder down")
+
+    router.embeddings.embed_query = broken
+    decision = router.route("tell me something")
+    assert decision["route"] == "domain" and decision["by"] == "error" and decision["reply"] is None
+
+
+def test_spherical_kmeans_returns_unit_centroids():
+    rng = np.random.default_rng(0)
+    vecs = rng.standard_normal((100, 8)).astype(np.float32)
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    centroids = spherical_kmeans(vecs, 4)
+    assert centroids.shape == (4, 8)
+    np.testing.assert_allclose(np.linalg.norm(centroids, axis=1), 1, rtol=1e-5)
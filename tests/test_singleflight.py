@@ -0,0 +1,70 @@
+import threading
+import time
+
+from chatbot_backend.singleflight import SingleFlight
+
+
+def _start(n, target):
+    threads = [threading.Thread(target=target) for _ in range(n)]
+    for t in threads:
+        t.start()
+    return threads
+
+
+def _wait_until(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.001)
+
+
+def test_concurrent_callers_share_one_computation():
+    flights = SingleFlight("test")
+    release = threading.Event()
+    calls, results = [], []
+
+    def compute(flight):
+        calls.append(1)
+        release.wait(5)
+        return "answer"
+
+    threads = _start(5, lambda: results.append(flights.do("q", compute, timeout=5)))
+    _wait_until(lambda: flights._flights["q"].followers == 4)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert len(calls) == 1
+    assert sorted(results) == [("answer", False)] + [("answer", True)] * 4
+    assert len(flights) == 0
+
+
+def test_leader_error_reaches_followers():
+    flights = SingleFlight("test")
+    release = threading.Event()
+    errors = []
+
+    def compute(flight):
+        release.wait(5)
+        raise ValueError("boom")
+
+    def call():
+        try:
+            flights.do("q", compute, timeout=5)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = _start(3, call)
+    _wait_until(lambda: flights._flights["q"].followers == 2)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert len(errors) == 3 and len({id(e) for e in errors}) == 1
+    assert len(flights) == 0
+
+
+def test_nothing_is_cached_after_the_flight():
+    flights = SingleFlight("test")
+    assert flights.do("q", lambda f: 1) == (1, False)
+    assert flights.do("q", lambda f: 2) == (2, False)
@@ -0,0 +1,91 @@
+import io
+import threading
+import time
+import wave
+
+import pytest
+
+from chatbot_backend.admission import Overloaded
+from chatbot_backend.stt import AudioLimitError, SpeechService, STTBackend, spool_upload
+
+
+class BlockingSTT(STTBackend):
+    """Backend that holds its worker until released."""
+
+    name = "blocking"
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Semaphore(0)
+
+    def transcribe(self, audio):
+        self.started.release()
+        self.release.wait(5)
+        return "text"
+
+
+class NonSeekable(io.RawIOBase):
+    def __init__(self, data):
+        self._buf = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        return self._buf.readinto(b)
+
+
+def _wav(seconds, rate=16000):
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(b"\0\0" * int(seconds * rate))
+    return buf.getvalue()
+
+
+def test_full_queue_is_rejected_with_retry_after():
+    backend = BlockingSTT()
+    service = SpeechService(backend, workers=1, timeout_s=5, queue_max=1)
+    results = []
+    callers = [threading.Thread(target=lambda: results.append(service.transcribe(b"clip"))) for _ in range(2)]
+    for t in callers:
+        t.start()
+    assert backend.started.acquire(timeout=5)
+    deadline = time.monotonic() + 5
+    while service.pending < 2:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+    with pytest.raises(Overloaded) as info:
+        service.transcribe(b"clip")
+    assert info.value.reason == "stt_queue_full" and info.value.retry_after >= 1
+
+    backend.release.set()
+    for t in callers:
+        t.join(5)
+    assert results == ["text", "text"]
+    assert service.pending == 0
+    assert service.transcribe(b"clip") == "text"
+
+
+def test_over_long_clip_is_rejected_before_queueing():
+    service = SpeechService(BlockingSTT(), workers=1)
+    with pytest.raises(AudioLimitError):
+        service.transcribe(_wav(61))
+    assert service.pending == 0
+
+
+def test_seekable_upload_is_used_in_place():
+    upload = io.BytesIO(b"x" * 100)
+    assert spool_upload(upload, max_bytes=100) is upload
+    with pytest.raises(AudioLimitError):
+        spool_upload(io.BytesIO(b"x" * 101), max_bytes=100)
+
+
+def test_stream_upload_is_spooled_with_a_size_limit():
+    spooled = spool_upload(NonSeekable(b"abc" * 1000), max_bytes=3000, memory_bytes=100)
+    assert spooled.read() == b"abc" * 1000
+    with pytest.raises(AudioLimitError):
+        spool_upload(NonSeekable(b"abc" * 1000), max_bytes=2999)